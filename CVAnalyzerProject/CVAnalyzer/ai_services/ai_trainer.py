@@ -1,44 +1,158 @@
 import torch
 import torch.nn as nn
-from transformers import AutoTokenizer, AutoModel, Trainer, TrainingArguments
+from transformers import AutoConfig, AutoTokenizer, AutoModel, Trainer, TrainingArguments
 from sklearn.metrics import f1_score, precision_score, recall_score, classification_report
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 import numpy as np
 import pandas as pd
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, Sampler
+import contextlib
+import copy
+import hashlib
 import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from .chunking import TokenChunker, pool_windows
+from .config import ai_setting
+from .micro_batcher import MicroBatcher
+from .model_artifacts import (
+    CONFIG_FILE, ENCODER_DIR, LABELS_FILE, TOKENIZER_DIR, WEIGHTS_FILE,
+    artifact_exists, build_from_artifact, read_json, save_artifact
+)
+from .quantization import accuracy_delta, model_size_mb, quantize_model, resolve_inference_mode
+
+# fenêtres passées au modèle par forward lors de l'inférence sur un CV long
+INFERENCE_WINDOW_BATCH = 16
 
 class CVDataset(Dataset):
-    def __init__(self, texts, labels, tokenizer, max_length=512):
-        self.texts = texts
+    """
+    CV pré-tokenisés une seule fois (sans padding), avec cache disque optionnel :
+    le padding est fait par batch par DynamicPaddingCollator.
+    """
+    def __init__(self, texts, labels, tokenizer, max_length=512, cache_dir=None):
         self.labels = labels
         self.tokenizer = tokenizer
         self.max_length = max_length
+        self.cache_dir = cache_dir if cache_dir is not None else ai_setting('AI_DATASET_CACHE_DIR')
+        texts = [str(text) for text in texts]
+        self.fingerprint = self._fingerprint(texts)
+        self.input_ids = self._load_or_tokenize(texts)
+        self.lengths = [len(ids) for ids in self.input_ids]
+    
+    def _fingerprint(self, texts):
+        digest = hashlib.sha256()
+        digest.update(f"{getattr(self.tokenizer, 'name_or_path', '')}|{self.max_length}|{len(texts)}".encode('utf-8'))
+        for text in texts:
+            digest.update(text.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()[:32]
+    
+    def _load_or_tokenize(self, texts):
+        cache_path = Path(self.cache_dir) / f"tokens_{self.fingerprint}.npz" if self.cache_dir else None
+        if cache_path is not None and cache_path.exists():
+            cached = np.load(cache_path)
+            flat, offsets = cached['ids'], cached['offsets']
+            return [flat[offsets[i]:offsets[i + 1]].tolist() for i in range(len(offsets) - 1)]
+        
+        # tokenisation par lots (tokenizer rapide) plutôt qu'un appel par accès
+        input_ids = []
+        for start in range(0, len(texts), 1000):
+            encoding = self.tokenizer(texts[start:start + 1000], truncation=True, max_length=self.max_length)
+            input_ids.extend(encoding['input_ids'])
+        
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            offsets = np.zeros(len(input_ids) + 1, dtype=np.int64)
+            np.cumsum([len(ids) for ids in input_ids], out=offsets[1:])
+            flat = np.fromiter((token for ids in input_ids for token in ids), dtype=np.int32, count=int(offsets[-1]))
+            # écriture atomique : un entraînement concurrent ne lit jamais un fichier partiel
+            tmp_path = cache_path.with_name(cache_path.stem + '.tmp.npz')
+            np.savez(tmp_path, ids=flat, offsets=offsets)
+            os.replace(tmp_path, cache_path)
+        return input_ids
     
     def __len__(self):
-        return len(self.texts)
+        return len(self.input_ids)
     
     def __getitem__(self, idx):
-        text = str(self.texts[idx])
-        encoding = self.tokenizer(
-            text,
-            truncation=True,
-            padding='max_length',
-            max_length=self.max_length,
-            return_tensors='pt'
-        )
-        
         return {
-            'input_ids': encoding['input_ids'].flatten(),
-            'attention_mask': encoding['attention_mask'].flatten(),
-            'labels': torch.tensor(self.labels[idx], dtype=torch.long)
+            'input_ids': self.input_ids[idx],
+            'labels': int(self.labels[idx])
         }
 
+class DynamicPaddingCollator:
+    """Padde chaque batch à la longueur de son plus long CV (et non à 512)"""
+    def __init__(self, pad_token_id):
+        self.pad_token_id = pad_token_id or 0
+    
+    def __call__(self, samples):
+        max_length = max(len(sample['input_ids']) for sample in samples)
+        input_ids = torch.full((len(samples), max_length), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(samples), max_length), dtype=torch.long)
+        for row, sample in enumerate(samples):
+            length = len(sample['input_ids'])
+            input_ids[row, :length] = torch.tensor(sample['input_ids'], dtype=torch.long)
+            attention_mask[row, :length] = 1
+        return {
+            'input_ids': input_ids,
+            'attention_mask': attention_mask,
+            'labels': torch.tensor([sample['labels'] for sample in samples], dtype=torch.long)
+        }
+
+class LengthBucketSampler(Sampler):
+    """
+    Batch sampler : mélange les indices, les regroupe en paquets de
+    `batch_size * bucket_factor`, trie chaque paquet par longueur puis découpe
+    en batchs (mélangés) -> des CV de longueurs proches dans chaque batch.
+    """
+    def __init__(self, lengths, batch_size, shuffle=True, bucket_factor=50, seed=42):
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.bucket_factor = bucket_factor
+        self.seed = seed
+        self.epoch = 0
+        self.skip_batches = 0
+    
+    def set_epoch(self, epoch, skip_batches=0):
+        """Ordre déterministe par époque ; `skip_batches` saute les batchs déjà vus (reprise)"""
+        self.epoch = epoch
+        self.skip_batches = skip_batches
+    
+    def __iter__(self):
+        indices = np.arange(len(self.lengths))
+        if not self.shuffle:
+            # évaluation : tri global, padding minimal
+            indices = indices[np.argsort(self.lengths, kind='stable')]
+            yield from (indices[i:i + self.batch_size].tolist() for i in range(0, len(indices), self.batch_size))
+            return
+        
+        rng = np.random.default_rng(self.seed + self.epoch)
+        rng.shuffle(indices)
+        bucket_size = self.batch_size * self.bucket_factor
+        batches = []
+        for start in range(0, len(indices), bucket_size):
+            bucket = indices[start:start + bucket_size]
+            bucket = bucket[np.argsort([self.lengths[i] for i in bucket], kind='stable')]
+            batches.extend(bucket[i:i + self.batch_size].tolist() for i in range(0, len(bucket), self.batch_size))
+        rng.shuffle(batches)
+        yield from batches[self.skip_batches:]
+    
+    def __len__(self):
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size - self.skip_batches
+
 class CVClassifier(nn.Module):
-    def __init__(self, model_name='distilbert-base-uncased', num_classes=10):
+    def __init__(self, model_name='distilbert-base-uncased', num_classes=10, encoder_config=None):
         super(CVClassifier, self).__init__()
-        self.bert = AutoModel.from_pretrained(model_name)
+        # depuis un artefact : architecture seule (les poids viennent du fichier de l'artefact)
+        if encoder_config is not None:
+            self.bert = AutoModel.from_config(encoder_config)
+        else:
+            self.bert = AutoModel.from_pretrained(model_name)
         self.dropout = nn.Dropout(0.3)
         self.classifier = nn.Linear(self.bert.config.hidden_size, num_classes)
     
@@ -49,12 +163,116 @@ class CVClassifier(nn.Module):
         return self.classifier(output)
 
 class AIModelTrainer:
-    def __init__(self, model_name='distilbert-base-uncased'):
+    def __init__(self, model_name='distilbert-base-uncased', model_dir=None):
         self.model_name = model_name
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model_dir = model_dir or ai_setting('AI_MODEL_DIR')
         self.model = None
+        self.inference_mode = None
         self.label_encoder = LabelEncoder()
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self._load_lock = threading.Lock()
+        # version (mtime des poids) de l'artefact chargé : un artefact remplacé est rechargé
+        self._artifact_mtime = None
+        self._last_artifact_check = 0.0
+        self._batchers = {}
+        # tokenizer chargé au premier usage (celui de l'artefact s'il est chargé avant)
+        self._tokenizer = None
+        self._chunker = None
+    
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            self._set_tokenizer(AutoTokenizer.from_pretrained(self.model_name))
+        return self._tokenizer
+    
+    @property
+    def chunker(self):
+        if self._chunker is None:
+            self._set_tokenizer(self.tokenizer)
+        return self._chunker
+    
+    def _set_tokenizer(self, tokenizer):
+        self._tokenizer = tokenizer
+        # fenêtres de 512 tokens (tokens spéciaux compris) : tout le CV est lu, dans la limite du budget
+        self._chunker = TokenChunker(tokenizer, window_size=min(512, tokenizer.model_max_length) - 2)
+    
+    def _artifact_version(self):
+        # les poids sont écrits en dernier (remplacement atomique) : leur mtime identifie l'artefact
+        try:
+            return os.stat(Path(self.model_dir) / WEIGHTS_FILE).st_mtime_ns
+        except (OSError, TypeError):
+            return None
+    
+    def ensure_model(self):
+        """
+        Charge l'artefact entraîné à la première prédiction, puis le recharge quand il
+        est remplacé (réentraînement par un autre processus), vérifié toutes les
+        AI_MODEL_CHECK_INTERVAL secondes ; False s'il n'existe pas.
+        """
+        from_artifact = self.model is None or self._artifact_mtime is not None
+        if not from_artifact or (self.model is not None and
+                                 time.monotonic() - self._last_artifact_check < ai_setting('AI_MODEL_CHECK_INTERVAL', 5.0)):
+            # modèle entraîné dans ce processus et pas encore sauvegardé, ou vérification récente
+            return True
+        with self._load_lock:
+            self._last_artifact_check = time.monotonic()
+            version = self._artifact_version()
+            if version is not None and version != self._artifact_mtime and artifact_exists(self.model_dir):
+                try:
+                    self.load_artifact(self.model_dir)
+                    self._artifact_mtime = version
+                except Exception as e:
+                    if self.model is None:
+                        raise
+                    # artefact en cours d'écriture ou invalide : on garde le classifieur courant
+                    print(f"⚠️  Rechargement du classifieur impossible, conservation du modèle courant: {e}")
+        return self.model is not None
+    
+    def save_artifact(self, directory=None, metrics=None, quantization=None):
+        directory = directory or self.model_dir
+        save_artifact(directory, self.model, self.label_encoder.classes_, self.tokenizer, {
+            'model_name': self.model_name,
+            'num_classes': len(self.label_encoder.classes_),
+            'max_length': 512,
+            'metrics': {key: value for key, value in (metrics or {}).items() if key != 'classification_report'},
+            'quantization': quantization,
+        })
+        if Path(directory) == Path(self.model_dir or ''):
+            # le modèle en mémoire est celui de l'artefact : pas de rechargement
+            self._artifact_mtime = self._artifact_version()
+        return directory
+    
+    def load_artifact(self, directory):
+        """Modèle d'inférence dont les poids pointent sur le fichier projeté en mémoire (partagé entre workers)"""
+        directory = Path(directory)
+        config = read_json(directory, CONFIG_FILE)
+        label_encoder = LabelEncoder()
+        label_encoder.classes_ = np.array(read_json(directory, LABELS_FILE), dtype=object)
+        tokenizer = AutoTokenizer.from_pretrained(directory / TOKENIZER_DIR)
+        
+        encoder_config = AutoConfig.from_pretrained(directory / ENCODER_DIR)
+        model = build_from_artifact(
+            lambda: CVClassifier(config['model_name'], config['num_classes'], encoder_config=encoder_config),
+            directory / WEIGHTS_FILE
+        )
+        model.requires_grad_(False)
+        
+        mode = resolve_inference_mode(self.device)
+        f1_delta = ((config.get('quantization') or {}).get('delta') or {}).get('f1')
+        if mode == 'int8' and f1_delta is not None and -f1_delta > ai_setting('AI_QUANTIZATION_MAX_F1_DROP', 0.02):
+            # perte mesurée à l'entraînement trop forte pour ce modèle : on reste en fp32
+            print(f"⚠️  Quantification int8 ignorée (F1 {f1_delta:+.4f} sur la validation)")
+            mode = 'fp32'
+        if mode == 'int8':
+            quantize_model(model)
+        model = model.to(self.device).eval()
+        # tout est prêt avant la substitution : un rechargement ne mélange pas deux artefacts
+        self.model_name = config['model_name']
+        self.label_encoder = label_encoder
+        self._set_tokenizer(tokenizer)
+        self.model = model
+        self.inference_mode = mode
+        print(f"✅ Classifieur chargé depuis {directory} ({config['num_classes']} classes, {mode})")
     
     def prepare_data(self, df):
         if 'Resume_str' not in df.columns or 'Category' not in df.columns:
@@ -77,55 +295,223 @@ class AIModelTrainer:
             "classes": self.label_encoder.classes_.tolist()
         }
     
-    def train_model(self, X_train, y_train, X_val, y_val, epochs=3, batch_size=16):
-        num_classes = len(np.unique(y_train))
+    def _resolve_precision(self, precision):
+        """'auto' : bf16 si le matériel le gère (AVX512-BF16/AMX sur CPU), fp16 sur un GPU sans bf16, sinon fp32"""
+        if precision != 'auto':
+            return precision
+        if self.device.type == 'cuda':
+            return 'bf16' if torch.cuda.is_bf16_supported() else 'fp16'
+        mkldnn_bf16 = getattr(torch.ops.mkldnn, '_is_mkldnn_bf16_supported', None)
+        return 'bf16' if mkldnn_bf16 is not None and mkldnn_bf16() else 'fp32'
+    
+    def _autocast(self, precision):
+        if precision == 'fp32':
+            return contextlib.nullcontext()
+        dtype = torch.bfloat16 if precision == 'bf16' else torch.float16
+        return torch.autocast(device_type=self.device.type, dtype=dtype)
+    
+    def _checkpoint_path(self):
+        return Path(ai_setting('AI_CHECKPOINT_DIR')) / 'last.pt'
+    
+    def _save_checkpoint(self, path, state):
+        # écriture atomique : une interruption pendant la sauvegarde laisse le point de reprise précédent intact
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, path)
+    
+    def _load_checkpoint(self, path, fingerprint):
+        if not path.exists():
+            return None
+        checkpoint = torch.load(path, map_location=self.device, weights_only=False)
+        if checkpoint.get('fingerprint') != fingerprint:
+            print(f"Point de reprise ignoré (données ou configuration différentes): {path}")
+            return None
+        return checkpoint
+    
+    def _encode_labels(self, y_train, y_val):
+        """
+        Libellés bruts : l'encodeur est réajusté sur ces données (les classes d'un artefact
+        chargé auparavant ne valent plus) pour que l'artefact sauvegardé ait les bonnes classes.
+        Libellés déjà encodés (prepare_data) : l'encodeur qui les a produits est conservé.
+        """
+        if np.asarray(y_train).dtype.kind in 'OUS':
+            self.label_encoder = LabelEncoder().fit(np.concatenate([np.asarray(y_train), np.asarray(y_val)]))
+            return self.label_encoder.transform(y_train), self.label_encoder.transform(y_val)
+        if not hasattr(self.label_encoder, 'classes_'):
+            self.label_encoder.fit(np.concatenate([np.asarray(y_train), np.asarray(y_val)]))
+        return y_train, y_val
+    
+    def train_model(self, X_train, y_train, X_val, y_val, epochs=3, batch_size=16,
+                    accumulation_steps=None, precision=None, num_workers=None, compile_model=None,
+                    resume=None):
+        accumulation_steps = max(1, accumulation_steps or ai_setting('AI_TRAIN_ACCUMULATION_STEPS', 1))
+        precision = self._resolve_precision(precision or ai_setting('AI_TRAIN_PRECISION', 'auto'))
+        num_workers = num_workers if num_workers is not None else ai_setting('AI_TRAIN_NUM_WORKERS', 2)
+        compile_model = compile_model if compile_model is not None else ai_setting('AI_TRAIN_COMPILE', False)
+        resume = resume if resume is not None else ai_setting('AI_TRAIN_RESUME', True)
+        checkpoint_every = ai_setting('AI_CHECKPOINT_EVERY_STEPS', 200)
+        
+        y_train, y_val = self._encode_labels(y_train, y_val)
+        
+        num_classes = len(self.label_encoder.classes_)
         self.model = CVClassifier(self.model_name, num_classes).to(self.device)
+        # modèle en cours d'entraînement : ensure_model ne doit pas le remplacer par l'artefact
+        self._artifact_mtime = None
         
         train_dataset = CVDataset(X_train, y_train, self.tokenizer)
         val_dataset = CVDataset(X_val, y_val, self.tokenizer)
         
         optimizer = torch.optim.AdamW(self.model.parameters(), lr=2e-5)
         criterion = nn.CrossEntropyLoss()
+        # fp16 (GPU sans bf16) : mise à l'échelle de la perte pour éviter les sous-dépassements
+        scaler = torch.cuda.amp.GradScaler(enabled=precision == 'fp16')
         
-        train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-        val_loader = DataLoader(val_dataset, batch_size=batch_size)
+        # reprise seulement si mêmes données, mêmes classes et même découpage en batchs
+        fingerprint = (f"{train_dataset.fingerprint}|{val_dataset.fingerprint}|{self.model_name}|"
+                       f"{num_classes}|{batch_size}x{accumulation_steps}")
+        checkpoint_path = self._checkpoint_path()
+        checkpoint = self._load_checkpoint(checkpoint_path, fingerprint) if resume else None
+        start_epoch, batches_done, history = 0, 0, []
+        if checkpoint is not None:
+            self.model.load_state_dict(checkpoint['model'])
+            optimizer.load_state_dict(checkpoint['optimizer'])
+            scaler.load_state_dict(checkpoint['scaler'])
+            torch.set_rng_state(checkpoint['rng_state'])
+            start_epoch, batches_done, history = checkpoint['epoch'], checkpoint['batches_done'], checkpoint['history']
+            print(f"Reprise à l'époque {start_epoch + 1}, batch {batches_done} ({checkpoint_path})")
         
-        self.model.train()
-        for epoch in range(epochs):
+        def save_checkpoint(epoch, batches):
+            self._save_checkpoint(checkpoint_path, {
+                'model': self.model.state_dict(),
+                'optimizer': optimizer.state_dict(),
+                'scaler': scaler.state_dict(),
+                'rng_state': torch.get_rng_state(),
+                'epoch': epoch,
+                'batches_done': batches,
+                'history': history,
+                'fingerprint': fingerprint,
+            })
+        
+        # batchs de CV de longueurs proches, paddés à la longueur du plus long du batch
+        collator = DynamicPaddingCollator(self.tokenizer.pad_token_id)
+        loader_options = {
+            'collate_fn': collator,
+            'num_workers': num_workers,
+            'persistent_workers': num_workers > 0,
+            'pin_memory': self.device.type == 'cuda',
+        }
+        train_sampler = LengthBucketSampler(train_dataset.lengths, batch_size, shuffle=True)
+        train_loader = DataLoader(train_dataset, batch_sampler=train_sampler, **loader_options)
+        val_loader = DataLoader(
+            val_dataset,
+            batch_sampler=LengthBucketSampler(val_dataset.lengths, batch_size, shuffle=False),
+            **loader_options
+        )
+        
+        # torch.compile sur la boucle d'entraînement seulement (formes dynamiques : padding par batch)
+        forward = self.model
+        if compile_model and hasattr(torch, 'compile'):
+            forward = torch.compile(self.model, dynamic=True)
+        
+        print(f"Entraînement: précision={precision}, batch={batch_size}x{accumulation_steps} "
+              f"(effectif {batch_size * accumulation_steps}), workers={num_workers}, compile={bool(compile_model)}")
+        
+        val_metrics = None
+        for epoch in range(start_epoch, epochs):
+            # evaluate() repasse le modèle en mode eval : on le remet en train à chaque époque
+            self.model.train()
+            # ordre des batchs fixé par l'époque : les batchs déjà traités avant l'interruption sont sautés
+            train_sampler.set_epoch(epoch, skip_batches=batches_done if epoch == start_epoch else 0)
+            epoch_batches = train_sampler.skip_batches + len(train_sampler)
             total_loss = 0
-            for batch in train_loader:
-                optimizer.zero_grad()
+            samples = 0
+            start = time.perf_counter()
+            optimizer.zero_grad()
+            for step, batch in enumerate(train_loader, start=train_sampler.skip_batches + 1):
+                input_ids = batch['input_ids'].to(self.device, non_blocking=True)
+                attention_mask = batch['attention_mask'].to(self.device, non_blocking=True)
+                labels = batch['labels'].to(self.device, non_blocking=True)
                 
-                input_ids = batch['input_ids'].to(self.device)
-                attention_mask = batch['attention_mask'].to(self.device)
-                labels = batch['labels'].to(self.device)
+                with self._autocast(precision):
+                    outputs = forward(input_ids, attention_mask)
+                    loss = criterion(outputs.float(), labels)
                 
-                outputs = self.model(input_ids, attention_mask)
-                loss = criterion(outputs, labels)
+                # accumulation : gradients de plusieurs micro-batchs avant chaque pas d'optimisation
+                scaler.scale(loss / accumulation_steps).backward()
+                if step % accumulation_steps == 0 or step == epoch_batches:
+                    scaler.step(optimizer)
+                    scaler.update()
+                    optimizer.zero_grad()
+                    # point de reprise tous les N pas d'optimisation (jamais au milieu d'une accumulation)
+                    if checkpoint_every and (step // accumulation_steps) % checkpoint_every == 0 and step < epoch_batches:
+                        save_checkpoint(epoch, step)
                 
-                loss.backward()
-                optimizer.step()
                 total_loss += loss.item()
+                samples += labels.size(0)
+            train_seconds = time.perf_counter() - start
             
-            avg_loss = total_loss / len(train_loader)
-            val_metrics = self.evaluate(val_loader)
+            # perte moyenne sur les batchs effectivement exécutés (époque reprise : batchs restants seulement)
+            avg_loss = total_loss / max(1, len(train_sampler))
+            val_metrics = self.evaluate(val_loader, precision)
+            samples_per_sec = samples / train_seconds if train_seconds > 0 else 0.0
+            history.append({
+                "epoch": epoch + 1,
+                "loss": avg_loss,
+                "val_f1": val_metrics['f1'],
+                "train_seconds": round(train_seconds, 2),
+                "samples_per_sec": round(samples_per_sec, 2)
+            })
             
-            print(f"Epoch {epoch+1}: Loss={avg_loss:.4f}, Val F1={val_metrics['f1']:.4f}")
+            print(f"Epoch {epoch+1}: Loss={avg_loss:.4f}, Val F1={val_metrics['f1']:.4f}, "
+                  f"{samples_per_sec:.1f} CV/s ({train_seconds:.1f}s)")
+            batches_done = 0
+            save_checkpoint(epoch + 1, 0)
+        
+        if val_metrics is None:
+            # reprise d'un entraînement déjà terminé : seule l'évaluation est refaite
+            val_metrics = self.evaluate(val_loader, precision)
+        self.inference_mode = 'fp32'
+        
+        # écart de précision int8 / fp32 sur la validation, enregistré dans l'artefact pour le chargement
+        quantization = self.compare_inference_modes(val_loader) if ai_setting('AI_QUANTIZATION_CHECK', True) else None
+        
+        # artefact final (poids, classes, tokenizer) puis suppression du point de reprise
+        model_dir = self.save_artifact(metrics=val_metrics, quantization=quantization) if self.model_dir else None
+        if model_dir:
+            checkpoint_path.unlink(missing_ok=True)
         
-        return {"success": True, "final_metrics": val_metrics}
+        return {
+            "success": True,
+            "final_metrics": val_metrics,
+            "epochs": history,
+            "model_dir": str(model_dir) if model_dir else None,
+            "quantization": quantization,
+            "training_config": {
+                "precision": precision,
+                "batch_size": batch_size,
+                "accumulation_steps": accumulation_steps,
+                "effective_batch_size": batch_size * accumulation_steps,
+                "num_workers": num_workers,
+                "compiled": bool(compile_model)
+            }
+        }
     
-    def evaluate(self, data_loader):
-        self.model.eval()
+    def evaluate(self, data_loader, precision='fp32', model=None, device=None):
+        model = model or self.model
+        device = device or self.device
+        model.eval()
         predictions = []
         true_labels = []
         
         with torch.no_grad():
             for batch in data_loader:
-                input_ids = batch['input_ids'].to(self.device)
-                attention_mask = batch['attention_mask'].to(self.device)
-                labels = batch['labels'].to(self.device)
+                input_ids = batch['input_ids'].to(device)
+                attention_mask = batch['attention_mask'].to(device)
+                labels = batch['labels'].to(device)
                 
-                outputs = self.model(input_ids, attention_mask)
+                with self._autocast(precision):
+                    outputs = model(input_ids, attention_mask)
                 _, preds = torch.max(outputs, dim=1)
                 
                 predictions.extend(preds.cpu().tolist())
@@ -138,45 +524,140 @@ class AIModelTrainer:
             "classification_report": classification_report(true_labels, predictions, output_dict=True)
         }
     
+    def compare_inference_modes(self, data_loader):
+        """
+        Évalue le modèle fp32 courant et sa version int8 sur le même jeu (CPU) :
+        écart de métriques, débit et taille des poids.
+        """
+        if self.inference_mode not in (None, 'fp32'):
+            raise RuntimeError("La comparaison nécessite le modèle fp32")
+        cpu = torch.device('cpu')
+        fp32_model = self.model if self.device.type == 'cpu' else copy.deepcopy(self.model).to(cpu)
+        int8_model = quantize_model(copy.deepcopy(fp32_model).to(cpu))
+        
+        results = {}
+        for mode, model in (('fp32', fp32_model), ('int8', int8_model)):
+            start = time.perf_counter()
+            metrics = self.evaluate(data_loader, model=model, device=cpu)
+            elapsed = time.perf_counter() - start
+            results[mode] = {
+                'f1': metrics['f1'],
+                'precision': metrics['precision'],
+                'recall': metrics['recall'],
+                'seconds': round(elapsed, 2),
+                'size_mb': model_size_mb(model),
+            }
+        
+        speedup = results['fp32']['seconds'] / results['int8']['seconds'] if results['int8']['seconds'] > 0 else None
+        print(f"Quantification int8: F1 {results['int8']['f1'] - results['fp32']['f1']:+.4f}, "
+              f"x{speedup or 0:.2f}, {results['fp32']['size_mb']} -> {results['int8']['size_mb']} Mo")
+        return {
+            **results,
+            'delta': accuracy_delta(results['fp32'], results['int8']),
+            'speedup': round(speedup, 2) if speedup else None,
+        }
+    
+    def _run_windows(self, texts, forward):
+        """
+        Fenêtres de tous les textes passées ensemble (triées par longueur : padding minimal
+        entre documents), puis sorties moyennées par document (pondérées par tokens).
+        """
+        windows, weights, document_index, infos = [], [], [], []
+        for document, text in enumerate(texts):
+            text_windows, info = self.chunker.split_ids(text)
+            if not text_windows:
+                text_windows, info['weights'] = [[]], [1]
+            windows.extend(text_windows)
+            weights.extend(info['weights'])
+            document_index.extend([document] * len(text_windows))
+            infos.append(info)
+        
+        order = sorted(range(len(windows)), key=lambda i: len(windows[i]))
+        outputs = []
+        for start in range(0, len(order), INFERENCE_WINDOW_BATCH):
+            inputs = self.chunker.model_inputs([windows[i] for i in order[start:start + INFERENCE_WINDOW_BATCH]])
+            outputs.append(forward(inputs['input_ids'].to(self.device), inputs['attention_mask'].to(self.device)))
+        sorted_outputs = torch.cat(outputs)
+        values = torch.empty_like(sorted_outputs)
+        values[torch.as_tensor(order, device=values.device)] = sorted_outputs
+        
+        return pool_windows(values, weights, document_index, len(texts)), infos
+    
+    def _batcher(self, name, process_batch):
+        # un micro-batcher par opération, créé au premier appel
+        if name not in self._batchers:
+            with self._load_lock:
+                self._batchers.setdefault(name, MicroBatcher(process_batch, name=name))
+        return self._batchers[name]
+    
+    def batching_stats(self):
+        return {name: batcher.get_stats() for name, batcher in self._batchers.items()}
+    
     def predict(self, text):
+        # requêtes concurrentes regroupées en un seul passage du modèle (AI_BATCHING)
+        if ai_setting('AI_BATCHING', True):
+            return self._batcher('predict', self.predict_batch).run(text)
+        return self.predict_batch([text])[0]
+    
+    def predict_batch(self, texts):
+        if not self.ensure_model():
+            raise RuntimeError("Aucun modèle entraîné disponible")
         self.model.eval()
-        encoding = self.tokenizer(
-            text,
-            truncation=True,
-            padding='max_length',
-            max_length=512,
-            return_tensors='pt'
-        )
         
         with torch.no_grad():
-            input_ids = encoding['input_ids'].to(self.device)
-            attention_mask = encoding['attention_mask'].to(self.device)
-            
-            outputs = self.model(input_ids, attention_mask)
-            probabilities = torch.nn.functional.softmax(outputs, dim=-1)
-            
-            predicted_class_id = outputs.argmax().item()
-            confidence = probabilities[0][predicted_class_id].item()
+            probabilities, chunk_infos = self._run_windows(
+                texts,
+                lambda input_ids, attention_mask: torch.nn.functional.softmax(
+                    self.model(input_ids, attention_mask), dim=-1
+                )
+            )
             
-            predicted_class = self.label_encoder.inverse_transform([predicted_class_id])[0]
+            predicted_class_ids = probabilities.argmax(dim=1).tolist()
+            predicted_classes = self.label_encoder.inverse_transform(predicted_class_ids)
+            probabilities = probabilities.cpu()
         
-        return {
-            "predicted_category": predicted_class,
-            "confidence": confidence,
-            "all_probabilities": probabilities[0].cpu().tolist()
-        }
+        return [
+            {
+                "predicted_category": predicted_class,
+                "confidence": probabilities[row][class_id].item(),
+                "all_probabilities": probabilities[row].tolist(),
+                "chunks": chunk_info['windows'],
+                "truncated": chunk_info['truncated']
+            }
+            for row, (class_id, predicted_class, chunk_info) in enumerate(
+                zip(predicted_class_ids, predicted_classes, chunk_infos)
+            )
+        ]
+    
+    def embed_batch(self, texts):
+        if not self.ensure_model():
+            raise RuntimeError("Aucun modèle entraîné disponible")
+        with torch.no_grad():
+            embeddings, _ = self._run_windows(
+                texts,
+                lambda input_ids, attention_mask: self.model.bert(
+                    input_ids=input_ids, attention_mask=attention_mask
+                ).pooler_output
+            )
+        return list(embeddings.unsqueeze(1))
+    
+    def _embed(self, texts):
+        if ai_setting('AI_BATCHING', True):
+            batcher = self._batcher('embed', self.embed_batch)
+            # CV et offre soumis ensemble : ils peuvent partager le même batch
+            futures = [batcher.submit(text) for text in texts]
+            timeout = ai_setting('AI_BATCH_TIMEOUT', 30)
+            return [future.result(timeout=timeout) for future in futures]
+        return self.embed_batch(texts)
     
     def score_cv_for_job(self, cv_text, job_description, target_category=None):
         cv_prediction = self.predict(cv_text)
         
         if target_category and target_category in self.label_encoder.classes_:
             target_encoded = self.label_encoder.transform([target_category])[0]
-            cv_encoding = self.tokenizer(cv_text, truncation=True, padding=True, return_tensors='pt')
-            job_encoding = self.tokenizer(job_description, truncation=True, padding=True, return_tensors='pt')
             
             with torch.no_grad():
-                cv_embedding = self.model.bert(**cv_encoding).pooler_output
-                job_embedding = self.model.bert(**job_encoding).pooler_output
+                cv_embedding, job_embedding = self._embed([cv_text, job_description])
                 
                 similarity = torch.cosine_similarity(cv_embedding, job_embedding, dim=1).item()
                 category_match = cv_prediction["predicted_category"] == target_category
@@ -191,3 +672,17 @@ class AIModelTrainer:
             "confidence": cv_prediction["confidence"],
             "recommendation": "Excellent candidat" if final_score > 0.8 else "Candidat potentiel" if final_score > 0.6 else "À revoir"
         }
+
+
+_shared_trainer = None
+_shared_trainer_lock = threading.Lock()
+
+
+def get_trainer():
+    """Trainer partagé par le processus (vues IA, préchargement dans le maître gunicorn)"""
+    global _shared_trainer
+    if _shared_trainer is None:
+        with _shared_trainer_lock:
+            if _shared_trainer is None:
+                _shared_trainer = AIModelTrainer()
+    return _shared_trainer
@@ -0,0 +1,156 @@
+"""
+Cache des analyses de CV indexé par empreinte du contenu du fichier.
+
+Un même PDF déposé pour plusieurs postes n'est extrait et analysé qu'une
+fois : la clé combine le SHA-256 des octets du fichier et la version de
+l'analyse (code, modèles, taxonomie). Les entrées sont stockées en base
+(table AnalysisCache) avec expiration (TTL) et éviction LRU bornée en
+nombre d'entrées et en taille totale.
+"""
+import hashlib
+import random
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .config import ai_setting
+from .model_registry import current_ner_model_name
+from .quantization import resolve_inference_mode
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_or_path, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """SHA-256 d'un fichier lu par blocs (mémoire constante)"""
+    digest = hashlib.sha256()
+    if isinstance(file_or_path, (str, bytes)) or hasattr(file_or_path, '__fspath__'):
+        with open(file_or_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    else:
+        # fichier Django (UploadedFile / FieldFile)
+        for chunk in file_or_path.chunks(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def current_analyzer_version() -> str:
+    import torch
+
+    from .cv_analyzer import ANALYZER_VERSION
+    from .embedding_store import current_model_name
+    from .skills_taxonomy import skills_taxonomy
+
+    # mode effectif sur le périphérique du CVAnalyzer : le NER int8 ne rend pas les mêmes entités
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    return '|'.join([
+        ANALYZER_VERSION,
+        current_model_name(),
+        current_ner_model_name(),
+        f"mode:{resolve_inference_mode(device)}",
+        f"taxonomie:{skills_taxonomy.get_index().version}",
+    ])
+
+
+class AnalysisCache:
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 ttl_days: Optional[int] = None):
+        self.max_entries = max_entries or ai_setting('ANALYSIS_CACHE_MAX_ENTRIES', 10000)
+        self.max_bytes = max_bytes or ai_setting('ANALYSIS_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+        self.ttl = timedelta(days=ttl_days or ai_setting('ANALYSIS_CACHE_TTL_DAYS', 30))
+        # l'éviction est déclenchée sur une fraction des écritures pour rester hors du chemin critique
+        self.evict_probability = ai_setting('ANALYSIS_CACHE_EVICT_PROBABILITY', 0.05)
+
+    @staticmethod
+    def make_key(content_hash: str, version: str) -> str:
+        # la version peut être longue (noms de modèles) : on la condense
+        return f"{content_hash}:{hashlib.sha1(version.encode('utf-8')).hexdigest()}"
+
+    def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        from ..models import AnalysisCache as AnalysisCacheEntry
+
+        key = self.make_key(content_hash, current_analyzer_version())
+        entry = AnalysisCacheEntry.objects.filter(cache_key=key).only(
+            'id', 'text', 'result', 'created_at'
+        ).first()
+        if entry is None:
+            return None
+
+        now = timezone.now()
+        if entry.created_at < now - self.ttl:
+            entry.delete()
+            return None
+
+        AnalysisCacheEntry.objects.filter(id=entry.id).update(hits=F('hits') + 1, last_access=now)
+        return {'text': entry.text, 'result': entry.result}
+
+    def get_many(self, content_hashes) -> Dict[str, Dict[str, Any]]:
+        """
+        Texte extrait de plusieurs fichiers, en une requête et quelle que soit la version
+        d'analyse (l'extraction n'en dépend pas) ; `result` n'est fourni que pour une
+        entrée valide de la version courante, sinon None.
+        """
+        from ..models import AnalysisCache as AnalysisCacheEntry
+
+        version = current_analyzer_version()
+        expiry = timezone.now() - self.ttl
+        found = {}
+        entries = AnalysisCacheEntry.objects.filter(content_hash__in=set(content_hashes)).only(
+            'cache_key', 'content_hash', 'text', 'result', 'created_at'
+        ).order_by('-last_access')
+        for entry in entries:
+            current = entry.cache_key == self.make_key(entry.content_hash, version) and entry.created_at >= expiry
+            if entry.content_hash not in found or current:
+                found[entry.content_hash] = {'text': entry.text, 'result': entry.result if current else None}
+        return found
+
+    def set(self, content_hash: str, text: str, result: Dict[str, Any]):
+        from ..models import AnalysisCache as AnalysisCacheEntry
+
+        version = current_analyzer_version()
+        size = len(text.encode('utf-8')) + len(str(result).encode('utf-8'))
+        AnalysisCacheEntry.objects.update_or_create(
+            cache_key=self.make_key(content_hash, version),
+            defaults={
+                'content_hash': content_hash,
+                'analyzer_version': version,
+                'text': text,
+                'result': result,
+                'size_bytes': size,
+                'last_access': timezone.now(),
+            }
+        )
+        if random.random() < self.evict_probability:
+            self.evict()
+
+    def evict(self) -> int:
+        """Supprime les entrées expirées puis les moins récemment utilisées au-delà des limites"""
+        from ..models import AnalysisCache as AnalysisCacheEntry
+
+        deleted, _ = AnalysisCacheEntry.objects.filter(created_at__lt=timezone.now() - self.ttl).delete()
+
+        count = AnalysisCacheEntry.objects.count()
+        if count > self.max_entries:
+            stale_ids = list(AnalysisCacheEntry.objects.order_by('last_access').values_list(
+                'id', flat=True)[:count - self.max_entries])
+            deleted += AnalysisCacheEntry.objects.filter(id__in=stale_ids).delete()[0]
+
+        total = AnalysisCacheEntry.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            stale_ids = []
+            for entry_id, size in AnalysisCacheEntry.objects.order_by('last_access').values_list(
+                    'id', 'size_bytes').iterator():
+                stale_ids.append(entry_id)
+                excess -= size
+                if excess <= 0:
+                    break
+            deleted += AnalysisCacheEntry.objects.filter(id__in=stale_ids).delete()[0]
+
+        return deleted
+
+
+# cache partagé
+analysis_cache = AnalysisCache()
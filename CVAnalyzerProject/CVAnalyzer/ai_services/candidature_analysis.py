@@ -0,0 +1,149 @@
+"""
+Pipeline d'analyse complet d'une candidature : extraction du texte du CV,
+analyse IA, score global, embeddings.
+
+Utilisé par la tâche Celery (analyse en arrière-plan après l'upload) ; ne
+dépend pas de la requête HTTP. Un fichier déjà analysé (même empreinte) est
+servi par le cache d'analyse sans extraction ni chargement des modèles.
+"""
+from typing import Callable, Dict, Optional
+
+from .analysis_cache import analysis_cache, hash_file
+from .config import ai_setting
+from .cv_analyzer import CVAnalyzer
+from .embedding_store import EmbeddingStore
+from .extraction_pool import extraction_pool
+from .extractor_registry import MIME_PDF, sniff_mime_type
+from .text_extractor import TextExtractor
+
+
+class AnalysisError(Exception):
+    def __init__(self, message: str, error_code: str = 'analysis'):
+        super().__init__(message)
+        self.error_code = error_code
+
+
+def score_from_analysis(text: str, analysis: Dict[str, any]) -> float:
+    """Score global à partir du résultat de CVAnalyzer.extract_text_from_cv"""
+    return CVAnalyzer.calculate_overall_score({
+        'skills': analysis.get('skills', {}),
+        'experience': analysis.get('experience', {}),
+        'text_length': len(text)
+    })
+
+
+def extract_text_and_skills(file_path: str, analyzer: CVAnalyzer):
+    """
+    Texte du CV (retourne (texte, compétences ou None)). Par défaut l'extraction
+    tourne dans le pool isolé ; sinon, pour un PDF, les compétences sont
+    détectées page par page pendant l'extraction.
+    """
+    if ai_setting('EXTRACTION_ISOLATION', True):
+        extraction_result = extraction_pool.extract(
+            file_path,
+            max_pages=ai_setting('PDF_MAX_PAGES'),
+            max_chars=ai_setting('PDF_MAX_CHARS')
+        )
+    elif sniff_mime_type(file_path) == MIME_PDF:
+        pages = []
+
+        def stream_pages():
+            for _, page_text in TextExtractor.iter_pdf_pages(file_path):
+                pages.append(page_text)
+                yield page_text
+
+        try:
+            skills = analyzer.extract_skills_from_pages(stream_pages())
+        except Exception as e:
+            raise AnalysisError(f"Erreur lors de l'extraction du texte du CV: Erreur lors de l'extraction PDF: {e}",
+                                'extraction')
+        return '\n'.join(pages).strip(), skills
+    else:
+        extraction_result = TextExtractor.extract_text_from_file(file_path)
+    if not extraction_result['success']:
+        raise AnalysisError(
+            f"Erreur lors de l'extraction du texte du CV: {extraction_result['error']}",
+            extraction_result.get('error_code', 'extraction')
+        )
+    return extraction_result['text'], None
+
+
+def extract_and_analyse(file_path: str, content_hash: Optional[str] = None,
+                        analyzer_factory: Callable[[], CVAnalyzer] = CVAnalyzer) -> Dict[str, any]:
+    """
+    Texte extrait + analyse complète d'un fichier CV, en passant par le cache.
+    Retourne {'text', 'analysis', 'content_hash', 'cached', 'analyzer'}.
+    """
+    content_hash = content_hash or hash_file(file_path)
+    cached = analysis_cache.get(content_hash)
+    if cached is not None:
+        return {
+            'text': cached['text'],
+            'analysis': cached['result'],
+            'content_hash': content_hash,
+            'cached': True,
+            'analyzer': None,
+        }
+
+    analyzer = analyzer_factory()
+    try:
+        text, skills = extract_text_and_skills(file_path, analyzer)
+        analysis = analyzer.extract_text_from_cv(text, skills=skills)
+    finally:
+        analyzer.cleanup_gpu_memory()
+
+    analysis_cache.set(content_hash, text, analysis)
+    return {
+        'text': text,
+        'analysis': analysis,
+        'content_hash': content_hash,
+        'cached': False,
+        'analyzer': analyzer,
+    }
+
+
+def analyse_candidature(candidature, analyzer: Optional[CVAnalyzer] = None,
+                        progress: Optional[Callable[[int, str], None]] = None) -> Dict[str, any]:
+    """
+    Analyse le CV d'une candidature déjà enregistrée et remplit score_ia,
+    competences_extraites et cv_hash. `progress(pourcentage, étape)` est appelé à chaque étape.
+    """
+    def report(percent: int, step: str):
+        if progress:
+            progress(percent, step)
+
+    report(10, 'empreinte')
+    content_hash = candidature.cv_hash or hash_file(candidature.cv.path)
+    candidature.cv_hash = content_hash
+
+    report(30, 'extraction et analyse')
+    outcome = extract_and_analyse(
+        candidature.cv.path,
+        content_hash,
+        analyzer_factory=lambda: analyzer or CVAnalyzer()
+    )
+    analysis = outcome['analysis']
+    overall_score = score_from_analysis(outcome['text'], analysis)
+
+    report(80, 'embeddings')
+    try:
+        # un doublon déjà encodé évite de recharger le modèle d'encodage
+        store = EmbeddingStore(outcome['analyzer'] or analyzer)
+        if store.copy_from_duplicate(candidature) is None:
+            store.store(candidature, outcome['text'])
+    except Exception as e:
+        print(f"⚠️  Embeddings non enregistrés pour la candidature {candidature.id}: {e}")
+
+    candidature.score_ia = overall_score
+    candidature.competences_extraites = analysis.get('skills', {})
+    candidature.commentaires = (
+        f"CV analysé automatiquement. Score: {overall_score}%"
+        + (" (analyse en cache)" if outcome['cached'] else "")
+    )
+    report(100, 'terminée')
+    return {
+        'skills': analysis.get('skills', {}),
+        'experience': analysis.get('experience', {}),
+        'overall_score': overall_score,
+        'cached': outcome['cached'],
+    }
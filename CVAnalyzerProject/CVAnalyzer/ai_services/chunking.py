@@ -0,0 +1,108 @@
+"""
+Découpage des documents longs en fenêtres de tokens qui se recouvrent.
+
+Les modèles (DistilBERT : 512 tokens, MiniLM : 256) tronquent silencieusement
+les CV longs. Le texte est tokenisé une fois, découpé en fenêtres de la
+taille du modèle avec recouvrement, toutes les fenêtres sont passées en un
+batch puis regroupées (moyenne pondérée par le nombre de tokens) en un score
+ou un embedding par document. Un budget de tokens par requête borne le coût :
+au plus ceil((budget - recouvrement) / pas) fenêtres par document.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import torch
+
+from .config import ai_setting
+
+# borne haute de caractères par token : le texte est coupé avant tokenisation
+MAX_CHARS_PER_TOKEN = 12
+
+
+class TokenChunker:
+    def __init__(self, tokenizer, window_size: int, overlap: int = None, token_budget: int = None):
+        if window_size < 2:
+            raise ValueError('Taille de fenêtre invalide')
+        self.tokenizer = tokenizer
+        self.window_size = window_size
+        overlap = overlap if overlap is not None else ai_setting('AI_CHUNK_OVERLAP', 64)
+        # le pas doit rester positif même si le recouvrement demandé est trop grand
+        self.overlap = max(0, min(overlap, window_size // 2))
+        self.stride = window_size - self.overlap
+        self.token_budget = token_budget or ai_setting('AI_CHUNK_TOKEN_BUDGET', 4096)
+
+    def window_bounds(self, token_count: int) -> List[Tuple[int, int]]:
+        """Fenêtres [début, fin) couvrant les `token_count` premiers tokens, dans la limite du budget"""
+        token_count = min(token_count, self.token_budget)
+        bounds = []
+        start = 0
+        while start < token_count:
+            end = min(start + self.window_size, token_count)
+            bounds.append((start, end))
+            if end >= token_count:
+                break
+            start += self.stride
+        return bounds
+
+    def _tokenize(self, text: str, with_offsets: bool):
+        # texte coupé avant tokenisation : le coût reste borné même pour un document énorme
+        text = text or ''
+        cut = len(text) > self.token_budget * MAX_CHARS_PER_TOKEN
+        text = text[:self.token_budget * MAX_CHARS_PER_TOKEN]
+        kwargs = {'add_special_tokens': False, 'truncation': False, 'verbose': False}
+        if with_offsets and getattr(self.tokenizer, 'is_fast', False):
+            kwargs['return_offsets_mapping'] = True
+        return text, self.tokenizer(text, **kwargs), cut
+
+    def split_ids(self, text: str) -> Tuple[List[List[int]], Dict[str, any]]:
+        """Fenêtres d'identifiants de tokens (sans tokens spéciaux) + informations de découpage"""
+        _, encoding, cut = self._tokenize(text, with_offsets=False)
+        token_ids = encoding['input_ids']
+        bounds = self.window_bounds(len(token_ids))
+        return [token_ids[start:end] for start, end in bounds], self._info(len(token_ids), bounds, cut)
+
+    def split_text(self, text: str) -> Tuple[List[str], Dict[str, any]]:
+        """Fenêtres sous forme de texte (pour les modèles qui tokenisent eux-mêmes, ex. sentence-transformers)"""
+        text, encoding, cut = self._tokenize(text, with_offsets=True)
+        token_ids = encoding['input_ids']
+        bounds = self.window_bounds(len(token_ids))
+        offsets = encoding.get('offset_mapping')
+        if offsets:
+            windows = [text[offsets[start][0]:offsets[end - 1][1]] for start, end in bounds]
+        else:
+            windows = [self.tokenizer.decode(token_ids[start:end]) for start, end in bounds]
+        return windows, self._info(len(token_ids), bounds, cut)
+
+    def _info(self, token_count: int, bounds: List[Tuple[int, int]], cut: bool) -> Dict[str, any]:
+        return {
+            'tokens': token_count,
+            'used_tokens': bounds[-1][1] if bounds else 0,
+            'windows': len(bounds),
+            'weights': [end - start for start, end in bounds],
+            # texte coupé avant tokenisation ou tokens au-delà du budget
+            'truncated': cut or token_count > self.token_budget,
+        }
+
+    def model_inputs(self, windows: Sequence[List[int]]) -> Dict[str, torch.Tensor]:
+        """Ajoute les tokens spéciaux et padde au plus long de la liste (pas à la taille max du modèle)"""
+        encoded = {'input_ids': [self.tokenizer.build_inputs_with_special_tokens(list(window)) for window in windows]}
+        return self.tokenizer.pad(encoded, padding='longest', return_tensors='pt')
+
+
+def pool_windows(values: torch.Tensor, weights: Sequence[int], document_index: Sequence[int] = None,
+                 document_count: int = None) -> torch.Tensor:
+    """
+    Moyenne pondérée (par nombre de tokens) des valeurs de chaque fenêtre, par document.
+    Sans `document_index`, toutes les fenêtres appartiennent au même document (résultat 1 x d).
+    """
+    values = values.float()
+    weight = torch.as_tensor(list(weights), dtype=values.dtype, device=values.device).unsqueeze(1)
+    if document_index is None:
+        return (values * weight).sum(dim=0, keepdim=True) / weight.sum().clamp(min=1)
+
+    index = torch.as_tensor(list(document_index), dtype=torch.long, device=values.device)
+    document_count = document_count if document_count is not None else int(index.max().item()) + 1
+    sums = torch.zeros(document_count, values.shape[1], dtype=values.dtype, device=values.device)
+    sums.index_add_(0, index, values * weight)
+    totals = torch.zeros(document_count, 1, dtype=values.dtype, device=values.device)
+    totals.index_add_(0, index, weight)
+    return sums / totals.clamp(min=1)
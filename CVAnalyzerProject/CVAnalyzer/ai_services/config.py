@@ -0,0 +1,14 @@
+"""
+Accès aux réglages IA, utilisable avec ou sans Django configuré
+(scripts autonomes, processus worker, tests manuels des services).
+"""
+from typing import Any
+
+
+def ai_setting(name: str, default: Any = None) -> Any:
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        # ImproperlyConfigured hors projet Django : on garde la valeur par défaut
+        return default
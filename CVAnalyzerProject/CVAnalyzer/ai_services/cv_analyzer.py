@@ -1,31 +1,42 @@
 import torch
 import re
 import json
-from typing import List, Dict, Tuple
-from transformers import AutoTokenizer, AutoModel, pipeline
-from sentence_transformers import SentenceTransformer
+import threading
+from typing import Iterable, List, Dict, Optional, Tuple
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
-
-# Configuration GPU/CPU
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-print(f"Utilisation du device: {device}")
-
-# Téléchargement des ressources NLTK nécessaires
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    print("Téléchargement de 'punkt'...")
-    nltk.download('punkt')
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    print("Téléchargement de 'stopwords'...")
-    nltk.download('stopwords')
+
+from .chunking import TokenChunker, pool_windows
+from .model_registry import model_registry, get_process_memory_mb, current_ner_model_name
+from .quantization import resolve_inference_mode
+from .skill_matcher import SkillMatcher
+from .skills_taxonomy import skills_taxonomy
+
+# Version de la logique d'analyse : à incrémenter quand le résultat de extract_text_from_cv change
+# (invalide les analyses mises en cache)
+ANALYZER_VERSION = '2025.10.1'
+
+# tokens de marge par fenêtre : le texte d'une fenêtre peut se re-tokeniser un peu plus long
+CHUNK_BOUNDARY_MARGIN = 4
+
+_nltk_ready = False
+_nltk_lock = threading.Lock()
+
+
+def ensure_nltk_data():
+    """Ressources NLTK vérifiées (et téléchargées si besoin) au premier usage, pas à l'import"""
+    global _nltk_ready
+    if _nltk_ready:
+        return
+    with _nltk_lock:
+        if _nltk_ready:
+            return
+        import nltk
+        try:
+            nltk.data.find('tokenizers/punkt')
+        except LookupError:
+            print("Téléchargement de 'punkt'...")
+            nltk.download('punkt')
+        _nltk_ready = True
 
 def convert_numpy_types(obj):
     """Convertit récursivement les types NumPy/PyTorch en types Python natifs pour la sérialisation JSON"""
@@ -48,14 +59,40 @@ def convert_numpy_types(obj):
     else:
         return obj
 
+# Contexte d'analyse d'un document : met en cache les résultats coûteux (NER)
+class AnalysisContext:
+    def __init__(self, text: str, ner_pipeline=None):
+        self.text = text
+        self.ner_pipeline = ner_pipeline
+        self.ner_calls = 0
+        self._entities = None
+    
+    def get_entities(self) -> List[Dict[str, any]]:
+        """Lance le NER au plus une fois par document et renvoie la liste en cache"""
+        if self._entities is None:
+            if not self.ner_pipeline:
+                self._entities = []
+            else:
+                try:
+                    self.ner_calls += 1
+                    self._entities = self.ner_pipeline(self.text)
+                except Exception as e:
+                    print(f"Erreur lors de l'extraction d'entités: {e}")
+                    self._entities = []
+        return self._entities
+
+    def set_entities(self, entities: List[Dict[str, any]]):
+        """Entités calculées en dehors du contexte (NER batché sur plusieurs documents)"""
+        self._entities = entities
+
 # Classe danalyse de CV
 class CVAnalyzer:
     def __init__(self, model_name='sentence-transformers/all-MiniLM-L6-v2'):
         self.model_name = model_name
         self.sentence_model = None
         self.ner_pipeline = None
+        self._chunker = None
         self.device = self._get_device()
-        self.skills_keywords = self._load_skills_keywords()
         self.experience_patterns = self._create_experience_patterns()
         self.education_patterns = self._create_education_patterns()
         
@@ -72,20 +109,14 @@ class CVAnalyzer:
             print("⚠️  GPU non disponible, utilisation du CPU")
         return device
 
-# initialise les modeles NLP
+# initialise les modeles NLP (partagés via le registre du processus)
     def _initialize_models(self):
         try:
             print(f"Chargement du modèle Sentence Transformer: {self.model_name} sur {self.device}")
-            # Utiliser le device pour SentenceTransformer
-            self.sentence_model = SentenceTransformer(self.model_name, device=self.device)
+            self.sentence_model = model_registry.get_sentence_model(self.model_name, self.device)
             
             print(f"Chargement du pipeline NER sur {self.device}...")
-            # Utiliser le device pour le pipeline NER avec optimisations
-            self.ner_pipeline = pipeline("ner", 
-                                        model="dbmdz/bert-large-cased-finetuned-conll03-english",
-                                        aggregation_strategy="simple",
-                                        device=0 if self.device.type == 'cuda' else -1,  # 0 pour GPU, -1 pour CPU
-                                        torch_dtype=torch.float16 if self.device.type == 'cuda' else torch.float32)  # Optimisation mémoire
+            self.ner_pipeline = model_registry.get_ner_pipeline(current_ner_model_name(), self.device)
             
             print("✅ Modèles initialisés avec succès!")
             
@@ -96,48 +127,25 @@ class CVAnalyzer:
                 print("🔄 Tentative de chargement en mode CPU...")
                 self.device = torch.device('cpu')
                 try:
-                    self.sentence_model = SentenceTransformer(self.model_name, device=self.device)
-                    self.ner_pipeline = pipeline("ner", 
-                                                model="dbmdz/bert-large-cased-finetuned-conll03-english",
-                                                aggregation_strategy="simple",
-                                                device=-1)
+                    self.sentence_model = model_registry.get_sentence_model(self.model_name, self.device)
+                    self.ner_pipeline = model_registry.get_ner_pipeline(current_ner_model_name(), self.device)
                     print("✅ Modèles chargés en mode CPU!")
                 except Exception as fallback_e:
                     print(f"❌ Échec total du chargement des modèles: {fallback_e}")
                     self.sentence_model = None
                     self.ner_pipeline = None
     
-# charge les mots-clés de compétences par catégories
+# charge les mots-clés de compétences par catégories (taxonomie externe rechargée à chaud)
     def _load_skills_keywords(self) -> Dict[str, List[str]]:
-        return {
-            "programming": [
-                "python", "java", "javascript", "c++", "c#", "php", "ruby", "go",
-                "html", "css", "sql", "r", "matlab", "scala", "perl", "swift",
-                "kotlin", "typescript", "dart", "rust"
-            ],
-            "frameworks": [
-                "django", "flask", "react", "angular", "vue", "spring", "laravel",
-                "express", "nodejs", "tensorflow", "pytorch", "scikit-learn",
-                "pandas", "numpy", "bootstrap", "jquery"
-            ],
-            "databases": [
-                "mysql", "postgresql", "mongodb", "redis", "sqlite", "oracle",
-                "elasticsearch", "cassandra", "dynamodb"
-            ],
-            "tools": [
-                "git", "docker", "kubernetes", "jenkins", "aws", "azure", "gcp",
-                "linux", "unix", "windows", "macos", "jira", "confluence"
-            ],
-            "soft_skills": [
-                "leadership", "communication", "teamwork", "problem solving",
-                "analytical thinking", "creativity", "adaptability", "time management",
-                "project management", "critical thinking"
-            ],
-            "languages": [
-                "english", "french", "spanish", "german", "italian", "chinese",
-                "japanese", "arabic", "portuguese", "russian"
-            ]
-        }
+        return skills_taxonomy.get_index().categories
+    
+    @property
+    def skills_keywords(self) -> Dict[str, List[str]]:
+        return self._load_skills_keywords()
+    
+    @property
+    def skill_matcher(self) -> SkillMatcher:
+        return skills_taxonomy.get_index().matcher
     
 # patternes regex pour l'experience
     def _create_experience_patterns(self) -> List[str]:
@@ -166,13 +174,17 @@ class CVAnalyzer:
         ]
 
 # extrait les infos importantes d'un CV    
-    def extract_text_from_cv(self, cv_text: str) -> Dict[str, any]:
+    def extract_text_from_cv(self, cv_text: str, skills: Optional[Dict[str, List[str]]] = None,
+                             context: AnalysisContext = None) -> Dict[str, any]:
+        # un seul passage NER partagé entre l'expérience et les entités
+        context = context or self.create_context(cv_text)
         result = {
-            'skills': self.extract_skills(cv_text),
-            'experience': self.extract_experience(cv_text),
+            # compétences déjà calculées pendant l'extraction page par page, le cas échéant
+            'skills': skills if skills is not None else self.extract_skills(cv_text),
+            'experience': self.extract_experience(cv_text, context),
             'education': self.extract_education(cv_text),
             'languages': self.extract_languages(cv_text),
-            'entities': self.extract_entities(cv_text),
+            'entities': self.extract_entities(cv_text, context),
             'summary': self.generate_summary(cv_text)
         }
         
@@ -181,23 +193,33 @@ class CVAnalyzer:
         
         return result
 
+# analyse de plusieurs CV : le NER tourne en un appel batché pour tous les documents
+    def extract_text_from_cvs(self, cv_texts: List[str], batch_size: int = 8) -> List[Dict[str, any]]:
+        contexts = [self.create_context(text) for text in cv_texts]
+        if self.ner_pipeline and cv_texts:
+            try:
+                for context, entities in zip(contexts, self.ner_pipeline(list(cv_texts), batch_size=batch_size)):
+                    context.set_entities(entities)
+            except Exception as e:
+                # repli : chaque contexte relancera le NER sur son document
+                print(f"Erreur lors de l'extraction d'entités par lot: {e}")
+        return [self.extract_text_from_cv(text, context=context) for text, context in zip(cv_texts, contexts)]
+
+# crée le contexte d'analyse d'un document
+    def create_context(self, text: str) -> AnalysisContext:
+        return AnalysisContext(text, self.ner_pipeline)
+
 # extraire les compétences du texte
     def extract_skills(self, text: str) -> Dict[str, List[str]]:
-        text_lower = text.lower()
-        found_skills = {}
-        
-        for category, skills_list in self.skills_keywords.items():
-            found_skills[category] = []
-            for skill in skills_list:
-                if re.search(r'\b' + re.escape(skill.lower()) + r'\b', text_lower):
-                    found_skills[category].append(skill)
-        
-        found_skills = {k: v for k, v in found_skills.items() if v}
-        
-        return found_skills
+        # une seule passe sur le texte pour tous les mots-clés
+        return self.skill_matcher.match(text)
+
+# compétences d'un CV lu page par page (générateur), sans attendre la fin de l'extraction
+    def extract_skills_from_pages(self, pages: Iterable[str]) -> Dict[str, List[str]]:
+        return self.skill_matcher.match_pages(pages)
 
 # extrait les informations d'experience    
-    def extract_experience(self, text: str) -> Dict[str, any]:
+    def extract_experience(self, text: str, context: AnalysisContext = None) -> Dict[str, any]:
         experience_info = {
             'years_of_experience': 0,
             'job_titles': [],
@@ -212,11 +234,10 @@ class CVAnalyzer:
                     experience_info['years_of_experience'] = max(years)
                     break
         
-        if self.ner_pipeline:
-            entities = self.ner_pipeline(text)
-            for entity in entities:
-                if entity['entity_group'] == 'ORG':
-                    experience_info['companies'].append(entity['word'])
+        context = context or self.create_context(text)
+        for entity in context.get_entities():
+            if entity['entity_group'] == 'ORG':
+                experience_info['companies'].append(entity['word'])
         
         return experience_info
 
@@ -237,29 +258,18 @@ class CVAnalyzer:
 
 # extrait les informations de langues
     def extract_languages(self, text: str) -> List[str]:
-        text_lower = text.lower()
-        found_languages = []
-        
-        for language in self.skills_keywords['languages']:
-            if re.search(r'\b' + re.escape(language.lower()) + r'\b', text_lower):
-                found_languages.append(language)
-        
-        return found_languages
+        return self.skill_matcher.match(text, categories=['languages']).get('languages', [])
 
 # extrait les entités nommées
-    def extract_entities(self, text: str) -> List[Dict[str, any]]:
-        if not self.ner_pipeline:
-            return []
-        
-        try:
-            entities = self.ner_pipeline(text)
-            return entities
-        except Exception as e:
-            print(f"Erreur lors de l'extraction d'entités: {e}")
-            return []
+    def extract_entities(self, text: str, context: AnalysisContext = None) -> List[Dict[str, any]]:
+        context = context or self.create_context(text)
+        return context.get_entities()
 
 # genere un résumé du CV
     def generate_summary(self, text: str, max_sentences: int = 3) -> str:
+        from nltk.tokenize import sent_tokenize
+
+        ensure_nltk_data()
         sentences = sent_tokenize(text)
         if len(sentences) <= max_sentences:
             return text
@@ -272,41 +282,16 @@ class CVAnalyzer:
             return {'error': 'Modèle non initialisé'}
         
         try:
-            # Optimisation GPU : traitement par batch et gestion de la mémoire
-            with torch.cuda.amp.autocast() if self.device.type == 'cuda' else torch.no_grad():
-                # Encoder les textes avec optimisations
-                cv_embedding = self.sentence_model.encode(
-                    [cv_text], 
-                    convert_to_tensor=True,
-                    device=self.device,
-                    show_progress_bar=False,
-                    batch_size=1
-                )
-                job_embedding = self.sentence_model.encode(
-                    [job_description], 
-                    convert_to_tensor=True,
-                    device=self.device,
-                    show_progress_bar=False,
-                    batch_size=1
-                )
-                
-                # Calcul de similarité optimisé GPU
-                similarity = torch.cosine_similarity(cv_embedding, job_embedding, dim=1)
-                similarity_score = similarity.cpu().item()  # Ramener sur CPU pour le résultat
-            
-            cv_skills = self.extract_skills(cv_text)
-            job_skills = self.extract_skills(job_description)
-            
-            skills_score = self._calculate_skills_match(cv_skills, job_skills)
-            
-            overall_score = (similarity_score * 0.6 + skills_score * 0.4) * 100
+            batch_result = self.score_cvs_against_jobs([cv_text], [job_description])
+            if 'error' in batch_result:
+                return batch_result
             
             result = {
-                'overall_score': round(float(overall_score), 2),
-                'semantic_similarity': round(float(similarity_score) * 100, 2),
-                'skills_match_score': round(float(skills_score) * 100, 2),
-                'cv_skills': cv_skills,
-                'job_skills': job_skills
+                'overall_score': round(batch_result['overall_score'][0][0], 2),
+                'semantic_similarity': round(batch_result['semantic_similarity'][0][0], 2),
+                'skills_match_score': round(batch_result['skills_match_score'][0][0], 2),
+                'cv_skills': batch_result['cv_skills'][0],
+                'job_skills': batch_result['job_skills'][0]
             }
             
             # Convertir tous les types NumPy en types Python natifs
@@ -317,25 +302,148 @@ class CVAnalyzer:
         except Exception as e:
             return {'error': f'Erreur lors du calcul: {e}'}
 
-# calcule le score de correspondance des compétences
-    def _calculate_skills_match(self, cv_skills: Dict, job_skills: Dict) -> float:
-        if not cv_skills or not job_skills:
-            return 0.0
+# découpe en fenêtres de tokens à la taille du modèle (marge pour la re-tokenisation des bords)
+    @property
+    def chunker(self) -> TokenChunker:
+        if self._chunker is None:
+            self._chunker = TokenChunker(
+                self.sentence_model.tokenizer,
+                window_size=self.sentence_model.max_seq_length - 2 - CHUNK_BOUNDARY_MARGIN
+            )
+        return self._chunker
+
+# encode des documents longs : toutes les fenêtres de tous les documents en un batch, puis moyenne par document
+    def encode_documents(self, texts: List[str], batch_size: int = 32) -> torch.Tensor:
+        windows, weights, document_index = [], [], []
+        for i, text in enumerate(texts):
+            text_windows, info = self.chunker.split_text(text)
+            if not text_windows:
+                text_windows, info['weights'] = [text or ''], [1]
+            windows.extend(text_windows)
+            weights.extend(info['weights'])
+            document_index.extend([i] * len(text_windows))
         
-        total_job_skills = sum(len(skills) for skills in job_skills.values())
-        if total_job_skills == 0:
-            return 0.0
+        window_embeddings = self.encode_texts(windows, batch_size=batch_size)
+        if len(windows) == len(texts):
+            return window_embeddings
+        documents = pool_windows(window_embeddings, weights, document_index, len(texts))
+        return torch.nn.functional.normalize(documents, dim=1)
+
+# encode une liste de textes en un seul passage (batchs paddés, embeddings normalisés)
+    def encode_texts(self, texts: List[str], batch_size: int = 32) -> torch.Tensor:
+        # Optimisation GPU : traitement par batch et gestion de la mémoire
+        with torch.cuda.amp.autocast() if self.device.type == 'cuda' else torch.no_grad():
+            return self.sentence_model.encode(
+                texts,
+                convert_to_tensor=True,
+                device=self.device,
+                show_progress_bar=False,
+                batch_size=batch_size,
+                normalize_embeddings=True
+            )
+
+# score N CV contre M offres : un seul encodage + un seul produit matriciel
+    def score_cvs_against_jobs(self, cv_texts: List[str], job_descriptions: List[str],
+                               batch_size: int = 32) -> Dict[str, any]:
+        if not self.sentence_model:
+            return {'error': 'Modèle non initialisé'}
+        if not cv_texts or not job_descriptions:
+            return {'error': 'Au moins un CV et une offre sont requis'}
+        
+        try:
+            # CV longs découpés en fenêtres (pas de troncature silencieuse à la taille du modèle) ;
+            # sentence-transformers trie les fenêtres par longueur : chaque batch est paddé au minimum
+            embeddings = self.encode_documents(list(cv_texts) + list(job_descriptions), batch_size=batch_size)
+            cv_embeddings = embeddings[:len(cv_texts)]
+            job_embeddings = embeddings[len(cv_texts):]
+            
+            cv_skills = [self.extract_skills(text) for text in cv_texts]
+            return self._score_embedding_matrix(cv_embeddings, job_embeddings, cv_skills, job_descriptions)
+            
+        except Exception as e:
+            return {'error': f'Erreur lors du calcul: {e}'}
+
+# score des CV déjà encodés (embeddings stockés) contre M offres : seules les offres sont encodées
+    def score_embeddings_against_jobs(self, cv_embeddings, cv_skills: List[Dict], job_descriptions: List[str],
+                                      batch_size: int = 32) -> Dict[str, any]:
+        if not self.sentence_model:
+            return {'error': 'Modèle non initialisé'}
+        if len(cv_embeddings) == 0 or not job_descriptions:
+            return {'error': 'Au moins un CV et une offre sont requis'}
+        
+        try:
+            job_embeddings = self.encode_documents(list(job_descriptions), batch_size=batch_size)
+            cv_embeddings = torch.as_tensor(np.asarray(cv_embeddings, dtype=np.float32), device=job_embeddings.device)
+            cv_embeddings = torch.nn.functional.normalize(cv_embeddings, dim=1)
+            return self._score_embedding_matrix(cv_embeddings, job_embeddings, cv_skills, job_descriptions)
+        
+        except Exception as e:
+            return {'error': f'Erreur lors du calcul: {e}'}
+    
+    def _score_embedding_matrix(self, cv_embeddings, job_embeddings, cv_skills: List[Dict],
+                                job_descriptions: List[str]) -> Dict[str, any]:
+        # embeddings normalisés : produit scalaire = similarité cosinus (matrice N x M)
+        similarity = (cv_embeddings.float() @ job_embeddings.float().T).cpu().numpy()
+        
+        job_skills = [self.extract_skills(text) for text in job_descriptions]
+        skills_scores = self._calculate_skills_match_matrix(cv_skills, job_skills)
         
-        matched_skills = 0
-        for category, job_skills_list in job_skills.items():
-            cv_skills_list = cv_skills.get(category, [])
-            for skill in job_skills_list:
-                if skill in cv_skills_list:
-                    matched_skills += 1
+        overall = (similarity * 0.6 + skills_scores * 0.4) * 100
         
-        return matched_skills / total_job_skills
+        return {
+            'overall_score': np.round(overall, 2).tolist(),
+            'semantic_similarity': np.round(similarity * 100, 2).tolist(),
+            'skills_match_score': np.round(skills_scores * 100, 2).tolist(),
+            'cv_skills': cv_skills,
+            'job_skills': job_skills
+        }
 
-    def calculate_overall_score(self, analysis_data: Dict) -> float:
+# classe les CV pour une offre (meilleur score en premier)
+    def rank_cvs_for_job(self, cv_texts: List[str], job_description: str,
+                         top_k: int = None, batch_size: int = 32) -> List[Dict[str, any]]:
+        scores = self.score_cvs_against_jobs(cv_texts, [job_description], batch_size=batch_size)
+        if 'error' in scores:
+            return []
+        
+        ranking = [
+            {
+                'index': i,
+                'overall_score': scores['overall_score'][i][0],
+                'semantic_similarity': scores['semantic_similarity'][i][0],
+                'skills_match_score': scores['skills_match_score'][i][0],
+                'cv_skills': scores['cv_skills'][i]
+            }
+            for i in range(len(cv_texts))
+        ]
+        ranking.sort(key=lambda item: item['overall_score'], reverse=True)
+        return ranking[:top_k] if top_k else ranking
+
+# calcule les scores de correspondance des compétences (N CV x M offres) : part des compétences de l'offre présentes dans le CV
+    def _calculate_skills_match_matrix(self, cv_skills: List[Dict], job_skills: List[Dict]) -> np.ndarray:
+        vocabulary = {}
+        for skills in cv_skills + job_skills:
+            for category, skills_list in skills.items():
+                for skill in skills_list:
+                    vocabulary.setdefault((category, skill), len(vocabulary))
+        
+        cv_matrix = np.zeros((len(cv_skills), len(vocabulary)), dtype=np.float32)
+        for row, skills in enumerate(cv_skills):
+            for category, skills_list in skills.items():
+                for skill in skills_list:
+                    cv_matrix[row, vocabulary[(category, skill)]] = 1.0
+        
+        job_matrix = np.zeros((len(job_skills), len(vocabulary)), dtype=np.float32)
+        for row, skills in enumerate(job_skills):
+            for category, skills_list in skills.items():
+                for skill in skills_list:
+                    job_matrix[row, vocabulary[(category, skill)]] += 1.0
+        
+        matched = cv_matrix @ job_matrix.T
+        totals = job_matrix.sum(axis=1)
+        return np.divide(matched, totals, out=np.zeros_like(matched), where=totals > 0)
+
+    @staticmethod
+    def calculate_overall_score(analysis_data: Dict) -> float:
         """
         Calcule un score global basé sur l'analyse du CV
         """
@@ -378,9 +486,9 @@ class CVAnalyzer:
                 print(f"💾 Mémoire GPU libérée: {torch.cuda.memory_reserved(0) // 1024**2} MB utilisés")
     
     def get_gpu_info(self):
-        """Retourne les informations sur l'utilisation du GPU"""
+        """Retourne les informations sur l'utilisation du GPU (ou du CPU) et du registre de modèles"""
         if self.device.type == 'cuda':
-            return {
+            info = {
                 'gpu_available': True,
                 'gpu_name': torch.cuda.get_device_name(0),
                 'memory_allocated': torch.cuda.memory_allocated(0) // 1024**2,  # MB
@@ -388,7 +496,24 @@ class CVAnalyzer:
                 'total_memory': torch.cuda.get_device_properties(0).total_memory // 1024**2  # MB
             }
         else:
-            return {'gpu_available': False, 'using': 'CPU'}
+            process_memory = get_process_memory_mb()
+            info = {
+                'gpu_available': False,
+                'using': 'CPU',
+                'memory_rss': process_memory.get('rss_mb'),       # MB
+                'memory_peak_rss': process_memory.get('peak_rss_mb'),  # MB
+            }
+        
+        info['inference_mode'] = resolve_inference_mode(self.device)
+        # budget mémoire et temps de chargement des modèles partagés
+        info['model_registry'] = {
+            'budget': model_registry.memory_budget(),
+            'models': model_registry.stats()
+        }
+        # extracteurs utilisés et replis par type de document
+        from .extractor_registry import get_extractor_registry
+        info['extraction'] = get_extractor_registry().stats()
+        return info
 
 if __name__ == "__main__":
     analyzer = CVAnalyzer()
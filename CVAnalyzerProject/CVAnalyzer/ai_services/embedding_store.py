@@ -0,0 +1,228 @@
+"""
+Stockage persistant des embeddings de CV.
+
+Le CV ne change plus après l'upload : son embedding (document + fenêtres de
+tokens) est calculé une fois à l'ingestion, stocké en binaire float16/float32 dans
+CandidatureEmbedding, puis relu tel quel lors des calculs de correspondance.
+Une ligne n'est valide que pour le couple (modèle, version) courant.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .chunking import pool_windows
+from .config import ai_setting
+from .model_registry import DEFAULT_SENTENCE_MODEL
+
+# découpage utilisé pour les segments : fait partie de la version (un changement invalide les lignes)
+CHUNKING_SCHEME = 'tokens'
+
+
+def current_model_name() -> str:
+    return ai_setting('EMBEDDING_MODEL_NAME', DEFAULT_SENTENCE_MODEL)
+
+
+def current_model_version() -> str:
+    return f"{ai_setting('EMBEDDING_MODEL_VERSION', '1')}-{CHUNKING_SCHEME}"
+
+
+def storage_dtype() -> np.dtype:
+    return np.dtype(ai_setting('EMBEDDING_STORE_DTYPE', 'float16'))
+
+
+def encode_vectors(vectors: np.ndarray, dtype: np.dtype) -> bytes:
+    return np.ascontiguousarray(vectors, dtype=dtype).tobytes()
+
+
+def decode_vectors(raw, dimension: int, dtype: str) -> np.ndarray:
+    if not raw:
+        return np.zeros((0, dimension), dtype=np.float32)
+    # BinaryField peut renvoyer un memoryview selon le backend
+    array = np.frombuffer(bytes(raw), dtype=np.dtype(dtype))
+    return array.reshape(-1, dimension).astype(np.float32)
+
+
+class EmbeddingStore:
+    def __init__(self, analyzer=None):
+        self._analyzer = analyzer
+
+    @property
+    def analyzer(self):
+        if self._analyzer is None:
+            from .cv_analyzer import CVAnalyzer
+            self._analyzer = CVAnalyzer(model_name=current_model_name())
+        return self._analyzer
+
+    def encode_document(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Retourne (embedding du document, embeddings des fenêtres de tokens), normalisés"""
+        windows, info = self.analyzer.chunker.split_text(text)
+        if not windows:
+            raise ValueError('Texte vide : aucun embedding à calculer')
+
+        window_embeddings = self.analyzer.encode_texts(windows)
+        document_vector = pool_windows(window_embeddings, info['weights'])[0].cpu().numpy()
+        norm = np.linalg.norm(document_vector)
+        if norm > 0:
+            document_vector = document_vector / norm
+        return document_vector, window_embeddings.float().cpu().numpy()
+
+    def store(self, candidature, text: str):
+        """Calcule et enregistre les embeddings d'une candidature (à l'ingestion)"""
+        from ..models import CandidatureEmbedding
+
+        document_vector, chunk_vectors = self.encode_document(text)
+        dtype = storage_dtype()
+        embedding, _ = CandidatureEmbedding.objects.update_or_create(
+            candidature=candidature,
+            defaults={
+                'model_name': current_model_name(),
+                'model_version': current_model_version(),
+                'dimension': int(document_vector.shape[0]),
+                'dtype': dtype.name,
+                'vector': encode_vectors(document_vector, dtype),
+                'chunk_count': int(chunk_vectors.shape[0]),
+                'chunk_vectors': encode_vectors(chunk_vectors, dtype),
+            }
+        )
+
+        from .vector_index import candidature_index
+        candidature_index.add(candidature.id, document_vector)
+        return embedding
+
+    def store_many(self, candidatures, texts: List[str]) -> int:
+        """
+        Embeddings de candidatures nouvellement créées (import en masse) : les fenêtres
+        de tous les CV sont encodées en un seul appel, puis insérées par bulk_create.
+        """
+        from ..models import CandidatureEmbedding
+        from .vector_index import candidature_index
+
+        windows, weights, document_index, documents = [], [], [], []
+        for candidature, text in zip(candidatures, texts):
+            text_windows, info = self.analyzer.chunker.split_text(text)
+            if not text_windows:
+                continue
+            document_index.extend([len(documents)] * len(text_windows))
+            documents.append((candidature, len(windows), len(text_windows)))
+            windows.extend(text_windows)
+            weights.extend(info['weights'])
+        if not documents:
+            return 0
+
+        window_embeddings = self.analyzer.encode_texts(windows)
+        document_vectors = pool_windows(window_embeddings, weights, document_index, len(documents)).cpu().numpy()
+        norms = np.linalg.norm(document_vectors, axis=1, keepdims=True)
+        document_vectors = document_vectors / np.where(norms > 0, norms, 1)
+        chunk_vectors = window_embeddings.float().cpu().numpy()
+
+        dtype = storage_dtype()
+        rows = [
+            CandidatureEmbedding(
+                candidature=candidature,
+                model_name=current_model_name(),
+                model_version=current_model_version(),
+                dimension=int(document_vectors.shape[1]),
+                dtype=dtype.name,
+                vector=encode_vectors(document_vectors[position], dtype),
+                chunk_count=count,
+                chunk_vectors=encode_vectors(chunk_vectors[start:start + count], dtype),
+            )
+            for position, (candidature, start, count) in enumerate(documents)
+        ]
+        CandidatureEmbedding.objects.bulk_create(rows, batch_size=500)
+        for (candidature, _, _), vector in zip(documents, document_vectors):
+            candidature_index.add(candidature.id, vector)
+        return len(rows)
+
+    def copy_from_duplicate(self, candidature):
+        """
+        Réutilise l'embedding d'une autre candidature ayant exactement le même fichier CV
+        (même cv_hash) ; retourne None s'il n'y en a pas.
+        """
+        from ..models import CandidatureEmbedding
+
+        if not candidature.cv_hash:
+            return None
+        source = self._fresh_queryset().filter(
+            candidature__cv_hash=candidature.cv_hash
+        ).exclude(candidature_id=candidature.id).first()
+        if source is None:
+            return None
+
+        embedding, _ = CandidatureEmbedding.objects.update_or_create(
+            candidature=candidature,
+            defaults={
+                'model_name': source.model_name,
+                'model_version': source.model_version,
+                'dimension': source.dimension,
+                'dtype': source.dtype,
+                'vector': source.vector,
+                'chunk_count': source.chunk_count,
+                'chunk_vectors': source.chunk_vectors,
+            }
+        )
+
+        from .vector_index import candidature_index
+        candidature_index.add(candidature.id, decode_vectors(source.vector, source.dimension, source.dtype)[0])
+        return embedding
+
+    @staticmethod
+    def _fresh_queryset():
+        from ..models import CandidatureEmbedding
+        return CandidatureEmbedding.objects.filter(
+            model_name=current_model_name(),
+            model_version=current_model_version()
+        )
+
+    def get(self, candidature_id: int, with_chunks: bool = False):
+        """Embedding valide d'une candidature, ou None s'il est absent ou périmé"""
+        embedding = self._fresh_queryset().filter(candidature_id=candidature_id).first()
+        if embedding is None:
+            return None
+        vector = decode_vectors(embedding.vector, embedding.dimension, embedding.dtype)[0]
+        if with_chunks:
+            return vector, decode_vectors(embedding.chunk_vectors, embedding.dimension, embedding.dtype)
+        return vector
+
+    def get_many(self, candidature_ids: Iterable[int]) -> Dict[int, np.ndarray]:
+        rows = self._fresh_queryset().filter(
+            candidature_id__in=list(candidature_ids)
+        ).values_list('candidature_id', 'vector', 'dimension', 'dtype')
+        return {
+            candidature_id: decode_vectors(vector, dimension, dtype)[0]
+            for candidature_id, vector, dimension, dtype in rows
+        }
+
+    def get_or_compute(self, candidature, text: Optional[str] = None) -> Optional[np.ndarray]:
+        """Relit l'embedding stocké ; ne ré-encode que s'il manque ou est périmé"""
+        vector = self.get(candidature.id)
+        if vector is None and text:
+            self.store(candidature, text)
+            vector = self.get(candidature.id)
+        return vector
+
+    def score_candidatures(self, candidatures, job_descriptions: List[str]) -> Dict[str, any]:
+        """Correspondance candidatures x offres à partir des embeddings stockés (aucun CV ré-encodé)"""
+        candidatures = list(candidatures)
+        vectors = self.get_many(c.id for c in candidatures)
+        scored = [c for c in candidatures if c.id in vectors]
+        if not scored:
+            return {'error': 'Aucun embedding disponible pour ces candidatures'}
+
+        result = self.analyzer.score_embeddings_against_jobs(
+            np.stack([vectors[c.id] for c in scored]),
+            [c.competences_extraites if isinstance(c.competences_extraites, dict) else {} for c in scored],
+            job_descriptions
+        )
+        result['candidature_ids'] = [c.id for c in scored]
+        result['missing_ids'] = [c.id for c in candidatures if c.id not in vectors]
+        return result
+
+    def invalidate_stale(self) -> int:
+        """Supprime les embeddings calculés avec un autre modèle ou une autre version"""
+        from ..models import CandidatureEmbedding
+        deleted, _ = CandidatureEmbedding.objects.exclude(
+            model_name=current_model_name(),
+            model_version=current_model_version()
+        ).delete()
+        return deleted
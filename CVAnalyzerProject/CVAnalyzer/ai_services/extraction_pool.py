@@ -0,0 +1,224 @@
+"""
+Extraction de texte isolée dans un pool borné de sous-processus.
+
+Les CV déposés ne sont pas fiables : un PDF malformé ou énorme peut occuper
+un cœur ou faire exploser la mémoire de PyPDF2 / python-docx. Chaque document
+est donc extrait dans un worker séparé avec :
+- une limite d'espace d'adressage (RLIMIT_AS) posée à l'initialisation du worker ;
+- un délai par document : alarme dans le worker (arrêt propre du code Python),
+  puis arrêt forcé du pool par le parent si le worker ne rend pas la main ;
+- un recyclage des workers après N documents (fuites mémoire des parseurs).
+
+Un processus démon (enfant du pool prefork de Celery, là où tournent les
+analyses) ne peut pas créer d'enfants multiprocessing : chaque document y est
+extrait par un interpréteur lancé avec subprocess, qui pose lui-même la limite
+mémoire et que le parent abat à l'échéance. Un processus neuf par document
+tient lieu de recyclage ; au plus `processes` extractions simultanées.
+
+Les échecs sont renvoyés sous forme structurée (`error_code` : timeout,
+memory, crash, extraction) au lieu d'exceptions.
+"""
+import json
+import multiprocessing
+import resource
+import signal
+import subprocess
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Optional
+
+from .config import ai_setting
+from .extractor_registry import get_extractor_registry
+
+# marge laissée au worker pour s'arrêter seul avant l'arrêt forcé
+HARD_TIMEOUT_GRACE_S = 5.0
+
+# répertoire contenant le paquet CVAnalyzer (python -m depuis ce répertoire)
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+
+
+class ExtractionTimeout(BaseException):
+    # BaseException : ne doit pas être avalée par les `except Exception` des extracteurs
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise ExtractionTimeout()
+
+
+def _limit_worker_resources(memory_limit_bytes: Optional[int]):
+    if memory_limit_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def _extract_in_worker(file_path: str, timeout: float, options: Dict[str, any]) -> Dict[str, any]:
+    from .text_extractor import TextExtractor
+
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return TextExtractor.extract_text_from_file(file_path, **options)
+    except ExtractionTimeout:
+        return {'success': False, 'error_code': 'timeout',
+                'error': f"Extraction interrompue après {timeout:.0f}s"}
+    except MemoryError:
+        return {'success': False, 'error_code': 'memory',
+                'error': "Limite mémoire dépassée pendant l'extraction"}
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def can_spawn_processes() -> bool:
+    """False dans un processus démon (workers prefork de Celery) : multiprocessing y refuse les enfants"""
+    return not multiprocessing.current_process().daemon
+
+
+def _child_command():
+    return [sys.executable, '-m', __name__]
+
+
+def _run_child():
+    """Point d'entrée du sous-processus : requête JSON sur stdin, résultat JSON sur stdout"""
+    request = json.load(sys.stdin)
+    result_stream, sys.stdout = sys.stdout, sys.stderr  # les print() des extracteurs ne polluent pas le résultat
+    _limit_worker_resources(request['memory_limit_bytes'])
+    result = _extract_in_worker(request['file_path'], request['timeout'], request['options'])
+    json.dump(result, result_stream, default=str)
+
+
+class ExtractionPool:
+    def __init__(self, processes: Optional[int] = None, timeout: Optional[float] = None,
+                 memory_limit_mb: Optional[int] = None, max_tasks_per_child: Optional[int] = None):
+        self.processes = processes or ai_setting('EXTRACTION_POOL_PROCESSES', 2)
+        self.timeout = timeout or ai_setting('EXTRACTION_TIMEOUT', 30.0)
+        self.memory_limit_mb = memory_limit_mb or ai_setting('EXTRACTION_MEMORY_LIMIT_MB', 1024)
+        self.max_tasks_per_child = max_tasks_per_child or ai_setting('EXTRACTION_MAX_TASKS_PER_CHILD', 50)
+        self._executor = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._children = threading.BoundedSemaphore(self.processes)
+        self.stats = {'documents': 0, 'timeout': 0, 'memory': 0, 'crash': 0, 'restarts': 0, 'subprocess': 0}
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # forkserver : workers issus d'un processus propre (pas de copie de torch ni des threads)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('forkserver'),
+                    initializer=_limit_worker_resources,
+                    initargs=(self.memory_limit_mb * 1024 * 1024 if self.memory_limit_mb else None,),
+                    max_tasks_per_child=self.max_tasks_per_child
+                )
+            return self._executor, self._generation
+
+    def _restart(self, generation: int, kill: bool = False):
+        """Recrée le pool (une seule fois par génération si plusieurs appels échouent ensemble)"""
+        with self._lock:
+            if generation != self._generation or self._executor is None:
+                return
+            executor, self._executor = self._executor, None
+            self._generation += 1
+            self.stats['restarts'] += 1
+        if kill:
+            for process in list((executor._processes or {}).values()):
+                process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def extract(self, file_path: str, **options) -> Dict[str, any]:
+        """Même résultat que TextExtractor.extract_text_from_file, plus `error_code` en cas d'échec"""
+        self.stats['documents'] += 1
+        if not can_spawn_processes():
+            self.stats['subprocess'] += 1
+            return self._extract_in_subprocess(file_path, options)
+
+        for attempt in range(2):
+            try:
+                executor, generation = self._get_executor()
+                future = executor.submit(_extract_in_worker, file_path, self.timeout, options)
+                result = future.result(timeout=self.timeout + HARD_TIMEOUT_GRACE_S)
+            except FuturesTimeoutError:
+                # le worker est bloqué dans du code C : on abat le pool
+                self._restart(generation, kill=True)
+                return self._failure('timeout', f"Extraction interrompue après {self.timeout:.0f}s", file_path)
+            except BrokenProcessPool:
+                # pool abattu par un autre appel (timeout, crash d'un autre document) : on retente une fois
+                broken_by_other = generation != self._generation
+                self._restart(generation)
+                if broken_by_other and attempt == 0:
+                    continue
+                return self._failure('crash', "Le processus d'extraction s'est arrêté brutalement", file_path)
+            except Exception as e:
+                # pool impossible à créer ou à utiliser : échec structuré plutôt qu'une exception
+                return self._failure('crash', f"Pool d'extraction indisponible: {e}", file_path)
+
+            # les compteurs du worker sont perdus avec lui : on les reporte côté parent
+            get_extractor_registry().record(result)
+            return self._finish(result)
+
+        return self._failure('crash', "Le processus d'extraction s'est arrêté brutalement", file_path)
+
+    def _extract_in_subprocess(self, file_path: str, options: Dict[str, any]) -> Dict[str, any]:
+        request = json.dumps({
+            'file_path': file_path,
+            'timeout': self.timeout,
+            'options': options,
+            'memory_limit_bytes': self.memory_limit_mb * 1024 * 1024 if self.memory_limit_mb else None,
+        })
+        with self._children:
+            try:
+                child = subprocess.Popen(
+                    _child_command(), cwd=PROJECT_DIR,
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+                )
+            except OSError as e:
+                return self._failure('crash', f"Processus d'extraction impossible à lancer: {e}", file_path)
+            try:
+                output, errors = child.communicate(request.encode('utf-8'), timeout=self.timeout + HARD_TIMEOUT_GRACE_S)
+            except subprocess.TimeoutExpired:
+                # bloqué dans du code C : arrêt forcé
+                child.kill()
+                child.communicate()
+                return self._failure('timeout', f"Extraction interrompue après {self.timeout:.0f}s", file_path)
+
+        try:
+            result = json.loads(output)
+        except ValueError:
+            result = None
+        if result is not None:
+            get_extractor_registry().record(result)
+            return self._finish(result)
+        # pas de résultat : arrêt par signal, ou MemoryError hors des extracteurs
+        if b'MemoryError' in errors:
+            return self._failure('memory', "Limite mémoire dépassée pendant l'extraction", file_path)
+        detail = errors.decode('utf-8', 'replace').strip().splitlines()[-1:] or [f'code {child.returncode}']
+        return self._failure('crash', f"Le processus d'extraction s'est arrêté brutalement ({detail[0][:200]})",
+                             file_path)
+
+    def _finish(self, result: Dict[str, any]) -> Dict[str, any]:
+        if not result['success']:
+            result.setdefault('error_code', 'extraction')
+            if result['error_code'] in self.stats:
+                self.stats[result['error_code']] += 1
+        return result
+
+    def _failure(self, error_code: str, error: str, file_path: str) -> Dict[str, any]:
+        self.stats[error_code] += 1
+        return {'success': False, 'error_code': error_code, 'error': error, 'file_path': file_path}
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# pool partagé (créé au premier document)
+extraction_pool = ExtractionPool()
+
+
+if __name__ == '__main__':
+    _run_child()
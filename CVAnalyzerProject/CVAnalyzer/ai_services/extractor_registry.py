@@ -0,0 +1,366 @@
+"""
+Registre des extracteurs de texte, indexé par type MIME détecté.
+
+Le type est déterminé à partir des premiers octets du fichier (signature
+PDF, conteneur OLE d'un .doc Word 97-2003, archive ZIP d'un .docx) et non
+de l'extension. Chaque type a une chaîne d'extracteurs : le moins coûteux
+d'abord, les suivants seulement en cas d'échec. Les replis sont comptés.
+"""
+import re
+import struct
+import threading
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from .config import ai_setting
+from .text_normalizer import TextNormalizer
+
+MIME_PDF = 'application/pdf'
+MIME_DOC = 'application/msword'
+MIME_DOCX = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+MIME_TEXT = 'text/plain'
+# balisage reconnu pour être refusé : sans extracteur, le texte brut serait du code RTF / HTML
+MIME_RTF = 'application/rtf'
+MIME_HTML = 'text/html'
+
+OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+SNIFF_SIZE = 2048
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+def sniff_mime_type(file_path: str) -> Optional[str]:
+    """Type MIME d'après le contenu ; None si le format n'est pas reconnu"""
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_SIZE)
+
+    if head.startswith(b'%PDF-') or b'%PDF-' in head[:1024]:
+        return MIME_PDF
+    if head.startswith(OLE_SIGNATURE):
+        return MIME_DOC
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                if 'word/document.xml' in archive.namelist():
+                    return MIME_DOCX
+        except zipfile.BadZipFile:
+            return None
+        return None
+    markup = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if markup.startswith(b'{\\rtf'):
+        return MIME_RTF
+    if markup.startswith((b'<!doctype html', b'<html')) or (markup.startswith(b'<?xml') and b'<html' in markup):
+        return MIME_HTML
+    if head and b'\x00' not in head:
+        # texte brut : pas d'octet nul dans l'en-tête (UTF-8 ou latin-1)
+        return MIME_TEXT
+    return None
+
+
+# DOCX rapide : lecture directe de word/document.xml, sans construire l'objet python-docx
+
+def extract_docx_xml(file_path: str, max_chars: Optional[int] = None, **options) -> Dict[str, any]:
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open('word/document.xml') as document:
+            normalizer = TextNormalizer(max_chars)
+            paragraphs = 0
+            # iterparse : parcours en flux, les éléments traités sont libérés au fur et à mesure
+            for event, element in ElementTree.iterparse(document, events=('end',)):
+                tag = element.tag
+                if tag == WORD_NS + 't':
+                    normalizer.feed(element.text)
+                elif tag == WORD_NS + 'tab':
+                    normalizer.feed('\t')
+                elif tag in (WORD_NS + 'br', WORD_NS + 'cr'):
+                    normalizer.feed('\n')
+                elif tag == WORD_NS + 'p':
+                    normalizer.feed('\n')
+                    paragraphs += 1
+                    element.clear()
+                    if normalizer.full:
+                        break
+
+    return {
+        'success': True,
+        **normalizer.result(),
+        'paragraphs': paragraphs,
+        'file_type': 'docx'
+    }
+
+
+# DOC Word 97-2003 en Python pur : FIB -> table des pièces (CLX) -> texte du document principal
+
+_FIELD_CODE = re.compile('\x13[^\x13\x14\x15]*\x14([^\x13\x15]*)\x15|\x13[^\x13\x14\x15]*\x15')
+_DOC_CONTROL_CHARS = str.maketrans({
+    '\r': '\n', '\x0b': '\n', '\x0c': '\n', '\x07': '\t',
+    '\x1e': '-', '\x1f': None, '\x01': None, '\x08': None,
+})
+
+
+def _read_piece_table(word_stream: bytes, table_stream: bytes) -> Tuple[int, List[Tuple[int, int, int, bool]]]:
+    """Retourne (ccpText, [(cp_début, cp_fin, fc, compressé)]) à partir du FIB et du CLX"""
+    if struct.unpack_from('<H', word_stream, 0)[0] != 0xA5EC:
+        raise ValueError('Signature FIB Word invalide')
+    flags = struct.unpack_from('<H', word_stream, 0x0A)[0]
+    if flags & 0x0100:
+        raise ValueError('Document Word chiffré')
+
+    # FibBase (32 octets) puis fibRgW, fibRgLw et fibRgFcLcb de tailles variables
+    offset = 32
+    csw = struct.unpack_from('<H', word_stream, offset)[0]
+    offset += 2 + csw * 2
+    cslw = struct.unpack_from('<H', word_stream, offset)[0]
+    fib_rg_lw = offset + 2
+    ccp_text = struct.unpack_from('<i', word_stream, fib_rg_lw + 3 * 4)[0]
+    offset = fib_rg_lw + cslw * 4
+    fc_lcb = offset + 2
+    # fcClx / lcbClx : 34e couple de fibRgFcLcb97
+    fc_clx, lcb_clx = struct.unpack_from('<II', word_stream, fc_lcb + 33 * 8)
+
+    clx = table_stream[fc_clx:fc_clx + lcb_clx]
+    position = 0
+    while position < len(clx) and clx[position] == 0x01:
+        # Prc (propriétés) ignorés
+        cb_grpprl = struct.unpack_from('<h', clx, position + 1)[0]
+        position += 3 + cb_grpprl
+    if position >= len(clx) or clx[position] != 0x02:
+        raise ValueError('Table des pièces introuvable')
+    lcb = struct.unpack_from('<I', clx, position + 1)[0]
+    plc = clx[position + 5:position + 5 + lcb]
+
+    piece_count = (lcb - 4) // 12
+    cps = struct.unpack_from(f'<{piece_count + 1}I', plc, 0)
+    pieces = []
+    for index in range(piece_count):
+        fc_value = struct.unpack_from('<I', plc, (piece_count + 1) * 4 + index * 8 + 2)[0]
+        compressed = bool(fc_value & 0x40000000)
+        fc = fc_value & 0x3FFFFFFF
+        pieces.append((cps[index], cps[index + 1], fc // 2 if compressed else fc, compressed))
+    return ccp_text, pieces
+
+
+def extract_doc_ole(file_path: str, max_chars: Optional[int] = None, **options) -> Dict[str, any]:
+    import olefile
+
+    with olefile.OleFileIO(file_path) as ole:
+        word_stream = ole.openstream('WordDocument').read()
+        flags = struct.unpack_from('<H', word_stream, 0x0A)[0]
+        table_name = '1Table' if flags & 0x0200 else '0Table'
+        table_stream = ole.openstream(table_name).read()
+
+    ccp_text, pieces = _read_piece_table(word_stream, table_stream)
+    # marge pour les codes de champ retirés ensuite
+    budget = 2 * max_chars if max_chars else None
+    parts = []
+    for cp_start, cp_end, fc, compressed in pieces:
+        if cp_start >= ccp_text or (budget is not None and budget <= 0):
+            break
+        length = min(cp_end, ccp_text) - cp_start
+        if budget is not None:
+            length = min(length, budget)
+            budget -= length
+        if compressed:
+            parts.append(word_stream[fc:fc + length].decode('cp1252', errors='replace'))
+        else:
+            parts.append(word_stream[fc:fc + 2 * length].decode('utf-16-le', errors='replace'))
+
+    text = _FIELD_CODE.sub(lambda m: m.group(1) or '', ''.join(parts))
+    text = text.translate(_DOC_CONTROL_CHARS)
+    if max_chars:
+        text = text[:max_chars]
+    return {
+        'success': True,
+        'text': text.strip(),
+        'cleaned_text': TextNormalizer.clean(text),
+        'pieces': len(pieces),
+        'file_type': 'doc'
+    }
+
+
+_UTF16_RUN = re.compile(rb'(?:[\x20-\x7e\xa0-\xff\t\r\n]\x00){4,}')
+_CP1252_RUN = re.compile(rb'[\x20-\x7e\xa0-\xff\t\r\n]{4,}')
+_WORD = re.compile(r'[^\W\d_]{2,}')
+STRINGS_CHUNK_SIZE = 1024 * 1024
+STRINGS_MAX_RUN = 64 * 1024  # au-delà, une suite est rendue en plusieurs morceaux
+# présents dans tout conteneur OLE (répertoire, flux, informations de résumé) : ce n'est pas le texte du CV
+OLE_NAMES = frozenset({
+    'Root Entry', 'WordDocument', '0Table', '1Table', 'Data', 'ObjectPool', 'CompObj', 'Ole',
+    'SummaryInformation', 'DocumentSummaryInformation', 'MsoDataStore', 'Microsoft Word 97-2003 Document',
+    'Microsoft Office Word Document', 'Document Microsoft Word', 'MSWordDoc', 'Word.Document.8',
+    'Normal.dot', 'Normal.dotm',
+})
+# en dessous, les chaînes trouvées sont des métadonnées (polices, styles, auteur) et non un CV
+DOC_STRINGS_MIN_WORDS = 30
+
+
+def _iter_runs(file, pattern, decode):
+    """Suites imprimables du fichier, lu par blocs (une suite à cheval sur deux blocs est recollée)"""
+    file.seek(0)
+    carry = b''
+    while True:
+        chunk = file.read(STRINGS_CHUNK_SIZE)
+        data = carry + chunk
+        # octets de queue reportés : début possible d'une suite encore trop courte
+        keep = max(0, len(data) - 8)
+        for match in pattern.finditer(data):
+            if chunk and match.end() > len(data) - 8 and match.end() - match.start() < STRINGS_MAX_RUN:
+                # suite peut-être incomplète : reportée entière au bloc suivant
+                keep = match.start()
+                break
+            yield decode(match.group())
+            keep = max(keep, match.end())
+        if not chunk:
+            return
+        carry = data[keep:]
+
+
+def _is_filler(run: str) -> bool:
+    # remplissage des tables internes (ex. suites de 0xFF lues comme des "ÿ")
+    return max(map(run.count, set(run))) * 2 > len(run)
+
+
+def _readable_runs(file, pattern, decode, max_chars):
+    runs, total = [], 0
+    for run in _iter_runs(file, pattern, decode):
+        run = run.strip()
+        if not run or run in OLE_NAMES or _is_filler(run):
+            continue
+        runs.append(run)
+        total += len(run)
+        if max_chars and total >= max_chars:
+            break
+    return '\n'.join(runs)
+
+
+def extract_doc_strings(file_path: str, max_chars: Optional[int] = None, **options) -> Dict[str, any]:
+    """Dernier recours : suites de caractères imprimables (UTF-16 ou cp1252) du fichier brut"""
+    with open(file_path, 'rb') as f:
+        candidates = [
+            _readable_runs(f, _UTF16_RUN, lambda run: run.decode('utf-16-le'), max_chars),
+            _readable_runs(f, _CP1252_RUN, lambda run: run.decode('cp1252'), max_chars),
+        ]
+    # encodage retenu : celui qui donne le plus de mots
+    words, text = max((len(_WORD.findall(candidate)), candidate) for candidate in candidates)
+    if max_chars:
+        text = text[:max_chars]
+    if words < DOC_STRINGS_MIN_WORDS:
+        return {
+            'success': False,
+            'error': f'Aucun texte lisible trouvé ({words} mots hors métadonnées OLE)',
+            'file_type': 'doc'
+        }
+    return {
+        'success': True,
+        'text': text,
+        'cleaned_text': TextNormalizer.clean(text),
+        'file_type': 'doc'
+    }
+
+
+class ExtractorRegistry:
+    def __init__(self):
+        self._chains: Dict[str, List[Tuple[str, Callable]]] = {}
+        self._lock = threading.Lock()
+        self.metrics = {'documents': {}, 'fallbacks': {}, 'failures': {}}
+
+    def register(self, mime_type: str, name: str, extractor: Callable, fallback: bool = True):
+        """Ajoute un extracteur en fin de chaîne (fallback=False : en tête de chaîne)"""
+        chain = self._chains.setdefault(mime_type, [])
+        if fallback:
+            chain.append((name, extractor))
+        else:
+            chain.insert(0, (name, extractor))
+
+    def extractors_for(self, mime_type: str) -> List[str]:
+        return [name for name, _ in self._chains.get(mime_type, [])]
+
+    def extract(self, file_path: str, **options) -> Dict[str, any]:
+        mime_type = sniff_mime_type(file_path)
+        # même plafond de caractères pour tous les formats (PDF, DOCX, DOC, texte)
+        if options.get('max_chars') is None:
+            options['max_chars'] = ai_setting('PDF_MAX_CHARS')
+        chain = self._chains.get(mime_type)
+        if not chain:
+            return {
+                'success': False,
+                'error': f'Format de fichier non supporté: {mime_type or Path(file_path).suffix.lower()}',
+                'file_path': file_path
+            }
+
+        errors = []
+        result = None
+        for name, extractor in chain:
+            try:
+                result = extractor(file_path, **options)
+            except MemoryError:
+                raise
+            except Exception as e:
+                result = {'success': False, 'error': f'{name}: {e}'}
+            # un texte vide compte comme un échec : l'extracteur suivant peut faire mieux
+            if result.get('success') and result.get('text'):
+                break
+            errors.append(result.get('error') or f'{name}: aucun texte extrait')
+        else:
+            result = {
+                'success': False,
+                'error': ' ; '.join(errors),
+                'file_path': file_path
+            }
+            name = None
+
+        result['mime_type'] = mime_type
+        result['extractor'] = name
+        result['fallbacks'] = len(errors)
+        self.record(result)
+        return result
+
+    def record(self, result: Dict[str, any]):
+        """Met à jour les compteurs (appelé aussi côté parent pour les extractions faites en sous-processus)"""
+        mime_type = result.get('mime_type') or 'inconnu'
+        with self._lock:
+            documents = self.metrics['documents']
+            documents[mime_type] = documents.get(mime_type, 0) + 1
+            if result.get('fallbacks'):
+                fallbacks = self.metrics['fallbacks']
+                fallbacks[mime_type] = fallbacks.get(mime_type, 0) + result['fallbacks']
+            if not result.get('success'):
+                failures = self.metrics['failures']
+                failures[mime_type] = failures.get(mime_type, 0) + 1
+
+    def stats(self) -> Dict[str, any]:
+        with self._lock:
+            return {
+                'chains': {mime_type: self.extractors_for(mime_type) for mime_type in self._chains},
+                **{key: dict(value) for key, value in self.metrics.items()}
+            }
+
+
+def _build_default_registry() -> ExtractorRegistry:
+    from .text_extractor import TextExtractor
+
+    registry = ExtractorRegistry()
+    registry.register(MIME_PDF, 'pypdf2', lambda path, max_pages=None, max_chars=None, **options:
+                      TextExtractor.extract_from_pdf(path, max_pages, max_chars))
+    registry.register(MIME_DOCX, 'docx-xml', extract_docx_xml)
+    registry.register(MIME_DOCX, 'python-docx', lambda path, max_chars=None, **options:
+                      TextExtractor.extract_from_docx(path, max_chars))
+    registry.register(MIME_DOC, 'ole-piece-table', extract_doc_ole)
+    registry.register(MIME_DOC, 'doc-strings', extract_doc_strings)
+    registry.register(MIME_TEXT, 'text', lambda path, max_chars=None, **options:
+                      TextExtractor.extract_from_txt(path, max_chars))
+    return registry
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_extractor_registry() -> ExtractorRegistry:
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = _build_default_registry()
+    return _default_registry
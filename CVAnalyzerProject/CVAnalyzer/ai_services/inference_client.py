@@ -0,0 +1,99 @@
+"""
+Client léger du service d'inférence (voir inference_server.py).
+
+N'importe ni torch ni transformers : les workers Django qui passent par le
+service restent légers. Une session requests par processus garde un pool de
+connexions keep-alive ; chaque appel a un délai de connexion et de lecture.
+"""
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import ai_setting
+from .micro_batcher import InferenceOverloaded
+
+
+class InferenceServiceError(Exception):
+    """Service injoignable ou réponse en erreur"""
+
+
+class InferenceClient:
+    def __init__(self, base_url: str, connect_timeout: float = None, read_timeout: float = None,
+                 pool_size: int = None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (
+            connect_timeout or ai_setting('AI_INFERENCE_CONNECT_TIMEOUT', 1.0),
+            read_timeout or ai_setting('AI_INFERENCE_READ_TIMEOUT', 30.0),
+        )
+        self.pool_size = pool_size or ai_setting('AI_INFERENCE_POOL_SIZE', 20)
+        self._session = None
+        self._pid = None
+
+    @property
+    def session(self) -> requests.Session:
+        # une session par processus : les sockets d'un pool ne doivent pas être partagés après un fork
+        if self._pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session, self._pid = session, os.getpid()
+        return self._session
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = self.session.post(f'{self.base_url}{path}', json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise InferenceServiceError(f"Service d'inférence injoignable: {e}") from e
+
+        if response.status_code == 503:
+            raise InferenceOverloaded(response.json().get('error', "Service d'inférence saturé"))
+        try:
+            body = response.json()
+        except ValueError:
+            raise InferenceServiceError(f"Réponse invalide du service d'inférence ({response.status_code})")
+        if not response.ok or not body.get('success'):
+            raise InferenceServiceError(body.get('error') or f'Erreur {response.status_code}')
+        return body
+
+    def encode_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._post('/encode', {'texts': list(texts)})['embeddings']
+
+    def predict(self, cv_text: str) -> Dict[str, Any]:
+        return self._post('/predict', {'cv_text': cv_text})['prediction']
+
+    def score_cv_for_job(self, cv_text: str, job_description: str, target_category: str = None) -> Dict[str, Any]:
+        return self._post('/score-job', {
+            'cv_text': cv_text,
+            'job_description': job_description,
+            'target_category': target_category,
+        })['scoring']
+
+    def analyze(self, text: str) -> Dict[str, Any]:
+        return self._post('/analyze', {'text': text})['analysis']
+
+    def health(self) -> Dict[str, Any]:
+        try:
+            return self.session.get(f'{self.base_url}/health', timeout=self.timeout).json()
+        except (requests.RequestException, ValueError) as e:
+            raise InferenceServiceError(f"Service d'inférence injoignable: {e}") from e
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_inference_client() -> Optional[InferenceClient]:
+    """Client partagé si AI_INFERENCE_URL est configuré ; None = inférence dans le processus"""
+    global _client
+    base_url = ai_setting('AI_INFERENCE_URL')
+    if not base_url:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = InferenceClient(base_url)
+    return _client
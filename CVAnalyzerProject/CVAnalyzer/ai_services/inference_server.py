@@ -0,0 +1,182 @@
+"""
+Service d'inférence dédié : un processus longue durée qui porte les modèles
+(CVAnalyzer, AIModelTrainer) et répond en JSON sur HTTP local.
+
+Les workers Django n'embarquent plus les modèles : ils appellent ce service
+(InferenceClient). Les requêtes de tous les workers arrivent dans le même
+processus et sont regroupées par les micro-batchers, ce qui permet de
+dimensionner séparément le tier web et le tier d'inférence.
+
+    python manage.py run_inference_server --port 8500
+"""
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict
+
+from .config import ai_setting
+from .micro_batcher import InferenceOverloaded, MicroBatcher
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+class RequestError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class InferenceService:
+    """Modèles et micro-batchers du service, chargés une fois au démarrage"""
+
+    def __init__(self):
+        from .ai_trainer import get_trainer
+        from .cv_analyzer import CVAnalyzer, convert_numpy_types
+
+        self.analyzer = CVAnalyzer()
+        self.trainer = get_trainer()
+        self._convert = convert_numpy_types
+        # encodage des requêtes de recherche : un passage du Sentence Transformer pour plusieurs workers
+        self.encode_batcher = MicroBatcher(self._encode_batch, name='encode')
+
+    def warm(self) -> Dict[str, Any]:
+        return {
+            'sentence_model': self.analyzer.sentence_model is not None,
+            'ner': self.analyzer.ner_pipeline is not None,
+            'classifier': self.trainer.ensure_model(),
+        }
+
+    def _encode_batch(self, texts):
+        return self.analyzer.encode_documents(list(texts)).float().cpu().tolist()
+
+    def encode(self, payload):
+        texts = payload.get('texts')
+        if not isinstance(texts, list) or not texts:
+            raise RequestError('texts requis (liste non vide)')
+        timeout = ai_setting('AI_BATCH_TIMEOUT', 30)
+        # chaque texte rejoint le batch en cours : les requêtes concurrentes partagent les passages
+        futures = []
+        try:
+            for text in texts:
+                futures.append(self.encode_batcher.submit(str(text)))
+            # délai global de la requête, pas par texte
+            deadline = time.monotonic() + timeout
+            embeddings = [future.result(timeout=max(0.0, deadline - time.monotonic())) for future in futures]
+        except (TimeoutError, InferenceOverloaded) as e:
+            # textes encore en file : retirés des prochains batchs, la requête est abandonnée
+            for future in futures:
+                future.cancel()
+            if isinstance(e, InferenceOverloaded):
+                raise
+            raise RequestError(f"Encodage non terminé après {timeout}s", status=504)
+        return {'embeddings': embeddings}
+
+    def predict(self, payload):
+        cv_text = payload.get('cv_text')
+        if not cv_text:
+            raise RequestError('cv_text requis')
+        return {'prediction': self._convert(self.trainer.predict(cv_text))}
+
+    def score_job(self, payload):
+        cv_text, job_description = payload.get('cv_text'), payload.get('job_description')
+        if not cv_text or not job_description:
+            raise RequestError('cv_text et job_description requis')
+        scoring = self.trainer.score_cv_for_job(cv_text, job_description, payload.get('target_category'))
+        return {'scoring': self._convert(scoring)}
+
+    def analyze(self, payload):
+        text = payload.get('text')
+        if not text:
+            raise RequestError('text requis')
+        return {'analysis': self._convert(self.analyzer.extract_text_from_cv(text))}
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'models': {
+                'sentence_model': self.analyzer.sentence_model is not None,
+                'ner': self.analyzer.ner_pipeline is not None,
+                'classifier': self.trainer.model is not None,
+            },
+            'batching': {
+                'encode': self.encode_batcher.get_stats(),
+                **self.trainer.batching_stats(),
+            },
+            'device': str(self.analyzer.device),
+        }
+
+    def routes(self) -> Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]:
+        return {
+            '/encode': self.encode,
+            '/predict': self.predict,
+            '/score-job': self.score_job,
+            '/analyze': self.analyze,
+        }
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    # keep-alive : les clients réutilisent leurs connexions (pool requests.Session)
+    protocol_version = 'HTTP/1.1'
+    service: InferenceService = None
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Dict[str, str] = None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, self.service.health())
+        else:
+            self._send_json(404, {'success': False, 'error': 'Route inconnue'})
+
+    def do_POST(self):
+        handler = self.service.routes().get(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(413, {'success': False, 'error': 'Requête trop volumineuse'})
+            return
+        body = self.rfile.read(length)
+        if handler is None:
+            self._send_json(404, {'success': False, 'error': 'Route inconnue'})
+            return
+
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError as e:
+            self._send_json(400, {'success': False, 'error': f'JSON invalide: {e}'})
+            return
+        if not isinstance(payload, dict):
+            self._send_json(400, {'success': False, 'error': 'Objet JSON attendu'})
+            return
+
+        try:
+            self._send_json(200, {'success': True, **handler(payload)})
+        except InferenceOverloaded as e:
+            self._send_json(503, {'success': False, 'error': str(e)}, {'Retry-After': '1'})
+        except RequestError as e:
+            self._send_json(e.status, {'success': False, 'error': str(e)})
+        except Exception as e:
+            self._send_json(500, {'success': False, 'error': str(e)})
+
+    def log_message(self, format, *args):
+        # pas une ligne par requête sur stderr ; les erreurs passent par les réponses
+        pass
+
+
+def serve(host: str = '127.0.0.1', port: int = 8500, warm: bool = True) -> ThreadingHTTPServer:
+    service = InferenceService()
+    if warm:
+        print(f"Modèles du service d'inférence: {service.warm()}")
+
+    handler = type('BoundInferenceRequestHandler', (InferenceRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"🚀 Service d'inférence à l'écoute sur http://{host}:{port}")
+    return server
@@ -0,0 +1,106 @@
+"""
+Regroupement dynamique des requêtes d'inférence (micro-batching).
+
+Les threads de requête déposent leur entrée dans une file bornée et
+attendent un Future. Un thread dédié prend la première entrée, attend au
+plus `max_wait_ms` (ou `max_batch_size` entrées), exécute un seul passage
+batché puis redistribue les résultats. Sous charge, les batchs grossissent
+et le débit suit ; quand la file est pleine, la requête est refusée
+immédiatement (InferenceOverloaded) au lieu d'allonger l'attente de tous.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+from .config import ai_setting
+
+
+class InferenceOverloaded(Exception):
+    """File d'inférence pleine : à traduire en 503 côté HTTP"""
+
+
+class MicroBatcher:
+    def __init__(self, process_batch: Callable[[Sequence[Any]], List[Any]], name: str = 'inference',
+                 max_batch_size: int = None, max_wait_ms: float = None, max_queue_size: int = None):
+        self.process_batch = process_batch
+        self.name = name
+        self.max_batch_size = max_batch_size or ai_setting('AI_BATCH_MAX_SIZE', 16)
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else ai_setting('AI_BATCH_MAX_WAIT_MS', 5)) / 1000
+        self.max_queue_size = max_queue_size or ai_setting('AI_BATCH_QUEUE_SIZE', 256)
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+        self.stats = {'batches': 0, 'items': 0, 'rejected': 0, 'errors': 0, 'max_batch': 0}
+
+    def _ensure_worker(self):
+        # thread et file recréés après un fork (workers gunicorn créés depuis un maître préchargé)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue_size)
+                worker = threading.Thread(target=self._run, args=(self._queue,),
+                                          name=f'micro-batcher-{self.name}', daemon=True)
+                worker.start()
+                self._pid = os.getpid()
+
+    def submit(self, item: Any) -> Future:
+        self._ensure_worker()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            self.stats['rejected'] += 1
+            raise InferenceOverloaded(f"File d'inférence '{self.name}' pleine ({self.max_queue_size} requêtes en attente)")
+        return future
+
+    def run(self, item: Any, timeout: float = None) -> Any:
+        """Soumet une entrée et attend son résultat (dans le batch où elle a été regroupée)"""
+        timeout = timeout if timeout is not None else ai_setting('AI_BATCH_TIMEOUT', 30)
+        future = self.submit(item)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            # encore en file : retiré du prochain batch
+            future.cancel()
+            raise
+
+    def _collect(self, pending: queue.Queue) -> list:
+        batch = [pending.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, pending: queue.Queue):
+        while True:
+            batch = self._collect(pending)
+            # requêtes abandonnées (délai dépassé côté appelant) : pas de calcul pour rien
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self.process_batch([item for item, _ in batch])
+            except Exception as e:
+                self.stats['errors'] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            self.stats['batches'] += 1
+            self.stats['items'] += len(batch)
+            self.stats['max_batch'] = max(self.stats['max_batch'], len(batch))
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['queued'] = self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0
+        stats['avg_batch'] = round(stats['items'] / stats['batches'], 2) if stats['batches'] else 0.0
+        return stats
@@ -0,0 +1,131 @@
+"""
+Artefact du classifieur de CV sur disque et chargement en mémoire partagée.
+
+Un artefact est un répertoire :
+- model.safetensors : poids (format sans pickle) ;
+- label_classes.json : classes du LabelEncoder, dans l'ordre des sorties ;
+- config.json : nom du modèle de base, nombre de classes, métriques ;
+- encoder/ : configuration du transformer (reconstruction sans téléchargement) ;
+- tokenizer/ : tokenizer utilisé à l'entraînement.
+
+Au chargement, le fichier de poids est projeté en mémoire (mmap copy-on-write)
+et les paramètres du modèle pointent directement sur ces pages : tous les
+workers qui chargent le même artefact partagent le cache de pages du noyau au
+lieu de garder chacun une copie des poids. Les buffers non persistants (absents
+du state_dict, ex: position_ids) sont aussi enregistrés pour que le modèle
+puisse être construit sur le device 'meta', sans aucune allocation.
+"""
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Callable, Dict
+
+import torch
+import torch.nn as nn
+
+WEIGHTS_FILE = 'model.safetensors'
+LABELS_FILE = 'label_classes.json'
+CONFIG_FILE = 'config.json'
+ENCODER_DIR = 'encoder'
+TOKENIZER_DIR = 'tokenizer'
+
+_SAFETENSORS_DTYPES = {
+    'F64': torch.float64, 'F32': torch.float32, 'F16': torch.float16, 'BF16': torch.bfloat16,
+    'I64': torch.int64, 'I32': torch.int32, 'I16': torch.int16, 'I8': torch.int8,
+    'U8': torch.uint8, 'BOOL': torch.bool,
+}
+
+
+def artifact_exists(directory) -> bool:
+    directory = Path(directory)
+    return all((directory / name).exists() for name in (WEIGHTS_FILE, LABELS_FILE, CONFIG_FILE))
+
+
+def save_artifact(directory, model: nn.Module, label_classes, tokenizer, config: Dict[str, any]):
+    """Écrit l'artefact dans un répertoire temporaire puis le met en place (remplacement atomique des fichiers)"""
+    from safetensors.torch import save_file
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    # state_dict + buffers non persistants : de quoi reconstruire le modèle depuis le device 'meta'
+    tensors = {**dict(model.named_buffers()), **model.state_dict()}
+    state_dict = {name: tensor.detach().cpu().contiguous() for name, tensor in tensors.items()}
+    tmp_weights = directory / f'{WEIGHTS_FILE}.tmp'
+    save_file(state_dict, str(tmp_weights))
+
+    model.bert.config.save_pretrained(directory / ENCODER_DIR)
+    tokenizer.save_pretrained(directory / TOKENIZER_DIR)
+    _write_json(directory / LABELS_FILE, [str(label) for label in label_classes])
+    _write_json(directory / CONFIG_FILE, config)
+    # les poids en dernier : un artefact n'est complet (artifact_exists) qu'une fois tout écrit
+    os.replace(tmp_weights, directory / WEIGHTS_FILE)
+
+
+def _write_json(path: Path, data):
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_json(directory, name):
+    with open(Path(directory) / name, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_safetensors_mmap(path) -> Dict[str, torch.Tensor]:
+    """
+    Tenseurs d'un fichier safetensors adossés à un mmap copy-on-write du fichier :
+    aucune copie en mémoire anonyme tant que les poids ne sont pas modifiés.
+    """
+    with open(path, 'rb') as f:
+        header_size = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(header_size))
+        # ACCESS_COPY : mapping privé inscriptible (torch.frombuffer refuse les tampons en lecture seule)
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    data_start = 8 + header_size
+    tensors = {}
+    for name, info in header.items():
+        if name == '__metadata__':
+            continue
+        dtype = _SAFETENSORS_DTYPES[info['dtype']]
+        start, end = info['data_offsets']
+        count = (end - start) // torch.empty((), dtype=dtype).element_size()
+        if count == 0:
+            tensors[name] = torch.empty(info['shape'], dtype=dtype)
+            continue
+        tensor = torch.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + start)
+        tensors[name] = tensor.view(info['shape'])
+    return tensors
+
+
+def build_from_artifact(build: Callable[[], nn.Module], weights_path) -> nn.Module:
+    """
+    Modèle dont les paramètres et buffers sont les tenseurs projetés en mémoire.
+    `build` est appelé sous `torch.device('meta')` (propre au thread courant) : aucune
+    mémoire réelle n'est allouée. Artefact antérieur sans les buffers non persistants :
+    construction normale, puis remplacement des poids.
+    """
+    tensors = load_safetensors_mmap(weights_path)
+    with torch.device('meta'):
+        model = build()
+    persistent = set(model.state_dict())
+    non_persistent = {name for name, _ in model.named_buffers()} - persistent
+    if not non_persistent.issubset(tensors):
+        model = build()
+        non_persistent = set()
+
+    # strict : un poids manquant dans le fichier est une erreur, pas une initialisation aléatoire
+    model.load_state_dict({name: tensor for name, tensor in tensors.items() if name in persistent}, assign=True)
+    for name in non_persistent:
+        module_name, _, buffer_name = name.rpartition('.')
+        model.get_submodule(module_name)._buffers[buffer_name] = tensors[name]
+
+    missing = [name for name, tensor in [*model.named_parameters(), *model.named_buffers()] if tensor.is_meta]
+    if missing:
+        raise ValueError(f"Artefact incomplet, tenseurs absents: {', '.join(missing[:5])}")
+    return model
@@ -0,0 +1,195 @@
+"""
+Registre des modèles IA partagé à l'échelle du processus.
+
+Chaque modèle (Sentence Transformer, pipeline NER, ...) est chargé une seule
+fois par worker puis partagé entre toutes les requêtes et tous les threads.
+"""
+import os
+import resource
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import torch
+
+from .config import ai_setting
+from .quantization import quantize_model, resolve_inference_mode
+
+DEFAULT_SENTENCE_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+DEFAULT_NER_MODEL = 'dbmdz/bert-large-cased-finetuned-conll03-english'
+
+
+def current_ner_model_name() -> str:
+    return ai_setting('NER_MODEL_NAME', DEFAULT_NER_MODEL)
+
+
+def get_process_memory_mb() -> Dict[str, float]:
+    """Mémoire du processus courant (équivalent CPU des compteurs GPU)"""
+    info = {
+        # ru_maxrss est en Ko sous Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+    try:
+        with open('/proc/self/status', 'r') as status_file:
+            for line in status_file:
+                if line.startswith('VmRSS:'):
+                    info['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+                    break
+    except OSError:
+        pass
+    return info
+
+
+def _tensor_bytes(value, seen) -> int:
+    if isinstance(value, (tuple, list)):
+        # poids int8 empaquetés des couches quantifiées : (poids, biais)
+        return sum(_tensor_bytes(item, seen) for item in value)
+    if not torch.is_tensor(value) or value.device.type == 'meta':
+        return 0
+    pointer = value.data_ptr()
+    if pointer in seen:
+        return 0
+    seen.add(pointer)
+    return value.numel() * value.element_size()
+
+
+def _count_parameters_mb(model) -> float:
+    """Taille approximative des poids d'un modèle en Mo (couches quantifiées int8 comprises)"""
+    if model is None or not hasattr(model, 'state_dict'):
+        return 0.0
+    seen = set()
+    total = sum(_tensor_bytes(value, seen) for value in model.state_dict().values())
+    return round(total / 1024**2, 1)
+
+
+class ModelRegistry:
+    """
+    Cache process-wide des modèles, protégé par verrou.
+
+    Les modèles sont identifiés par une clé (type, nom, device) : deux
+    CVAnalyzer du même worker récupèrent exactement la même instance.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def _make_key(kind: str, name: str, device: torch.device) -> str:
+        return f"{kind}:{name}@{device.type}"
+
+    def _record_hit(self, key: str):
+        stats = self._stats.get(key)
+        if stats is not None:
+            stats['hits'] += 1
+
+    def _get_or_load(self, key: str, loader: Callable[[], Any], weights: Callable[[Any], Any]) -> Any:
+        model = self._models.get(key)
+        if model is not None:
+            self._record_hit(key)
+            return model
+
+        # un verrou par clé : deux threads ne chargent jamais le même modèle en double,
+        # mais le chargement d'un modèle ne bloque pas l'accès aux autres
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._record_hit(key)
+                return model
+
+            rss_before = get_process_memory_mb().get('rss_mb')
+            start = time.perf_counter()
+            model = loader()
+            load_time = time.perf_counter() - start
+            rss_after = get_process_memory_mb().get('rss_mb')
+
+            self._stats[key] = {
+                'load_time_s': round(load_time, 3),
+                'weights_mb': _count_parameters_mb(weights(model)),
+                'rss_delta_mb': round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None,
+                'loaded_at': time.time(),
+                'hits': 0,
+            }
+            self._models[key] = model
+            print(f"📦 Modèle chargé dans le registre: {key} ({load_time:.2f}s)")
+            return model
+
+    def get_sentence_model(self, model_name: str = DEFAULT_SENTENCE_MODEL, device: Optional[torch.device] = None):
+        device = device or torch.device('cpu')
+        key = self._make_key('sentence', model_name, device)
+        def load():
+            # import différé : transformers / sentence_transformers ne sont chargés qu'avec le premier modèle
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(model_name, device=device)
+
+        return self._get_or_load(
+            key,
+            load,
+            lambda model: model
+        )
+
+    def get_ner_pipeline(self, model_name: str = DEFAULT_NER_MODEL, device: Optional[torch.device] = None,
+                         mode: Optional[str] = None):
+        device = device or torch.device('cpu')
+        mode = resolve_inference_mode(device, mode)
+        key = self._make_key('ner', model_name, device)
+        if mode != 'fp32':
+            key = f"{key}#{mode}"
+
+        def load():
+            from transformers import pipeline
+            ner = pipeline("ner",
+                           model=model_name,
+                           aggregation_strategy="simple",
+                           device=0 if device.type == 'cuda' else -1,  # 0 pour GPU, -1 pour CPU
+                           torch_dtype=torch.float16 if device.type == 'cuda' else torch.float32)
+            if mode == 'int8':
+                quantize_model(ner.model)
+            return ner
+
+        return self._get_or_load(key, load, lambda ner: getattr(ner, 'model', None))
+
+    def warm(self, sentence_model: str = DEFAULT_SENTENCE_MODEL, ner_model: str = DEFAULT_NER_MODEL,
+             device: Optional[torch.device] = None) -> Dict[str, Dict[str, Any]]:
+        """Précharge les modèles par défaut (au démarrage d'un worker par exemple)"""
+        self.get_sentence_model(sentence_model, device)
+        self.get_ner_pipeline(ner_model, device)
+        return self.stats()
+
+    def evict(self, key: Optional[str] = None) -> int:
+        """Libère un modèle (ou tous si key est None) ; retourne le nombre de modèles évincés"""
+        with self._lock:
+            keys = [key] if key else list(self._models.keys())
+            evicted = 0
+            for model_key in keys:
+                if self._models.pop(model_key, None) is not None:
+                    self._stats.pop(model_key, None)
+                    evicted += 1
+
+        if evicted and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        return evicted
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self._models
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {key: dict(values) for key, values in self._stats.items()}
+
+    def memory_budget(self) -> Dict[str, Any]:
+        """Résumé mémoire du registre : poids chargés et mémoire du processus"""
+        return {
+            'models_loaded': len(self._models),
+            'weights_mb': round(sum(s['weights_mb'] for s in self._stats.values()), 1),
+            'process': get_process_memory_mb(),
+            'pid': os.getpid(),
+        }
+
+
+# instance unique partagée par tout le processus
+model_registry = ModelRegistry()
@@ -0,0 +1,57 @@
+"""
+Préchargement des modèles dans le processus maître de gunicorn (avant fork).
+
+Les workers héritent des poids par copy-on-write : tant qu'ils ne les
+modifient pas (inférence seule, requires_grad désactivé), les pages restent
+partagées et la mémoire totale ne croît plus avec le nombre de workers.
+Après le chargement, gc.freeze() sort les objets existants du suivi du
+ramasse-miettes : ses passes ne réécrivent plus leurs en-têtes, ce qui
+dupliquerait les pages dans chaque worker.
+"""
+import gc
+import time
+from typing import Any, Dict
+
+import torch
+
+from .config import ai_setting
+from .model_registry import get_process_memory_mb, model_registry
+
+
+def _freeze_weights(model):
+    if model is None or not hasattr(model, 'parameters'):
+        return
+    model.eval()
+    model.requires_grad_(False)
+
+
+def preload_models() -> Dict[str, Any]:
+    """Charge les modèles partagés (CPU uniquement : un contexte CUDA ne survit pas au fork)"""
+    if torch.cuda.is_available():
+        print("⚠️  Préchargement ignoré : GPU détecté, chaque worker charge ses modèles")
+        return {'preloaded': False, 'reason': 'cuda'}
+
+    start = time.perf_counter()
+    cpu = torch.device('cpu')
+    sentence_model = model_registry.get_sentence_model(device=cpu)
+    ner = model_registry.get_ner_pipeline(device=cpu)
+    _freeze_weights(sentence_model)
+    _freeze_weights(getattr(ner, 'model', None))
+
+    classifier_loaded = False
+    if ai_setting('AI_PRELOAD_CLASSIFIER', True):
+        from .ai_trainer import get_trainer
+        # le classifieur (artefact projeté en mémoire) est aussi construit une seule fois, dans le maître
+        classifier_loaded = get_trainer().ensure_model()
+
+    gc.collect()
+    gc.freeze()
+    elapsed = time.perf_counter() - start
+    print(f"📦 Modèles préchargés dans le maître en {elapsed:.1f}s "
+          f"(RSS {get_process_memory_mb().get('rss_mb')} Mo, {gc.get_freeze_count()} objets gelés)")
+    return {
+        'preloaded': True,
+        'seconds': round(elapsed, 2),
+        'classifier': classifier_loaded,
+        'models': model_registry.stats(),
+    }
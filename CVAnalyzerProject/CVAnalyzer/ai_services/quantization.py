@@ -0,0 +1,67 @@
+"""
+Mode d'inférence des modèles (fp32 ou int8) et quantification dynamique.
+
+Sur les nœuds CPU, les couches linéaires du classifieur et du modèle NER
+dominent latence et mémoire. En mode int8, leurs poids sont quantifiés en
+int8 au chargement (quantize_dynamic : activations quantifiées à la volée,
+sans calibration) ; embeddings et normalisations restent en fp32. Le mode
+est choisi par déploiement (AI_INFERENCE_MODE) et ne s'applique qu'au CPU.
+"""
+import io
+import time
+from typing import Callable, Dict, Optional
+
+import torch
+import torch.nn as nn
+
+from .config import ai_setting
+
+INFERENCE_MODES = ('fp32', 'int8')
+
+
+def resolve_inference_mode(device: Optional[torch.device] = None, mode: Optional[str] = None) -> str:
+    """Mode effectif : int8 uniquement sur CPU (les noyaux int8 dynamiques n'existent pas sur GPU)"""
+    mode = (mode or ai_setting('AI_INFERENCE_MODE', 'fp32')).lower()
+    if mode not in INFERENCE_MODES:
+        raise ValueError(f"Mode d'inférence inconnu: {mode} (attendu: {', '.join(INFERENCE_MODES)})")
+    if device is not None and device.type != 'cpu':
+        return 'fp32'
+    return mode
+
+
+def quantize_model(model: nn.Module, inplace: bool = True) -> nn.Module:
+    """
+    Quantification dynamique int8 des nn.Linear. En place par défaut : les
+    poids fp32 remplacés sont libérés (ou, pour un artefact projeté en mémoire,
+    ne sont plus lus) au lieu d'être copiés.
+    """
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8, inplace=inplace)
+
+
+def model_size_mb(model: nn.Module) -> float:
+    """Taille sérialisée du state_dict (compte aussi les poids int8 empaquetés, absents de parameters())"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return round(buffer.tell() / 1024**2, 1)
+
+
+def time_calls(function: Callable[[], any], repeat: int = 5) -> float:
+    """Latence médiane en ms (un appel de chauffe non compté)"""
+    function()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return round(timings[len(timings) // 2] * 1000, 2)
+
+
+def accuracy_delta(fp32_metrics: Dict[str, float], int8_metrics: Dict[str, float]) -> Dict[str, float]:
+    """Écarts int8 - fp32 des métriques scalaires (f1, précision, rappel)"""
+    return {
+        key: round(int8_metrics[key] - fp32_metrics[key], 4)
+        for key in ('f1', 'precision', 'recall')
+        if key in fp32_metrics and key in int8_metrics
+    }
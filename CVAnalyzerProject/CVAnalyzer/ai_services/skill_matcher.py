@@ -0,0 +1,136 @@
+"""
+Détection des compétences en une seule passe sur le texte.
+
+Tous les mots-clés sont compilés une fois dans une expression régulière en
+forme de trie : le coût de recherche dépend de la longueur du texte et de la
+profondeur du trie, pas du nombre de mots-clés du dictionnaire.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_WORD_CHAR = re.compile(r'\w')
+
+
+def _is_word_char(char: str) -> bool:
+    return bool(_WORD_CHAR.match(char))
+
+
+def _build_trie_pattern(words: Iterable[str]) -> str:
+    """Construit une regex de trie (pas d'alternance linéaire sur les mots-clés)"""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}  # marqueur de fin de mot-clé
+
+    def render(node: Dict[str, dict]) -> str:
+        terminal = '' in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+        # les branches du trie commencent toutes par un caractère différent, le moteur
+        # explore donc le chemin le plus long d'abord puis recule si \b échoue
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if terminal else group
+
+    return render(trie)
+
+
+class SkillMatcher:
+    """
+    Matcher précompilé équivalent à un re.search(r'\\b<mot-clé>\\b') par mot-clé,
+    mais en un seul parcours du texte.
+    """
+
+    def __init__(self, skills_keywords: Dict[str, List[str]], aliases: Optional[Dict[str, str]] = None):
+        self.categories = list(skills_keywords.keys())
+        # mot-clé en minuscules -> [(catégorie, position dans la catégorie, libellé)]
+        self._owners: Dict[str, List[Tuple[str, int, str]]] = {}
+
+        for category, skills_list in skills_keywords.items():
+            for position, skill in enumerate(skills_list):
+                keyword = skill.lower()
+                if keyword:
+                    self._owners.setdefault(keyword, []).append((category, position, skill))
+
+        # un alias (ex: "k8s") renvoie vers la compétence canonique ("kubernetes")
+        for alias, canonical in (aliases or {}).items():
+            alias_keyword = alias.lower()
+            owners = self._owners.get(canonical.lower())
+            if alias_keyword and owners and alias_keyword not in self._owners:
+                self._owners[alias_keyword] = owners
+
+        self._prefixes = self._compute_boundary_prefixes(self._owners.keys())
+
+        if self._owners:
+            trie_pattern = _build_trie_pattern(self._owners.keys())
+            # lookahead : les correspondances qui se chevauchent sont toutes trouvées
+            self._pattern = re.compile(r'\b(?=(' + trie_pattern + r')\b)')
+        else:
+            self._pattern = None
+
+    @staticmethod
+    def _compute_boundary_prefixes(keywords: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Pour chaque mot-clé, liste des autres mots-clés qui en sont un préfixe terminé
+        par une frontière de mot (ex: "project" dans "project management").
+        Le trie ne renvoie que la correspondance la plus longue à une position donnée.
+        """
+        keyword_set = set(keywords)
+        prefixes: Dict[str, List[str]] = {}
+        for keyword in keyword_set:
+            found = []
+            for end in range(1, len(keyword)):
+                candidate = keyword[:end]
+                if candidate in keyword_set and \
+                        _is_word_char(keyword[end - 1]) != _is_word_char(keyword[end]):
+                    found.append(candidate)
+            if found:
+                prefixes[keyword] = found
+        return prefixes
+
+    def find_keywords(self, text: str) -> Set[str]:
+        """Retourne l'ensemble des mots-clés (en minuscules) présents dans le texte"""
+        found: Set[str] = set()
+        if not self._pattern or not text:
+            return found
+
+        for match in self._pattern.finditer(text.lower()):
+            keyword = match.group(1)
+            if keyword not in found:
+                found.add(keyword)
+                found.update(self._prefixes.get(keyword, ()))
+        return found
+
+    def match(self, text: str, categories: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """Compétences trouvées par catégorie (catégories vides omises), dans l'ordre du dictionnaire"""
+        return self.match_pages([text], categories)
+
+    def match_pages(self, pages: Iterable[str], categories: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """
+        Comme match, sur un texte fourni morceau par morceau (ex. pages d'un PDF
+        produites par un générateur) : chaque page est traitée dès qu'elle arrive.
+        """
+        found: Set[str] = set()
+        for page in pages:
+            found.update(self.find_keywords(page))
+        return self._group_by_category(found, categories)
+
+    def _group_by_category(self, keywords: Iterable[str],
+                           categories: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        wanted = set(categories) if categories is not None else None
+        hits: Dict[str, Set[Tuple[int, str]]] = {}
+
+        for keyword in keywords:
+            for category, position, skill in self._owners[keyword]:
+                if wanted is None or category in wanted:
+                    hits.setdefault(category, set()).add((position, skill))
+
+        return {
+            category: [skill for _, skill in sorted(hits[category])]
+            for category in self.categories
+            if category in hits
+        }
@@ -0,0 +1,141 @@
+"""
+Taxonomie des compétences externalisée (fichier JSON versionné).
+
+Le fichier est compilé en un index en mémoire (compétence canonique, alias,
+catégorie + SkillMatcher). Quand le fichier change, un nouvel index est
+construit puis substitué d'un bloc : les workers n'ont pas à redémarrer et
+les analyses en cours gardent l'index qu'elles ont déjà récupéré.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import ai_setting
+from .skill_matcher import SkillMatcher
+
+DEFAULT_TAXONOMY_PATH = Path(__file__).resolve().parent / 'data' / 'skills_taxonomy.json'
+
+
+class TaxonomyError(Exception):
+    pass
+
+
+class TaxonomyIndex:
+    """Index immuable construit à partir d'une version de la taxonomie"""
+
+    def __init__(self, version: str, categories: Dict[str, List[str]], aliases: Dict[str, str], checksum: str = ''):
+        self.version = version
+        self.checksum = checksum
+        self.categories = categories
+        self.aliases = aliases
+        self.matcher = SkillMatcher(categories, aliases)
+
+        # terme (canonique ou alias, en minuscules) -> (catégorie, compétence canonique)
+        self._lookup: Dict[str, Tuple[str, str]] = {}
+        for category, skills_list in categories.items():
+            for skill in skills_list:
+                self._lookup.setdefault(skill.lower(), (category, skill))
+        for alias, canonical in aliases.items():
+            target = self._lookup.get(canonical.lower())
+            if target:
+                self._lookup.setdefault(alias.lower(), target)
+
+    @classmethod
+    def from_dict(cls, data: Dict, checksum: str = '') -> 'TaxonomyIndex':
+        if not isinstance(data, dict) or not isinstance(data.get('categories'), dict):
+            raise TaxonomyError("La taxonomie doit contenir un objet 'categories'")
+
+        categories: Dict[str, List[str]] = {}
+        aliases: Dict[str, str] = {}
+        for category, entries in data['categories'].items():
+            skills_list = []
+            for entry in entries:
+                # une entrée est soit un nom, soit {"name": ..., "aliases": [...]}
+                if isinstance(entry, str):
+                    name, entry_aliases = entry, []
+                elif isinstance(entry, dict) and entry.get('name'):
+                    name, entry_aliases = entry['name'], entry.get('aliases', [])
+                else:
+                    raise TaxonomyError(f"Entrée invalide dans la catégorie '{category}': {entry!r}")
+                skills_list.append(name)
+                for alias in entry_aliases:
+                    aliases[alias] = name
+            categories[category] = skills_list
+
+        return cls(str(data.get('version', '')), categories, aliases, checksum)
+
+    def lookup(self, term: str) -> Optional[Tuple[str, str]]:
+        """Retourne (catégorie, compétence canonique) pour un terme ou un alias"""
+        return self._lookup.get(term.strip().lower())
+
+    def __len__(self):
+        return len(self._lookup)
+
+
+class SkillsTaxonomy:
+    """
+    Source de la taxonomie avec rechargement à chaud.
+
+    Le fichier n'est re-stat() qu'au plus une fois toutes les `check_interval`
+    secondes ; l'index n'est reconstruit que si son contenu a réellement changé.
+    """
+
+    def __init__(self, path: Optional[str] = None, check_interval: Optional[float] = None):
+        self.path = Path(path or ai_setting('SKILLS_TAXONOMY_PATH') or DEFAULT_TAXONOMY_PATH)
+        self.check_interval = check_interval if check_interval is not None else \
+            ai_setting('SKILLS_TAXONOMY_CHECK_INTERVAL', 5.0)
+        self._index: Optional[TaxonomyIndex] = None
+        self._mtime = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _read(self) -> TaxonomyIndex:
+        with open(self.path, 'rb') as taxonomy_file:
+            raw = taxonomy_file.read()
+        checksum = hashlib.sha256(raw).hexdigest()
+        if self._index is not None and self._index.checksum == checksum:
+            return self._index
+        return TaxonomyIndex.from_dict(json.loads(raw.decode('utf-8')), checksum)
+
+    def reload(self, force: bool = False) -> TaxonomyIndex:
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                if self._index is None:
+                    raise TaxonomyError(f"Taxonomie introuvable: {self.path}") from e
+                print(f"⚠️  Taxonomie inaccessible, conservation de la version {self._index.version}: {e}")
+                return self._index
+
+            self._last_check = time.monotonic()
+            if not force and self._index is not None and mtime == self._mtime:
+                return self._index
+
+            try:
+                new_index = self._read()
+            except (ValueError, TaxonomyError) as e:
+                if self._index is None:
+                    raise TaxonomyError(f"Taxonomie invalide ({self.path}): {e}") from e
+                print(f"⚠️  Taxonomie invalide, conservation de la version {self._index.version}: {e}")
+                return self._index
+
+            if new_index is not self._index:
+                print(f"📚 Taxonomie des compétences chargée: version {new_index.version} ({len(new_index)} termes)")
+            # substitution atomique de la référence
+            self._index = new_index
+            self._mtime = mtime
+            return self._index
+
+    def get_index(self) -> TaxonomyIndex:
+        index = self._index
+        if index is None or time.monotonic() - self._last_check >= self.check_interval:
+            index = self.reload()
+        return index
+
+
+# taxonomie partagée par tout le processus
+skills_taxonomy = SkillsTaxonomy()
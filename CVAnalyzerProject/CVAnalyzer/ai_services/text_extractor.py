@@ -1,29 +1,97 @@
 import PyPDF2
 import docx
 import os
-from typing import Optional, Dict
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Iterator, List, Tuple
+
+from .config import ai_setting
+from .text_normalizer import TextNormalizer
+
+# en dessous de ce nombre de pages, le coût de démarrage des processus dépasse le gain
+PDF_PARALLEL_MIN_PAGES = 8
+PDF_PAGES_PER_TASK = 4
+
+
+def _extract_pdf_pages(file_path: str, page_numbers: List[int]) -> List[Tuple[int, str]]:
+    # exécuté dans un processus du pool : chaque worker ouvre son propre lecteur
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [(page_num, pdf_reader.pages[page_num].extract_text() or '') for page_num in page_numbers]
+
 
 # classe pour extraire le texte des différents types de fichier 
 class TextExtractor:
     @staticmethod
-    def extract_from_pdf(file_path: str) -> Dict[str, any]:
+    def iter_pdf_pages(file_path: str, max_pages: Optional[int] = None, max_chars: Optional[int] = None,
+                       workers: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Générateur (numéro de page, texte) dans l'ordre des pages : l'analyse peut
+        commencer sur les premières pages avant que la dernière soit lue.
+        `workers` > 1 répartit les pages sur un pool de processus (sauf dans un
+        processus démon, comme un worker prefork de Celery) ; `max_pages` et
+        `max_chars` arrêtent l'extraction (la dernière page est tronquée si besoin).
+        """
+        from .extraction_pool import can_spawn_processes
+
+        max_pages = max_pages if max_pages is not None else ai_setting('PDF_MAX_PAGES')
+        max_chars = max_chars if max_chars is not None else ai_setting('PDF_MAX_CHARS')
+        workers = workers if workers is not None else ai_setting('PDF_EXTRACTION_WORKERS', 0)
+
+        with open(file_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            page_count = len(pdf_reader.pages)
+            if max_pages:
+                page_count = min(page_count, max_pages)
+
+            if workers and workers > 1 and page_count >= PDF_PARALLEL_MIN_PAGES and can_spawn_processes():
+                pages = TextExtractor._iter_pdf_pages_parallel(file_path, page_count, workers)
+            else:
+                pages = ((page_num, pdf_reader.pages[page_num].extract_text() or '')
+                         for page_num in range(page_count))
+
+            remaining = max_chars
+            for page_num, page_text in pages:
+                if remaining is not None:
+                    page_text = page_text[:remaining]
+                    remaining -= len(page_text)
+                yield page_num, page_text
+                if remaining is not None and remaining <= 0:
+                    break
+
+    @staticmethod
+    def _iter_pdf_pages_parallel(file_path: str, page_count: int, workers: int) -> Iterator[Tuple[int, str]]:
+        batches = [list(range(start, min(start + PDF_PAGES_PER_TASK, page_count)))
+                   for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(batches)))
         try:
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text() + "\n"
+            # map rend les lots dans l'ordre, dès que chacun est prêt
+            for batch in executor.map(_extract_pdf_pages, [file_path] * len(batches), batches):
+                yield from batch
+        finally:
+            # arrêt anticipé (plafond atteint) : les lots restants sont abandonnés
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def extract_from_pdf(file_path: str, max_pages: Optional[int] = None,
+                         max_chars: Optional[int] = None) -> Dict[str, any]:
+        try:
+            normalizer = TextNormalizer()
+            page_count = 0
+            for _, page_text in TextExtractor.iter_pdf_pages(file_path, max_pages, max_chars):
+                if page_count:
+                    normalizer.feed('\n')
+                normalizer.feed(page_text)
+                page_count += 1
             
             return {
                 'success': True,
-                'text': text.strip(),
-                'pages': len(pdf_reader.pages),
+                **normalizer.result(),
+                'pages': page_count,
                 'file_type': 'pdf'
             }
             
+        except MemoryError:
+            raise
         except Exception as e:
             return {
                 'success': False,
@@ -32,28 +100,36 @@ class TextExtractor:
             }
     
     @staticmethod
-    def extract_from_docx(file_path: str) -> Dict[str, any]:
+    def extract_from_docx(file_path: str, max_chars: Optional[int] = None) -> Dict[str, any]:
         try:
             doc = docx.Document(file_path)
-            text = ""
+            normalizer = TextNormalizer(max_chars)
             
             for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
+                if normalizer.full:
+                    break
+                normalizer.feed(paragraph.text)
+                normalizer.feed("\n")
             
             for table in doc.tables:
                 for row in table.rows:
+                    if normalizer.full:
+                        break
                     for cell in row.cells:
-                        text += cell.text + " "
-                    text += "\n"
+                        normalizer.feed(cell.text)
+                        normalizer.feed(" ")
+                    normalizer.feed("\n")
             
             return {
                 'success': True,
-                'text': text.strip(),
+                **normalizer.result(),
                 'paragraphs': len(doc.paragraphs),
                 'tables': len(doc.tables),
                 'file_type': 'docx'
             }
             
+        except MemoryError:
+            raise
         except Exception as e:
             return {
                 'success': False,
@@ -62,25 +138,29 @@ class TextExtractor:
             }
     
     @staticmethod
-    def extract_from_txt(file_path: str) -> Dict[str, any]:
+    def extract_from_txt(file_path: str, max_chars: Optional[int] = None) -> Dict[str, any]:
+        # read(-1) : tout le fichier
+        limit = max_chars or -1
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
-                text = file.read()
+                text = file.read(limit)
             
             return {
                 'success': True,
                 'text': text.strip(),
+                'cleaned_text': TextNormalizer.clean(text),
                 'file_type': 'txt'
             }
             
         except UnicodeDecodeError:
             try:
                 with open(file_path, 'r', encoding='latin-1') as file:
-                    text = file.read()
+                    text = file.read(limit)
                 
                 return {
                     'success': True,
                     'text': text.strip(),
+                    'cleaned_text': TextNormalizer.clean(text),
                     'file_type': 'txt',
                     'encoding': 'latin-1'
                 }
@@ -91,6 +171,8 @@ class TextExtractor:
                     'file_type': 'txt'
                 }
         
+        except MemoryError:
+            raise
         except Exception as e:
             return {
                 'success': False,
@@ -99,7 +181,8 @@ class TextExtractor:
             }
     
     @classmethod
-    def extract_text_from_file(cls, file_path: str) -> Dict[str, any]:
+    def extract_text_from_file(cls, file_path: str, max_pages: Optional[int] = None,
+                               max_chars: Optional[int] = None) -> Dict[str, any]:
         if not os.path.exists(file_path):
             return {
                 'success': False,
@@ -107,43 +190,16 @@ class TextExtractor:
                 'file_path': file_path
             }
         
-        file_extension = Path(file_path).suffix.lower()
-        
-        if file_extension == '.pdf':
-            return cls.extract_from_pdf(file_path)
-        elif file_extension == '.docx':
-            return cls.extract_from_docx(file_path)
-        elif file_extension in ['.txt', '.text']:
-            return cls.extract_from_txt(file_path)
-        else:
-            return {
-                'success': False,
-                'error': f'Format de fichier non supporté: {file_extension}',
-                'file_path': file_path
-            }
+        # le format est détecté sur le contenu (un .doc peut être un vrai Word 97 ou un .docx renommé)
+        from .extractor_registry import get_extractor_registry
+        return get_extractor_registry().extract(file_path, max_pages=max_pages, max_chars=max_chars)
     
     @staticmethod
     def clean_extracted_text(text: str) -> str:
         """
         Nettoie le texte extrait (supprime les caractères indésirables, etc.)
         """
-        if not text:
-            return ""
-        
-        lines = text.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if line:
-                cleaned_lines.append(line)
-        
-        cleaned_text = ' '.join(cleaned_lines)
-        
-        import re
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
-        
-        return cleaned_text.strip()
+        return TextNormalizer.clean(text)
     
     @classmethod
     def extract_and_clean(cls, file_path: str) -> Dict[str, any]:
@@ -152,7 +208,8 @@ class TextExtractor:
         """
         extraction_result = cls.extract_text_from_file(file_path)
         
-        if extraction_result['success']:
+        # les extracteurs fournissent déjà le texte nettoyé, calculé pendant l'extraction
+        if extraction_result['success'] and 'cleaned_text' not in extraction_result:
             extraction_result['cleaned_text'] = cls.clean_extracted_text(
                 extraction_result['text']
             )
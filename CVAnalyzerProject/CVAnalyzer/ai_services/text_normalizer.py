@@ -0,0 +1,58 @@
+"""
+Normalisation du texte extrait, en flux.
+
+Les extracteurs fournissent leur texte fragment par fragment (page, paragraphe,
+cellule...). Le normaliseur conserve les fragments bruts et découpe les mots au
+fil de l'eau : texte brut et texte nettoyé (espaces consécutifs réduits à un
+seul) sont produits en une passe linéaire, avec une seule jointure finale.
+"""
+from typing import Dict, List, Optional
+
+
+class TextNormalizer:
+    def __init__(self, max_chars: Optional[int] = None):
+        self._raw: List[str] = []
+        # plafond de caractères conservés : les fragments au-delà sont ignorés
+        self._remaining = max_chars
+        self._words: List[str] = []
+        # mot éventuellement coupé en fin de fragment (ex. runs DOCX "Comp" + "étences")
+        self._tail = ''
+
+    def feed(self, fragment: str):
+        if not fragment or self.full:
+            return
+        if self._remaining is not None:
+            fragment = fragment[:self._remaining]
+            self._remaining -= len(fragment)
+        self._raw.append(fragment)
+
+        words = fragment.split()
+        if self._tail:
+            if words and not fragment[0].isspace():
+                words[0] = self._tail + words[0]
+            else:
+                self._words.append(self._tail)
+            self._tail = ''
+        if words and not fragment[-1].isspace():
+            self._tail = words.pop()
+        self._words.extend(words)
+
+    @property
+    def full(self) -> bool:
+        return self._remaining is not None and self._remaining <= 0
+
+    def raw_text(self) -> str:
+        return ''.join(self._raw).strip()
+
+    def cleaned_text(self) -> str:
+        if self._tail:
+            return ' '.join(self._words + [self._tail])
+        return ' '.join(self._words)
+
+    def result(self) -> Dict[str, str]:
+        return {'text': self.raw_text(), 'cleaned_text': self.cleaned_text()}
+
+    @staticmethod
+    def clean(text: str) -> str:
+        """Équivalent non incrémental : espaces (dont retours à la ligne) réduits à un seul"""
+        return ' '.join(text.split()) if text else ''
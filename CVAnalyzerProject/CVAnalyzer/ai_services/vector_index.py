@@ -0,0 +1,350 @@
+"""
+Index vectoriel des candidatures (recherche approximative des plus proches voisins).
+
+Implémentation NumPy de type IVF : les vecteurs sont répartis en listes par
+k-means, une requête ne parcourt que les `nprobe` listes les plus proches.
+En dessous de `min_train_size` vecteurs la recherche est exacte.
+
+La source de vérité reste la table CandidatureEmbedding : chaque worker garde
+son index en mémoire, le synchronise de façon incrémentale avec la base et
+peut le persister sur disque pour redémarrer sans tout relire.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .config import ai_setting
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorIndex:
+    def __init__(self, dimension: Optional[int] = None, nprobe: int = 8, min_train_size: int = 4096):
+        self.dimension = dimension
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._vectors = np.zeros((0, dimension or 0), dtype=np.float32)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._size = 0
+        self._rows: Dict[int, int] = {}  # id de candidature -> ligne
+
+        self.centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+
+        # filigrane de synchronisation avec la base
+        self.synced_until = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, item_id: int):
+        return item_id in self._rows
+
+    # --- stockage ---------------------------------------------------------
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        vectors = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        ids = np.zeros(new_capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        assign = np.zeros(new_capacity, dtype=np.int32)
+        assign[:self._size] = self._assign[:self._size]
+        self._vectors, self._ids, self._assign = vectors, ids, assign
+
+    def _nearest_centroids(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def add(self, item_id: int, vector: np.ndarray):
+        self.add_many([item_id], np.asarray(vector, dtype=np.float32).reshape(1, -1))
+
+    def add_many(self, item_ids: Iterable[int], vectors: np.ndarray):
+        item_ids = [int(i) for i in item_ids]
+        if not item_ids:
+            return
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(item_ids), -1))
+
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+                self._vectors = np.zeros((0, self.dimension), dtype=np.float32)
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(f'Dimension {vectors.shape[1]} incompatible avec l\'index ({self.dimension})')
+
+            assign = self._nearest_centroids(vectors) if self.centroids is not None else \
+                np.zeros(len(item_ids), dtype=np.int32)
+
+            new_positions = []
+            for position, item_id in enumerate(item_ids):
+                row = self._rows.get(item_id)
+                if row is not None:
+                    # mise à jour en place
+                    self._vectors[row] = vectors[position]
+                    self._assign[row] = assign[position]
+                else:
+                    new_positions.append(position)
+
+            if new_positions:
+                self._reserve(len(new_positions))
+                start = self._size
+                end = start + len(new_positions)
+                self._vectors[start:end] = vectors[new_positions]
+                self._assign[start:end] = assign[new_positions]
+                for offset, position in enumerate(new_positions):
+                    self._ids[start + offset] = item_ids[position]
+                    self._rows[item_ids[position]] = start + offset
+                self._size = end
+
+            self._maybe_train()
+
+    def remove(self, item_id: int) -> bool:
+        with self._lock:
+            row = self._rows.pop(int(item_id), None)
+            if row is None:
+                return False
+            last = self._size - 1
+            if row != last:
+                # on déplace la dernière ligne dans le trou (suppression en O(1))
+                moved_id = int(self._ids[last])
+                self._vectors[row] = self._vectors[last]
+                self._ids[row] = moved_id
+                self._assign[row] = self._assign[last]
+                self._rows[moved_id] = row
+            self._size = last
+            return True
+
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._size].copy()
+
+    def checksum(self) -> int:
+        """Somme des ids indexés, comparée à celle de la base pour détecter les suppressions"""
+        with self._lock:
+            return int(self._ids[:self._size].sum())
+
+    # --- IVF --------------------------------------------------------------
+
+    def _maybe_train(self):
+        if self._size < self.min_train_size:
+            return
+        if self.centroids is None or self._size > 4 * self._trained_size:
+            self.train()
+
+    def train(self, iterations: int = 10, sample_size: int = 20000, seed: int = 42):
+        """k-means sphérique sur un échantillon, puis affectation de tous les vecteurs"""
+        with self._lock:
+            if self._size == 0:
+                return
+            rng = np.random.default_rng(seed)
+            n_lists = max(1, int(np.sqrt(self._size)))
+            data = self._vectors[:self._size]
+            sample = data[rng.choice(self._size, size=min(sample_size, self._size), replace=False)]
+            n_lists = min(n_lists, len(sample))
+            centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                counts = np.bincount(labels, minlength=n_lists)
+                empty = counts == 0
+                sums[empty] = centroids[empty]
+                centroids = _normalize(sums)
+
+            self.centroids = centroids.astype(np.float32)
+            self._assign[:self._size] = self._nearest_centroids(data)
+            self._trained_size = self._size
+
+    # --- recherche ----------------------------------------------------------
+
+    def search(self, query: np.ndarray, top_k: int = 10, nprobe: Optional[int] = None,
+               exclude: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        """Retourne [(id, similarité cosinus)] triés par score décroissant"""
+        with self._lock:
+            if self._size == 0:
+                return []
+            query = _normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+            data = self._vectors[:self._size]
+
+            if self.centroids is not None:
+                probes = np.argsort(-(self.centroids @ query))[:nprobe or self.nprobe]
+                rows = np.nonzero(np.isin(self._assign[:self._size], probes))[0]
+                # trop peu de candidats dans les listes sondées : recherche exacte
+                if len(rows) < top_k:
+                    rows = np.arange(self._size)
+            else:
+                rows = np.arange(self._size)
+
+            scores = data[rows] @ query
+            ids = self._ids[rows]
+
+        if exclude:
+            keep = ~np.isin(ids, list(exclude))
+            ids, scores = ids[keep], scores[keep]
+
+        k = min(top_k, len(scores))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(ids[i]), float(scores[i])) for i in best]
+
+    # --- persistance --------------------------------------------------------
+
+    def save(self, path: str):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with self._lock:
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    ids=self._ids[:self._size],
+                    vectors=self._vectors[:self._size].astype(np.float16),
+                    assign=self._assign[:self._size],
+                    centroids=self.centroids if self.centroids is not None else np.zeros((0, self.dimension or 0), dtype=np.float32),
+                    meta=np.array([self.dimension or 0, self.nprobe, self.min_train_size, self._trained_size], dtype=np.int64),
+                    synced_until=np.array([self.synced_until.timestamp() if self.synced_until else 0.0]),
+                )
+        # remplacement atomique : un lecteur ne voit jamais un fichier à moitié écrit
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'VectorIndex':
+        from datetime import datetime, timezone
+
+        with np.load(path) as data:
+            dimension, nprobe, min_train_size, trained_size = (int(v) for v in data['meta'])
+            index = cls(dimension or None, nprobe=nprobe, min_train_size=min_train_size)
+            size = len(data['ids'])
+            index._reserve(size)
+            index._ids[:size] = data['ids']
+            index._vectors[:size] = data['vectors'].astype(np.float32)
+            index._assign[:size] = data['assign']
+            index._size = size
+            index._rows = {int(item_id): row for row, item_id in enumerate(data['ids'])}
+            if len(data['centroids']):
+                index.centroids = data['centroids'].astype(np.float32)
+                index._trained_size = trained_size
+            synced = float(data['synced_until'][0])
+            index.synced_until = datetime.fromtimestamp(synced, tz=timezone.utc) if synced else None
+        return index
+
+
+class CandidatureIndex:
+    """Index des candidatures du processus, synchronisé avec CandidatureEmbedding"""
+
+    def __init__(self, path: Optional[str] = None, sync_interval: Optional[float] = None):
+        self.path = path or ai_setting('VECTOR_INDEX_PATH')
+        self.sync_interval = sync_interval if sync_interval is not None else \
+            ai_setting('VECTOR_INDEX_SYNC_INTERVAL', 2.0)
+        self.index: Optional[VectorIndex] = None
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.index is not None
+
+    def _load(self):
+        if self.path and os.path.exists(self.path):
+            try:
+                self.index = VectorIndex.load(self.path)
+                # réglage de recherche, pas une propriété de l'index : le réglage courant prime sur le fichier
+                self.index.nprobe = ai_setting('VECTOR_INDEX_NPROBE', 8)
+                print(f"🗂️  Index vectoriel chargé: {len(self.index)} candidatures")
+                return
+            except Exception as e:
+                print(f"⚠️  Index vectoriel illisible, reconstruction: {e}")
+        self.index = VectorIndex(nprobe=ai_setting('VECTOR_INDEX_NPROBE', 8))
+
+    def sync(self, force: bool = False):
+        """Ajoute les embeddings modifiés depuis la dernière synchro et retire les candidatures supprimées"""
+        from django.db.models import Count, Sum
+
+        from .embedding_store import EmbeddingStore
+
+        with self._lock:
+            if self.index is None:
+                self._load()
+            if not force and time.monotonic() - self._last_sync < self.sync_interval:
+                return self.index
+
+            queryset = EmbeddingStore._fresh_queryset()
+            changed = queryset
+            if self.index.synced_until is not None:
+                changed = changed.filter(updated_at__gte=self.index.synced_until)
+
+            self.index.synced_until = self._add_rows(changed.order_by('updated_at'), self.index.synced_until)
+
+            # suppressions faites par d'autres workers (y compris delete() de queryset, qui ne
+            # passe pas par Candidature.delete) : détectées par écart du nombre d'ids ou de leur
+            # somme, une suppression compensée par un ajout ne laissant pas le nombre changer
+            totals = queryset.aggregate(count=Count('candidature_id'), checksum=Sum('candidature_id'))
+            if (totals['count'], totals['checksum'] or 0) != (len(self.index), self.index.checksum()):
+                valid_ids = set(queryset.values_list('candidature_id', flat=True))
+                indexed_ids = set(int(item_id) for item_id in self.index.ids())
+                for item_id in indexed_ids - valid_ids:
+                    self.index.remove(item_id)
+                # lignes validées après le filigrane (transaction longue) : ajoutées aussi
+                missing = valid_ids - indexed_ids
+                if missing:
+                    self._add_rows(queryset.filter(candidature_id__in=missing), self.index.synced_until)
+
+            self._last_sync = time.monotonic()
+            return self.index
+
+    def _add_rows(self, queryset, watermark):
+        """Ajoute les embeddings du queryset par blocs ; retourne le dernier updated_at lu"""
+        from .embedding_store import decode_vectors
+
+        batch_ids, batch_vectors = [], []
+        for candidature_id, vector, dimension, dtype, updated_at in queryset.values_list(
+                'candidature_id', 'vector', 'dimension', 'dtype', 'updated_at').iterator(chunk_size=2000):
+            batch_ids.append(candidature_id)
+            batch_vectors.append(decode_vectors(vector, dimension, dtype)[0])
+            watermark = updated_at if watermark is None else max(watermark, updated_at)
+            if len(batch_ids) >= 2000:
+                self.index.add_many(batch_ids, np.stack(batch_vectors))
+                batch_ids, batch_vectors = [], []
+        if batch_ids:
+            self.index.add_many(batch_ids, np.stack(batch_vectors))
+        return watermark
+
+    def add(self, candidature_id: int, vector: np.ndarray):
+        """Insertion incrémentale (à l'upload), sans attendre la prochaine synchro"""
+        # index pas encore chargé dans ce worker : le premier sync() lira la ligne en base
+        if self.index is not None:
+            self.index.add(candidature_id, vector)
+
+    def discard(self, candidature_id: int):
+        """Retrait d'une candidature supprimée (sans charger l'index s'il ne l'est pas)"""
+        if self.index is not None:
+            self.index.remove(candidature_id)
+
+    def search(self, query_vector: np.ndarray, top_k: int = 10) -> List[Tuple[int, float]]:
+        return self.sync().search(query_vector, top_k=top_k)
+
+    def persist(self) -> Optional[str]:
+        if not self.path or self.index is None:
+            return None
+        self.index.save(self.path)
+        return self.path
+
+
+# index partagé par tout le processus
+candidature_index = CandidatureIndex()
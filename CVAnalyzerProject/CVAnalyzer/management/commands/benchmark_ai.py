@@ -0,0 +1,366 @@
+# IA
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+SAMPLE_CV = """
+John Doe
+Software Engineer at Google, previously at Microsoft and Capgemini.
+5 years of experience in Python, Django, React and PostgreSQL.
+Worked with Docker, Kubernetes and AWS on data platforms in Paris and London.
+Bachelor's degree in Computer Science, Université de Lyon.
+Fluent in English and French, notions of Spanish.
+Leadership, communication, teamwork and project management.
+"""
+
+
+# mesure dans un interpréteur neuf : temps d'import et bibliothèques lourdes chargées
+STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+{imports}
+elapsed = time.perf_counter() - start
+heavy = [name for name in ('torch', 'transformers', 'sentence_transformers', 'sklearn', 'nltk', 'pandas')
+         if name in sys.modules]
+print(json.dumps({{'seconds': elapsed, 'heavy': heavy}}))
+"""
+
+STARTUP_TARGETS = [
+    ('Worker web (urls)', 'import CVAnalyzer.urls'),
+    ('Worker Celery (tasks)', 'import CVAnalyzer.tasks'),
+    ('Commande non IA', 'from CVAnalyzer.management.commands import init_groups'),
+    ('Pile IA (cv_analyzer)', 'import CVAnalyzer.ai_services.cv_analyzer'),
+]
+
+
+class CountingPipeline:
+    """Enveloppe un pipeline pour compter ses appels"""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.pipeline(*args, **kwargs)
+
+
+class Command(BaseCommand):
+    help = 'Mesurer les performances des services IA (appels NER, temps par CV, ...)'
+
+    SCENARIOS = ['ner', 'skills', 'ranking', 'docx', 'quantization', 'batching', 'startup']
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenario',
+            choices=self.SCENARIOS,
+            help='Scénario de benchmark à exécuter',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=5,
+            help='Nombre de CV analysés par mesure',
+        )
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=500,
+            help='Nombre de candidatures à classer (scénario ranking) ou de tableaux du DOCX (scénario docx)',
+        )
+        parser.add_argument(
+            '--file',
+            help='Fichier texte de CV à utiliser à la place du CV d\'exemple',
+        )
+
+    def handle(self, *args, **options):
+        cv_text = SAMPLE_CV
+        if options['file']:
+            with open(options['file'], 'r', encoding='utf-8') as f:
+                cv_text = f.read()
+
+        self.options = options
+        handler = getattr(self, f"benchmark_{options['scenario']}")
+        handler(cv_text, options['iterations'])
+
+    def _report(self, label, calls, elapsed, iterations):
+        self.stdout.write(
+            f'{label:<28} {calls / iterations:>6.2f} appels NER/CV   '
+            f'{elapsed / iterations * 1000:>9.1f} ms/CV'
+        )
+
+    # compare l'ancien chemin (NER relancé par extracteur) au contexte partagé
+    def benchmark_ner(self, cv_text, iterations):
+        from CVAnalyzer.ai_services.cv_analyzer import CVAnalyzer
+
+        analyzer = CVAnalyzer()
+        if not analyzer.ner_pipeline:
+            raise CommandError('Pipeline NER indisponible')
+
+        counter = CountingPipeline(analyzer.ner_pipeline)
+        analyzer.ner_pipeline = counter
+
+        # chauffe : le premier appel inclut l'initialisation paresseuse du modèle
+        analyzer.extract_text_from_cv(cv_text)
+
+        counter.calls = 0
+        start = time.perf_counter()
+        for _ in range(iterations):
+            # un contexte par extracteur = comportement d'avant
+            analyzer.extract_experience(cv_text, analyzer.create_context(cv_text))
+            analyzer.extract_entities(cv_text, analyzer.create_context(cv_text))
+        legacy_elapsed = time.perf_counter() - start
+        legacy_calls = counter.calls
+
+        counter.calls = 0
+        start = time.perf_counter()
+        for _ in range(iterations):
+            context = analyzer.create_context(cv_text)
+            analyzer.extract_experience(cv_text, context)
+            analyzer.extract_entities(cv_text, context)
+        shared_elapsed = time.perf_counter() - start
+        shared_calls = counter.calls
+
+        self.stdout.write(self.style.SUCCESS('BENCHMARK NER'))
+        self.stdout.write('=' * 60)
+        self._report('Sans contexte partagé', legacy_calls, legacy_elapsed, iterations)
+        self._report('Avec contexte partagé', shared_calls, shared_elapsed, iterations)
+        if shared_elapsed > 0:
+            self.stdout.write(f'Gain: x{legacy_elapsed / shared_elapsed:.2f}')
+
+    # compare la recherche regex mot-clé par mot-clé au matcher compilé
+    def benchmark_skills(self, cv_text, iterations):
+        from CVAnalyzer.ai_services.skill_matcher import SkillMatcher
+
+        # dictionnaire synthétique de grande taille en plus des compétences d'exemple
+        skills_keywords = {
+            f'category_{c}': [f'skill{c}_{i} tool' for i in range(1000)]
+            for c in range(20)
+        }
+        skills_keywords['programming'] = ['python', 'django', 'react', 'postgresql', 'docker']
+
+        start = time.perf_counter()
+        matcher = SkillMatcher(skills_keywords)
+        build_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            text_lower = cv_text.lower()
+            legacy = {}
+            for category, skills_list in skills_keywords.items():
+                found = [s for s in skills_list
+                         if re.search(r'\b' + re.escape(s.lower()) + r'\b', text_lower)]
+                if found:
+                    legacy[category] = found
+        legacy_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            compiled = matcher.match(cv_text)
+        compiled_elapsed = time.perf_counter() - start
+
+        keywords_count = sum(len(v) for v in skills_keywords.values())
+        self.stdout.write(self.style.SUCCESS(f'BENCHMARK COMPÉTENCES ({keywords_count} mots-clés)'))
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'Compilation du matcher: {build_elapsed * 1000:.1f} ms')
+        self.stdout.write(f'Regex par mot-clé:      {legacy_elapsed / iterations * 1000:.2f} ms/CV')
+        self.stdout.write(f'Matcher compilé:        {compiled_elapsed / iterations * 1000:.2f} ms/CV')
+        self.stdout.write(f'Résultats identiques:   {legacy == compiled}')
+
+    # classement de N candidatures pour une offre : boucle 1x1 contre scoring batché
+    def benchmark_ranking(self, cv_text, iterations):
+        from CVAnalyzer.ai_services.cv_analyzer import CVAnalyzer
+
+        analyzer = CVAnalyzer()
+        if not analyzer.sentence_model:
+            raise CommandError('Modèle Sentence Transformer indisponible')
+
+        count = self.options['count']
+        job_description = 'Backend developer with Python, Django, PostgreSQL, Docker and AWS experience'
+        cv_texts = [f'{cv_text}\nCandidate #{i}: ' + ' '.join(['python'] * (i % 7)) for i in range(count)]
+        # la boucle historique est mesurée sur un échantillon puis extrapolée
+        sample_size = min(count, 50)
+
+        start = time.perf_counter()
+        for text in cv_texts[:sample_size]:
+            analyzer.calculate_job_match_score(text, job_description)
+        loop_elapsed = (time.perf_counter() - start) / sample_size * count
+
+        start = time.perf_counter()
+        ranking = analyzer.rank_cvs_for_job(cv_texts, job_description, top_k=10)
+        batch_elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(f'BENCHMARK CLASSEMENT ({count} CV)'))
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'Boucle CV par CV (extrapolée): {loop_elapsed:.2f} s')
+        self.stdout.write(f'Scoring batché N x M:          {batch_elapsed:.2f} s')
+        if ranking:
+            self.stdout.write(f"Meilleur score: {ranking[0]['overall_score']}%")
+
+    # extraction d'un gros DOCX riche en tableaux : concaténations + nettoyage en plusieurs passes contre normalisation en flux
+    def benchmark_docx(self, cv_text, iterations):
+        import os
+        import tempfile
+
+        import docx
+        from CVAnalyzer.ai_services.extractor_registry import extract_docx_xml
+        from CVAnalyzer.ai_services.text_extractor import TextExtractor
+
+        tables = self.options['count']
+        document = docx.Document()
+        for paragraph in cv_text.strip().split('\n') * 20:
+            document.add_paragraph(paragraph)
+        for t in range(tables):
+            table = document.add_table(rows=6, cols=4)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f'Projet {t}  ligne {r}\ncolonne {c}   Python / Django'
+
+        handle, path = tempfile.mkstemp(suffix='.docx')
+        os.close(handle)
+        try:
+            document.save(path)
+
+            def legacy_extract():
+                doc = docx.Document(path)
+                text = ""
+                for paragraph in doc.paragraphs:
+                    text += paragraph.text + "\n"
+                for table in doc.tables:
+                    for row in table.rows:
+                        for cell in row.cells:
+                            text += cell.text + " "
+                        text += "\n"
+                lines = [line.strip() for line in text.strip().split('\n')]
+                cleaned = re.sub(r'\s+', ' ', ' '.join(line for line in lines if line))
+                return cleaned.strip()
+
+            timings = {}
+            outputs = {}
+            for label, run in [
+                ('Concaténation + nettoyage', legacy_extract),
+                ('python-docx + flux', lambda: TextExtractor.extract_from_docx(path)['cleaned_text']),
+                ('XML direct + flux', lambda: extract_docx_xml(path)['cleaned_text']),
+            ]:
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    outputs[label] = run()
+                timings[label] = (time.perf_counter() - start) / iterations
+
+            size_kb = os.path.getsize(path) / 1024
+        finally:
+            os.remove(path)
+
+        self.stdout.write(self.style.SUCCESS(f'BENCHMARK DOCX ({tables} tableaux, {size_kb:.0f} Ko)'))
+        self.stdout.write('=' * 60)
+        for label, elapsed in timings.items():
+            self.stdout.write(f'{label:<28} {elapsed * 1000:>9.1f} ms/document')
+        self.stdout.write(
+            f"Texte nettoyé identique (python-docx): "
+            f"{outputs['Concaténation + nettoyage'] == outputs['python-docx + flux']}"
+        )
+
+    # inférence CPU : modèle NER fp32 contre int8 (latence, poids, entités identiques) + écart mesuré du classifieur
+    def benchmark_quantization(self, cv_text, iterations):
+        import torch
+
+        from CVAnalyzer.ai_services.model_artifacts import CONFIG_FILE, artifact_exists, read_json
+        from CVAnalyzer.ai_services.config import ai_setting
+        from CVAnalyzer.ai_services.model_registry import current_ner_model_name, model_registry
+        from CVAnalyzer.ai_services.quantization import time_calls
+
+        cpu = torch.device('cpu')
+        results = {}
+        for mode in ('fp32', 'int8'):
+            ner = model_registry.get_ner_pipeline(current_ner_model_name(), cpu, mode=mode)
+            entities = ner(cv_text)
+            results[mode] = {
+                'ms': time_calls(lambda: ner(cv_text), repeat=iterations),
+                'entities': {(entity['entity_group'], entity['word']) for entity in entities},
+            }
+        stats = model_registry.stats()
+        for mode in results:
+            key = next(key for key in stats if key.startswith('ner:') and key.endswith('#int8') == (mode == 'int8'))
+            results[mode].update(stats[key])
+
+        self.stdout.write(self.style.SUCCESS('BENCHMARK QUANTIFICATION (CPU)'))
+        self.stdout.write('=' * 60)
+        for mode, values in results.items():
+            self.stdout.write(
+                f"NER {mode:<5} {values['ms']:>9.1f} ms/CV   {values['weights_mb']:>8.1f} Mo de poids   "
+                f"RSS +{values['rss_delta_mb']} Mo"
+            )
+        fp32, int8 = results['fp32'], results['int8']
+        if int8['ms'] > 0:
+            self.stdout.write(f"Gain NER: x{fp32['ms'] / int8['ms']:.2f}, "
+                              f"poids x{fp32['weights_mb'] / max(int8['weights_mb'], 0.1):.2f} plus petits")
+        union = fp32['entities'] | int8['entities']
+        agreement = len(fp32['entities'] & int8['entities']) / len(union) if union else 1.0
+        self.stdout.write(f'Entités communes fp32/int8: {agreement:.0%}')
+
+        model_dir = ai_setting('AI_MODEL_DIR')
+        if model_dir and artifact_exists(model_dir):
+            quantization = read_json(model_dir, CONFIG_FILE).get('quantization')
+            if quantization:
+                self.stdout.write(
+                    f"Classifieur (validation): F1 {quantization['fp32']['f1']:.4f} -> {quantization['int8']['f1']:.4f} "
+                    f"({quantization['delta']['f1']:+.4f}), x{quantization['speedup']}, "
+                    f"{quantization['fp32']['size_mb']} -> {quantization['int8']['size_mb']} Mo"
+                )
+
+    # prédictions concurrentes du classifieur : un passage par requête contre micro-batching
+    def benchmark_batching(self, cv_text, iterations):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from CVAnalyzer.ai_services.ai_trainer import AIModelTrainer
+
+        trainer = AIModelTrainer()
+        if not trainer.ensure_model():
+            raise CommandError('Aucun modèle entraîné (AI_MODEL_DIR)')
+
+        count = self.options['count']
+        texts = [f'{cv_text}\nCandidate #{i}' for i in range(count)]
+        trainer.predict_batch(texts[:1])
+
+        timings = {}
+        for label, predict in [
+            ('Un passage par requête', lambda text: trainer.predict_batch([text])[0]),
+            ('Micro-batching', lambda text: trainer._batcher('predict', trainer.predict_batch).run(text)),
+        ]:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=32) as executor:
+                list(executor.map(predict, texts))
+            timings[label] = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(f'BENCHMARK MICRO-BATCHING ({count} requêtes, 32 threads)'))
+        self.stdout.write('=' * 60)
+        for label, elapsed in timings.items():
+            self.stdout.write(f'{label:<28} {count / elapsed:>9.1f} CV/s')
+        self.stdout.write(f"Batchs: {trainer.batching_stats().get('predict')}")
+
+    # temps de démarrage (import à froid) des points d'entrée : web, Celery, commandes, pile IA
+    def benchmark_startup(self, cv_text, iterations):
+        import json
+        import os
+        import subprocess
+        import sys
+
+        from django.conf import settings
+
+        self.stdout.write(self.style.SUCCESS(f'BENCHMARK DÉMARRAGE (meilleur de {iterations})'))
+        self.stdout.write('=' * 60)
+        for label, imports in STARTUP_TARGETS:
+            runs = []
+            for _ in range(iterations):
+                output = subprocess.run(
+                    [sys.executable, '-c', STARTUP_PROBE.format(imports=imports)],
+                    cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True, check=True
+                ).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+            best = min(runs, key=lambda run: run['seconds'])
+            self.stdout.write(f"{label:<28} {best['seconds'] * 1000:>9.0f} ms   "
+                              f"modules lourds: {', '.join(best['heavy']) or 'aucun'}")
@@ -0,0 +1,32 @@
+# IA
+import time
+
+from django.core.management.base import BaseCommand
+
+from CVAnalyzer.ai_services.config import ai_setting
+from CVAnalyzer.ai_services.vector_index import CandidatureIndex, VectorIndex
+
+
+class Command(BaseCommand):
+    help = 'Reconstruire et persister l\'index vectoriel des candidatures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            help='Fichier de sortie (par défaut VECTOR_INDEX_PATH)',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        # reconstruction complète depuis CandidatureEmbedding, sans partir du fichier existant
+        index = CandidatureIndex(path=options['path'])
+        index.index = VectorIndex(nprobe=ai_setting('VECTOR_INDEX_NPROBE', 8))
+        index.sync(force=True)
+
+        path = index.persist()
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Index construit: {len(index.index)} candidatures en {elapsed:.2f}s -> {path}'
+        ))
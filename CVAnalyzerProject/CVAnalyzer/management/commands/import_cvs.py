@@ -0,0 +1,278 @@
+# IA
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from CVAnalyzer.models import Candidature, User
+
+CV_EXTENSIONS = {'.pdf', '.doc', '.docx'}
+
+
+def list_sources(source):
+    """CV à importer, dans un ordre stable : [(nom affiché, chemin ou membre de l'archive)]"""
+    path = Path(source)
+    if path.is_dir():
+        return [(str(file.relative_to(path)), file) for file in sorted(path.rglob('*'))
+                if file.is_file() and file.suffix.lower() in CV_EXTENSIONS]
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return [(info.filename, info.filename) for info in archive.infolist()
+                    if not info.is_dir() and Path(info.filename).suffix.lower() in CV_EXTENSIONS]
+    raise CommandError(f'Source introuvable ou ni répertoire ni archive zip: {source}')
+
+
+class Command(BaseCommand):
+    help = 'Importer en masse des CV (répertoire ou archive zip) : extraction parallèle, analyse par lots, bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            help='Répertoire (parcouru récursivement) ou archive .zip de CV PDF / DOC / DOCX',
+        )
+        parser.add_argument(
+            '--candidat',
+            required=True,
+            help='Email du compte auquel rattacher les candidatures importées',
+        )
+        parser.add_argument(
+            '--poste',
+            default='Candidature spontanée',
+            help='Intitulé du poste des candidatures importées',
+        )
+        parser.add_argument(
+            '--entreprise',
+            default='',
+            help='Entreprise des candidatures importées',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 2,
+            help='Processus d\'extraction en parallèle',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='CV par lot (extraction, analyse puis une transaction bulk_create)',
+        )
+        parser.add_argument(
+            '--defer-analysis',
+            action='store_true',
+            help='Insérer les candidatures en attente et laisser Celery les analyser',
+        )
+        parser.add_argument(
+            '--no-embeddings',
+            action='store_true',
+            help='Ne pas calculer les embeddings (build_vector_index plus tard)',
+        )
+
+    def handle(self, *args, **options):
+        from CVAnalyzer.ai_services.analysis_cache import hash_file
+        from CVAnalyzer.ai_services.config import ai_setting
+        from CVAnalyzer.ai_services.extraction_pool import ExtractionPool
+
+        try:
+            self.user = User.objects.get(email=options['candidat'])
+        except User.DoesNotExist:
+            raise CommandError(f"Aucun utilisateur avec l'email {options['candidat']}")
+
+        self.options = options
+        sources = list_sources(options['source'])
+        self.archive = zipfile.ZipFile(options['source']) if not Path(options['source']).is_dir() else None
+        self.analyzer = None
+        self.hash_file = hash_file
+        self.extraction_options = {
+            'max_pages': ai_setting('PDF_MAX_PAGES'),
+            'max_chars': ai_setting('PDF_MAX_CHARS'),
+        }
+        # pool dédié à l'import : mêmes garde-fous (délai, mémoire, crash) que l'extraction à l'upload
+        self.pool = ExtractionPool(processes=options['workers'])
+        self.counts = {'imported': 0, 'skipped': 0, 'failed': 0}
+        self.failures = {}
+        # reprise : les CV déjà importés pour ce compte (même empreinte) sont ignorés
+        self.seen_hashes = set(
+            Candidature.objects.filter(candidat=self.user).exclude(cv_hash='').values_list('cv_hash', flat=True)
+        )
+
+        self.stdout.write(f"{len(sources)} CV trouvés, {len(self.seen_hashes)} déjà importés pour ce compte")
+        staging = tempfile.mkdtemp(prefix='import_cvs_')
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options['workers']) as threads:
+                self.threads = threads
+                batch_size = max(1, options['batch_size'])
+                for offset in range(0, len(sources), batch_size):
+                    self.import_batch(sources[offset:offset + batch_size], staging)
+                    done = min(offset + batch_size, len(sources))
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f"[{done}/{len(sources)}] importés: {self.counts['imported']}, "
+                        f"ignorés: {self.counts['skipped']}, échecs: {self.counts['failed']} "
+                        f"({self.counts['imported'] / elapsed if elapsed > 0 else 0:.1f} CV/s)"
+                    )
+        finally:
+            self.pool.shutdown()
+            if self.archive is not None:
+                self.archive.close()
+            shutil.rmtree(staging, ignore_errors=True)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS(
+            f"{self.counts['imported']} CV importés en {elapsed:.1f}s "
+            f"({self.counts['imported'] / elapsed if elapsed > 0 else 0:.1f} CV/s), "
+            f"{self.counts['skipped']} déjà présents, {self.counts['failed']} échecs"
+        ))
+        for error_code, count in sorted(self.failures.items()):
+            self.stdout.write(f'  échecs {error_code}: {count}')
+
+    def fail(self, name, error_code, error):
+        self.counts['failed'] += 1
+        self.failures[error_code] = self.failures.get(error_code, 0) + 1
+        self.stderr.write(f'✗ {name} [{error_code}] {error}')
+
+    def stage(self, source, staging):
+        """Chemin local du CV (membre d'archive extrait dans le répertoire de travail) et son empreinte"""
+        name, location = source
+        if self.archive is not None:
+            target = Path(staging) / f'{abs(hash(location))}{Path(location).suffix.lower()}'
+            with self.archive.open(location) as member, open(target, 'wb') as f:
+                shutil.copyfileobj(member, f)
+            location = target
+        return name, location, self.hash_file(location)
+
+    def import_batch(self, sources, staging):
+        # l'archive zip n'est pas partageable entre threads : extraction des membres en séquence
+        if self.archive is not None:
+            staged = [self.stage(source, staging) for source in sources]
+        else:
+            staged = list(self.threads.map(lambda source: self.stage(source, staging), sources))
+
+        pending = []
+        for name, path, content_hash in staged:
+            if content_hash in self.seen_hashes:
+                self.counts['skipped'] += 1
+                continue
+            self.seen_hashes.add(content_hash)
+            pending.append((name, path, content_hash))
+
+        # extraction parallèle : un thread par document en attente d'un processus du pool
+        results = list(self.threads.map(
+            lambda item: self.pool.extract(str(item[1]), **self.extraction_options), pending
+        ))
+
+        documents = []
+        for (name, path, content_hash), result in zip(pending, results):
+            if not result['success'] or not result.get('text'):
+                self.fail(name, result.get('error_code', 'extraction'), result.get('error', 'aucun texte extrait'))
+                self.seen_hashes.discard(content_hash)
+                continue
+            documents.append({'name': name, 'path': path, 'hash': content_hash, 'text': result['text']})
+
+        if not self.options['defer_analysis']:
+            documents = self.analyse(documents)
+        self.insert(documents)
+
+        if self.archive is not None:
+            for _, path, _ in staged:
+                Path(path).unlink(missing_ok=True)
+
+    def get_analyzer(self):
+        if self.analyzer is None:
+            from CVAnalyzer.ai_services.cv_analyzer import CVAnalyzer
+            self.analyzer = CVAnalyzer()
+        return self.analyzer
+
+    def analyse(self, documents):
+        """Résultats en cache (une requête par lot), puis analyse par lot (NER batché) des autres CV"""
+        from CVAnalyzer.ai_services.analysis_cache import analysis_cache
+        from CVAnalyzer.ai_services.candidature_analysis import score_from_analysis
+
+        cached = analysis_cache.get_many(document['hash'] for document in documents)
+        analyses = {content_hash: entry['result'] for content_hash, entry in cached.items()
+                    if entry['result'] is not None}
+        pending = [document for document in documents if document['hash'] not in analyses]
+        if pending:
+            try:
+                batch = self.get_analyzer().extract_text_from_cvs([document['text'] for document in pending])
+            except Exception as e:
+                self.stderr.write(f'⚠️  Analyse par lot impossible, analyse document par document: {e}')
+                batch = []
+                for document in pending:
+                    try:
+                        batch.append(self.get_analyzer().extract_text_from_cv(document['text']))
+                    except Exception as error:
+                        batch.append(error)
+            for document, analysis in zip(pending, batch):
+                if isinstance(analysis, Exception):
+                    continue
+                analyses[document['hash']] = analysis
+                analysis_cache.set(document['hash'], document['text'], analysis)
+
+        analysed = []
+        for document in documents:
+            analysis = analyses.get(document['hash'])
+            if analysis is None:
+                self.fail(document['name'], 'analysis', "échec de l'analyse")
+                self.seen_hashes.discard(document['hash'])
+                continue
+            document['analysis'] = analysis
+            document['score'] = score_from_analysis(document['text'], analysis)
+            analysed.append(document)
+        return analysed
+
+    def insert(self, documents):
+        if not documents:
+            return
+        deferred = self.options['defer_analysis']
+        candidatures = []
+        for document in documents:
+            candidature = Candidature(
+                candidat=self.user,
+                poste=self.options['poste'],
+                entreprise=self.options['entreprise'],
+                cv_hash=document['hash'],
+            )
+            if not deferred:
+                candidature.score_ia = document['score']
+                candidature.competences_extraites = document['analysis'].get('skills', {})
+                candidature.commentaires = f"CV importé et analysé automatiquement. Score: {document['score']}%"
+                candidature.analyse_statut = 'terminee'
+                candidature.analyse_progression = 100
+            candidatures.append(candidature)
+
+        # un lot = une transaction : une interruption laisse des lots complets, repris via cv_hash
+        stored = []
+        try:
+            for candidature, document in zip(candidatures, documents):
+                with open(document['path'], 'rb') as f:
+                    candidature.cv.save(Path(document['name']).name, File(f), save=False)
+                stored.append(candidature.cv)
+            with transaction.atomic():
+                created = Candidature.objects.bulk_create(candidatures, batch_size=500)
+                if deferred:
+                    from CVAnalyzer.tasks import enqueue_analyse
+                    ids = [candidature.id for candidature in created]
+                    transaction.on_commit(lambda: [enqueue_analyse(id) for id in ids])
+        except BaseException:
+            # lot annulé (erreur ou interruption) : les fichiers déjà copiés ne restent pas orphelins
+            for cv in stored:
+                cv.delete(save=False)
+            raise
+        self.counts['imported'] += len(created)
+
+        if not deferred and not self.options['no_embeddings']:
+            from CVAnalyzer.ai_services.embedding_store import EmbeddingStore
+            try:
+                EmbeddingStore(self.get_analyzer()).store_many(created, [document['text'] for document in documents])
+            except Exception as e:
+                self.stderr.write(f'⚠️  Embeddings non calculés pour ce lot: {e}')
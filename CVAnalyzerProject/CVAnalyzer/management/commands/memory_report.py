@@ -0,0 +1,92 @@
+# IA
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def read_smaps_rollup(pid):
+    """Compteurs mémoire agrégés d'un processus (Linux 4.14+), en Ko"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in SMAPS_FIELDS:
+                values[name] = int(rest.split()[0])
+    return values
+
+
+def read_cmdline(pid):
+    with open(f'/proc/{pid}/cmdline', 'rb') as f:
+        return f.read().replace(b'\0', b' ').decode('utf-8', errors='replace').strip()
+
+
+def read_parent_pid(pid):
+    with open(f'/proc/{pid}/stat', 'r') as f:
+        # le nom du processus (2e champ) peut contenir des espaces : on repart de la dernière parenthèse
+        return int(f.read().rsplit(')', 1)[1].split()[1])
+
+
+class Command(BaseCommand):
+    help = 'Mémoire unique et partagée par processus (maître gunicorn et workers) à partir de smaps_rollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pid',
+            type=int,
+            help='PID du maître : le maître et ses processus enfants sont mesurés',
+        )
+        parser.add_argument(
+            '--match',
+            default='gunicorn',
+            help='Sans --pid : processus dont la ligne de commande contient ce texte',
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError('smaps_rollup indisponible (Linux 4.14+ requis)')
+
+        processes = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit() or int(entry) == os.getpid():
+                continue
+            pid = int(entry)
+            try:
+                parent = read_parent_pid(pid)
+                cmdline = read_cmdline(pid)
+                if options['pid']:
+                    if pid != options['pid'] and parent != options['pid']:
+                        continue
+                elif options['match'] not in cmdline:
+                    continue
+                processes[pid] = (parent, cmdline, read_smaps_rollup(pid))
+            except (OSError, ValueError, IndexError):
+                # processus terminé pendant la lecture ou non lisible
+                continue
+
+        if not processes:
+            raise CommandError('Aucun processus trouvé')
+
+        self.stdout.write(self.style.SUCCESS(f'MÉMOIRE PAR PROCESSUS ({len(processes)})'))
+        self.stdout.write(f"{'PID':>7} {'rôle':<8} {'RSS':>9} {'PSS':>9} {'unique':>9} {'partagé':>9}   (Mo)")
+        self.stdout.write('=' * 60)
+        totals = dict.fromkeys(('rss', 'pss', 'unique'), 0)
+        for pid, (parent, cmdline, values) in sorted(processes.items()):
+            unique = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+            shared = values.get('Shared_Clean', 0) + values.get('Shared_Dirty', 0)
+            role = 'worker' if parent in processes else 'maître'
+            self.stdout.write(
+                f"{pid:>7} {role:<8} {values.get('Rss', 0) / 1024:>9.1f} {values.get('Pss', 0) / 1024:>9.1f} "
+                f"{unique / 1024:>9.1f} {shared / 1024:>9.1f}"
+            )
+            totals['rss'] += values.get('Rss', 0)
+            totals['pss'] += values.get('Pss', 0)
+            totals['unique'] += unique
+
+        self.stdout.write('=' * 60)
+        # PSS : chaque page partagée est répartie entre les processus qui la partagent -> somme = mémoire réelle
+        self.stdout.write(f"Somme des RSS (pages partagées comptées plusieurs fois): {totals['rss'] / 1024:>9.1f} Mo")
+        self.stdout.write(f"Mémoire réelle (somme des PSS):                         {totals['pss'] / 1024:>9.1f} Mo")
+        self.stdout.write(f"Dont pages privées:                                     {totals['unique'] / 1024:>9.1f} Mo")
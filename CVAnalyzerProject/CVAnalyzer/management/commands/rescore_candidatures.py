@@ -0,0 +1,286 @@
+# IA
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from CVAnalyzer.models import Candidature, CandidatureEmbedding
+
+COUNTERS = ('processed', 'updated', 'cached', 'extracted', 'embeddings', 'failed')
+
+
+def read_checkpoint(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_checkpoint(path, state):
+    # écriture atomique : une interruption pendant l'écriture laisse le point précédent intact
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+class Command(BaseCommand):
+    help = ('Ré-analyser les candidatures existantes après un changement de modèle ou de taxonomie '
+            '(lots, point de reprise, débit limité)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Candidatures par lot (par défaut RESCORE_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--max-rate',
+            type=float,
+            help='Candidatures par seconde au plus, 0 = sans limite (par défaut RESCORE_MAX_RATE)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Fichier du point de reprise (par défaut RESCORE_CHECKPOINT_PATH)',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Ignorer le point de reprise et tout reprendre depuis le début',
+        )
+        parser.add_argument(
+            '--skip-embeddings',
+            action='store_true',
+            help='Ne pas recalculer les embeddings périmés',
+        )
+        parser.add_argument(
+            '--torch-threads',
+            type=int,
+            help='Threads PyTorch de ce processus (laisser du CPU aux workers de production)',
+        )
+
+    def handle(self, *args, **options):
+        from CVAnalyzer.ai_services.analysis_cache import current_analyzer_version
+        from CVAnalyzer.ai_services.config import ai_setting
+
+        if options['torch_threads']:
+            import torch
+            torch.set_num_threads(options['torch_threads'])
+
+        self.options = options
+        self.analyzer = None
+        batch_size = max(1, options['batch_size'] or ai_setting('RESCORE_BATCH_SIZE', 100))
+        max_rate = options['max_rate'] if options['max_rate'] is not None else ai_setting('RESCORE_MAX_RATE', 20)
+        checkpoint_path = options['checkpoint'] or ai_setting('RESCORE_CHECKPOINT_PATH')
+        self.version = current_analyzer_version()
+
+        # le point de reprise n'est valable que pour la version d'analyse qui l'a écrit
+        state = None if options['reset'] else read_checkpoint(checkpoint_path)
+        if state and state.get('version') != self.version:
+            self.stdout.write("Point de reprise d'une autre version d'analyse : reprise depuis le début")
+            state = None
+        if state and state.get('done'):
+            self.stdout.write(self.style.SUCCESS(
+                "Candidatures déjà ré-analysées pour la version courante (--reset pour relancer)"
+            ))
+            return
+        state = state or {'version': self.version, 'last_id': 0, 'done': False,
+                          'counts': dict.fromkeys(COUNTERS, 0)}
+        self.counts = state['counts']
+
+        # les analyses en attente ou en cours appartiennent à Celery
+        queryset = Candidature.objects.filter(
+            analyse_statut='terminee', id__gt=state['last_id']
+        ).order_by('id').only('id', 'cv', 'cv_hash', 'score_ia', 'competences_extraites')
+        remaining = queryset.count()
+        self.stdout.write(
+            f"{remaining} candidatures à ré-analyser (reprise après l'id {state['last_id']}), "
+            f"lots de {batch_size}, {f'{max_rate:g}/s au plus' if max_rate else 'sans limite de débit'}"
+        )
+
+        start = time.perf_counter()
+        processed = 0
+        with ThreadPoolExecutor(max_workers=ai_setting('EXTRACTION_POOL_PROCESSES', 2)) as threads:
+            self.threads = threads
+            batch = []
+            # iterator : les candidatures sont lues par blocs, sans charger toute la table
+            for candidature in queryset.iterator(chunk_size=batch_size):
+                batch.append(candidature)
+                if len(batch) < batch_size:
+                    continue
+                processed += self.run_batch(batch, state, checkpoint_path)
+                self.report(processed, remaining, start)
+                self.throttle(processed, max_rate, start)
+                batch = []
+            if batch:
+                processed += self.run_batch(batch, state, checkpoint_path)
+                self.report(processed, remaining, start)
+
+        state['done'] = True
+        write_checkpoint(checkpoint_path, state)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS(
+            f"{self.counts['updated']} candidatures ré-analysées, {self.counts['failed']} échecs "
+            f"({processed} en {elapsed:.1f}s pour cette exécution)"
+        ))
+        self.stdout.write(f"  résultats déjà à jour dans le cache: {self.counts['cached']}")
+        self.stdout.write(f"  fichiers ré-extraits (texte absent du cache): {self.counts['extracted']}")
+        self.stdout.write(f"  embeddings recalculés: {self.counts['embeddings']}")
+
+    def run_batch(self, candidatures, state, checkpoint_path):
+        self.process_batch(candidatures)
+        self.counts['processed'] += len(candidatures)
+        state['last_id'] = candidatures[-1].id
+        state['updated_at'] = timezone.now().isoformat()
+        write_checkpoint(checkpoint_path, state)
+        return len(candidatures)
+
+    def report(self, processed, remaining, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"[{processed}/{remaining}] ré-analysées: {self.counts['updated']}, échecs: {self.counts['failed']} "
+            f"({processed / elapsed if elapsed > 0 else 0:.1f}/s)"
+        )
+
+    @staticmethod
+    def throttle(processed, max_rate, start):
+        # débit moyen plafonné : on attend que le temps écoulé rattrape le volume traité
+        if max_rate and max_rate > 0:
+            delay = processed / max_rate - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+    def fail(self, candidature, error_code, error):
+        self.counts['failed'] += 1
+        self.stderr.write(f'✗ candidature {candidature.id} [{error_code}] {error}')
+
+    def get_analyzer(self):
+        if self.analyzer is None:
+            from CVAnalyzer.ai_services.cv_analyzer import CVAnalyzer
+            self.analyzer = CVAnalyzer()
+        return self.analyzer
+
+    def load_texts(self, candidatures):
+        """Texte de chaque CV (par empreinte) : cache d'analyse, sinon ré-extraction du fichier"""
+        from CVAnalyzer.ai_services.analysis_cache import analysis_cache
+        from CVAnalyzer.ai_services.config import ai_setting
+        from CVAnalyzer.ai_services.extraction_pool import extraction_pool
+
+        cached = analysis_cache.get_many(candidature.cv_hash for candidature in candidatures)
+        texts = {content_hash: entry['text'] for content_hash, entry in cached.items()}
+        results = {content_hash: entry['result'] for content_hash, entry in cached.items()
+                   if entry['result'] is not None}
+
+        to_extract = list({candidature.cv_hash: candidature for candidature in candidatures
+                           if candidature.cv_hash not in texts}.values())
+        outcomes = self.threads.map(
+            lambda candidature: extraction_pool.extract(
+                candidature.cv.path,
+                max_pages=ai_setting('PDF_MAX_PAGES'),
+                max_chars=ai_setting('PDF_MAX_CHARS')
+            ),
+            to_extract
+        )
+        for candidature, outcome in zip(to_extract, outcomes):
+            if outcome['success'] and outcome.get('text'):
+                texts[candidature.cv_hash] = outcome['text']
+                self.counts['extracted'] += 1
+        return texts, results
+
+    def analyse(self, texts, content_hashes):
+        """Analyse par lot (NER batché) des textes dont le résultat n'est pas en cache"""
+        from CVAnalyzer.ai_services.analysis_cache import analysis_cache
+
+        analyses = {}
+        try:
+            batch = self.get_analyzer().extract_text_from_cvs([texts[h] for h in content_hashes])
+            analyses = dict(zip(content_hashes, batch))
+        except Exception as e:
+            self.stderr.write(f'⚠️  Analyse par lot impossible, analyse document par document: {e}')
+            for content_hash in content_hashes:
+                try:
+                    analyses[content_hash] = self.get_analyzer().extract_text_from_cv(texts[content_hash])
+                except Exception:
+                    continue
+        for content_hash, analysis in analyses.items():
+            analysis_cache.set(content_hash, texts[content_hash], analysis)
+        return analyses
+
+    def process_batch(self, candidatures):
+        from CVAnalyzer.ai_services.analysis_cache import hash_file
+        from CVAnalyzer.ai_services.candidature_analysis import score_from_analysis
+
+        documents = []
+        for candidature in candidatures:
+            # anciennes candidatures sans empreinte : calculée depuis le fichier
+            if not candidature.cv_hash:
+                try:
+                    candidature.cv_hash = hash_file(candidature.cv.path)
+                except (OSError, ValueError) as e:
+                    self.fail(candidature, 'missing_file', e)
+                    continue
+            documents.append(candidature)
+
+        texts, results = self.load_texts(documents)
+        self.counts['cached'] += sum(1 for candidature in documents if candidature.cv_hash in results)
+        pending = list(dict.fromkeys(
+            candidature.cv_hash for candidature in documents
+            if candidature.cv_hash in texts and candidature.cv_hash not in results
+        ))
+        if pending:
+            results.update(self.analyse(texts, pending))
+
+        updated = []
+        for candidature in documents:
+            if candidature.cv_hash not in texts:
+                self.fail(candidature, 'extraction', 'texte introuvable (cache et fichier)')
+                continue
+            analysis = results.get(candidature.cv_hash)
+            if analysis is None:
+                self.fail(candidature, 'analysis', "échec de l'analyse")
+                continue
+            candidature.score_ia = score_from_analysis(texts[candidature.cv_hash], analysis)
+            candidature.competences_extraites = analysis.get('skills', {})
+            updated.append(candidature)
+
+        if not updated:
+            return
+        # commentaires non modifiés : ils portent l'historique des décisions du recruteur
+        with transaction.atomic():
+            Candidature.objects.bulk_update(updated, ['cv_hash', 'score_ia', 'competences_extraites'])
+        self.counts['updated'] += len(updated)
+
+        if not self.options['skip_embeddings']:
+            self.refresh_embeddings(updated, texts)
+
+    def refresh_embeddings(self, candidatures, texts):
+        """Embeddings réutilisés s'ils sont à jour, recalculés par lot sinon (modèle ou version changés)"""
+        from CVAnalyzer.ai_services.embedding_store import (
+            EmbeddingStore, current_model_name, current_model_version,
+        )
+
+        fresh = set(CandidatureEmbedding.objects.filter(
+            candidature__in=[candidature.id for candidature in candidatures],
+            model_name=current_model_name(),
+            model_version=current_model_version(),
+        ).values_list('candidature_id', flat=True))
+        stale = [candidature for candidature in candidatures if candidature.id not in fresh]
+        if not stale:
+            return
+
+        try:
+            with transaction.atomic():
+                CandidatureEmbedding.objects.filter(candidature__in=[candidature.id for candidature in stale]).delete()
+                self.counts['embeddings'] += EmbeddingStore(self.get_analyzer()).store_many(
+                    stale, [texts[candidature.cv_hash] for candidature in stale]
+                )
+        except Exception as e:
+            self.stderr.write(f'⚠️  Embeddings non recalculés pour ce lot: {e}')
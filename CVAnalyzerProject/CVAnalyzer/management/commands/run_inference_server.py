@@ -0,0 +1,36 @@
+# IA
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Lancer le service d\'inférence dédié (modèles chargés une fois, requêtes des workers regroupées)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--host',
+            default='127.0.0.1',
+            help='Adresse d\'écoute (0.0.0.0 pour un conteneur séparé)',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8500,
+            help='Port d\'écoute',
+        )
+        parser.add_argument(
+            '--no-warm',
+            action='store_true',
+            help='Ne pas charger les modèles avant d\'accepter des requêtes',
+        )
+
+    def handle(self, *args, **options):
+        from CVAnalyzer.ai_services.inference_server import serve
+
+        server = serve(options['host'], options['port'], warm=not options['no_warm'])
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write('Service d\'inférence arrêté')
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2025-10-17 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CVAnalyzer', '0005_auto_20250829_1442'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidatureEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(help_text="Modèle d'encodage utilisé", max_length=200)),
+                ('model_version', models.CharField(help_text="Version du modèle / du calcul d'embedding", max_length=50)),
+                ('dimension', models.PositiveIntegerField(help_text='Dimension des vecteurs')),
+                ('dtype', models.CharField(default='float16', help_text='Type des flottants stockés', max_length=10)),
+                ('vector', models.BinaryField(help_text='Embedding du document complet')),
+                ('chunk_count', models.PositiveIntegerField(default=0, help_text='Nombre de segments encodés')),
+                ('chunk_vectors', models.BinaryField(blank=True, default=b'', help_text='Embeddings des segments (concaténés)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('candidature', models.OneToOneField(help_text='Candidature dont le CV a été encodé', on_delete=django.db.models.deletion.CASCADE, related_name='embedding', to='CVAnalyzer.candidature')),
+            ],
+            options={
+                'verbose_name': 'Embedding de candidature',
+                'verbose_name_plural': 'Embeddings de candidatures',
+                'indexes': [models.Index(fields=['model_name', 'model_version'], name='cv_embedding_model_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2025-10-17 11:00
+
+from django.db import migrations, models
+
+
+def marquer_candidatures_analysees(apps, schema_editor):
+    # les candidatures existantes ont été analysées de façon synchrone à l'upload
+    Candidature = apps.get_model('CVAnalyzer', 'Candidature')
+    Candidature.objects.filter(score_ia__isnull=False).update(
+        analyse_statut='terminee',
+        analyse_progression=100
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CVAnalyzer', '0006_candidatureembedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidature',
+            name='analyse_statut',
+            field=models.CharField(choices=[('en_attente', "En attente d'analyse"), ('en_cours', 'Analyse en cours'), ('terminee', 'Analyse terminée'), ('echec', "Échec de l'analyse")], default='en_attente', help_text="État de l'analyse IA en arrière-plan", max_length=20),
+        ),
+        migrations.AddField(
+            model_name='candidature',
+            name='analyse_progression',
+            field=models.PositiveSmallIntegerField(default=0, help_text="Progression de l'analyse IA (0-100)"),
+        ),
+        migrations.AddField(
+            model_name='candidature',
+            name='analyse_erreur',
+            field=models.TextField(blank=True, help_text="Erreur rencontrée lors de l'analyse IA"),
+        ),
+        migrations.RunPython(marquer_candidatures_analysees, migrations.RunPython.noop),
+    ]
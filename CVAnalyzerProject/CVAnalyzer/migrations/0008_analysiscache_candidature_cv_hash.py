@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2025-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CVAnalyzer', '0007_candidature_analyse_statut'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidature',
+            name='cv_hash',
+            field=models.CharField(blank=True, db_index=True, help_text='Empreinte SHA-256 du fichier CV', max_length=64),
+        ),
+        migrations.CreateModel(
+            name='AnalysisCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(help_text="Empreinte du fichier + version de l'analyse", max_length=255, unique=True)),
+                ('content_hash', models.CharField(db_index=True, help_text='SHA-256 du fichier', max_length=64)),
+                ('analyzer_version', models.CharField(help_text="Version de l'analyseur et des modèles", max_length=200)),
+                ('text', models.TextField(help_text='Texte extrait du fichier')),
+                ('result', models.JSONField(default=dict, help_text='Résultat complet de extract_text_from_cv')),
+                ('size_bytes', models.PositiveIntegerField(default=0, help_text="Taille approximative de l'entrée")),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_access', models.DateTimeField(db_index=True, help_text='Dernier accès (éviction LRU)')),
+            ],
+            options={
+                'verbose_name': 'Analyse en cache',
+                'verbose_name_plural': 'Analyses en cache',
+            },
+        ),
+    ]
@@ -80,6 +80,13 @@ class Candidature(models.Model):
         ('refusee', 'Refusée'),
     ]
 
+    ANALYSE_STATUS_CHOICES = [
+        ('en_attente', 'En attente d\'analyse'),
+        ('en_cours', 'Analyse en cours'),
+        ('terminee', 'Analyse terminée'),
+        ('echec', 'Échec de l\'analyse'),
+    ]
+
     # Relations
     candidat = models.ForeignKey(
         User, 
@@ -121,6 +128,14 @@ class Candidature(models.Model):
         help_text="Statut de la candidature"
     )
     
+    # Empreinte SHA-256 du fichier CV (cache d'analyse, détection des doublons)
+    cv_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text="Empreinte SHA-256 du fichier CV"
+    )
+    
     # Analyse IA (pour plus tard)
     score_ia = models.FloatField(
         null=True,
@@ -133,6 +148,22 @@ class Candidature(models.Model):
         help_text="Compétences extraites par IA"
     )
     
+    # Suivi de l'analyse IA asynchrone
+    analyse_statut = models.CharField(
+        max_length=20,
+        choices=ANALYSE_STATUS_CHOICES,
+        default='en_attente',
+        help_text="État de l'analyse IA en arrière-plan"
+    )
+    analyse_progression = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Progression de l'analyse IA (0-100)"
+    )
+    analyse_erreur = models.TextField(
+        blank=True,
+        help_text="Erreur rencontrée lors de l'analyse IA"
+    )
+    
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -148,6 +179,10 @@ class Candidature(models.Model):
     
     # suppression des fichiers associés
     def delete(self, *args, **kwargs):
+        # retrait de l'index vectoriel de recherche de candidats
+        from .ai_services.vector_index import candidature_index
+        candidature_index.discard(self.id)
+        
         if self.cv:
             if os.path.isfile(self.cv.path):
                 os.remove(self.cv.path)
@@ -159,4 +194,62 @@ class Candidature(models.Model):
     class Meta:
         verbose_name = "Candidature"
         verbose_name_plural = "Candidatures"
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+
+class CandidatureEmbedding(models.Model):
+    """Embeddings du CV calculés une fois à l'ingestion (format binaire compact)"""
+
+    candidature = models.OneToOneField(
+        Candidature,
+        on_delete=models.CASCADE,
+        related_name='embedding',
+        help_text="Candidature dont le CV a été encodé"
+    )
+
+    # invalidation : un embedding n'est valide que pour ce modèle et cette version
+    model_name = models.CharField(max_length=200, help_text="Modèle d'encodage utilisé")
+    model_version = models.CharField(max_length=50, help_text="Version du modèle / du calcul d'embedding")
+
+    dimension = models.PositiveIntegerField(help_text="Dimension des vecteurs")
+    dtype = models.CharField(max_length=10, default='float16', help_text="Type des flottants stockés")
+    vector = models.BinaryField(help_text="Embedding du document complet")
+    chunk_count = models.PositiveIntegerField(default=0, help_text="Nombre de segments encodés")
+    chunk_vectors = models.BinaryField(blank=True, default=b'', help_text="Embeddings des segments (concaténés)")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Embedding candidature #{self.candidature_id} ({self.model_name} v{self.model_version})"
+
+    class Meta:
+        verbose_name = "Embedding de candidature"
+        verbose_name_plural = "Embeddings de candidatures"
+        indexes = [
+            models.Index(fields=['model_name', 'model_version'], name='cv_embedding_model_idx'),
+        ]
+
+
+class AnalysisCache(models.Model):
+    """Résultat d'analyse d'un fichier CV, indexé par empreinte du contenu et version d'analyse"""
+
+    cache_key = models.CharField(max_length=255, unique=True, help_text="Empreinte du fichier + version de l'analyse")
+    content_hash = models.CharField(max_length=64, db_index=True, help_text="SHA-256 du fichier")
+    analyzer_version = models.CharField(max_length=200, help_text="Version de l'analyseur et des modèles")
+
+    text = models.TextField(help_text="Texte extrait du fichier")
+    result = models.JSONField(default=dict, help_text="Résultat complet de extract_text_from_cv")
+    size_bytes = models.PositiveIntegerField(default=0, help_text="Taille approximative de l'entrée")
+
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_access = models.DateTimeField(db_index=True, help_text="Dernier accès (éviction LRU)")
+
+    def __str__(self):
+        return f"Analyse {self.content_hash[:12]} ({self.analyzer_version})"
+
+    class Meta:
+        verbose_name = "Analyse en cache"
+        verbose_name_plural = "Analyses en cache"
+
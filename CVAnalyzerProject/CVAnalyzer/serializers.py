@@ -114,6 +114,8 @@ class CandidatureCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # ajouter automatiquement le candidat connecté
         validated_data['candidat'] = self.context['request'].user
+        # empreinte calculée pendant la réception par HashingTemporaryFileUploadHandler
+        validated_data['cv_hash'] = getattr(validated_data.get('cv'), 'content_hash', '')
         return super().create(validated_data)
 
 
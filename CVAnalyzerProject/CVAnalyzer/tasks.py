@@ -0,0 +1,101 @@
+# TÂCHES CELERY - Analyse IA en arrière-plan
+from datetime import timedelta
+
+from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Candidature
+
+
+def mark_analyse_failed(candidature_id, error):
+    Candidature.objects.filter(id=candidature_id).update(
+        analyse_statut='echec',
+        analyse_erreur=str(error),
+        updated_at=timezone.now()
+    )
+
+
+def enqueue_analyse(candidature_id):
+    """
+    Met l'analyse en file ; broker injoignable : la candidature passe en échec au lieu de
+    rester en attente indéfiniment. À appeler via transaction.on_commit.
+    """
+    try:
+        analyser_candidature.delay(candidature_id)
+    except Exception as e:
+        print(f"❌ Analyse de la candidature {candidature_id} non mise en file: {e}")
+        mark_analyse_failed(candidature_id, f"Mise en file de l'analyse impossible: {e}")
+        return False
+    return True
+
+
+@shared_task(bind=True, acks_late=True)
+def analyser_candidature(self, candidature_id):
+    """Analyse le CV d'une candidature enregistrée à l'upload (statut en_attente)"""
+    # import différé : les vues qui ne font que mettre la tâche en file ne chargent pas la pile IA
+    from .ai_services.candidature_analysis import analyse_candidature
+
+    try:
+        candidature = Candidature.objects.get(id=candidature_id)
+    except Candidature.DoesNotExist:
+        return {'success': False, 'error': 'Candidature non trouvée'}
+    if candidature.analyse_statut == 'terminee':
+        # tâche remise en file par relancer_analyses_bloquees alors que la première a abouti
+        return {'success': True, 'score_ia': candidature.score_ia}
+
+    def progress(percent, step):
+        # progression visible à la fois en base (vue de statut) et dans le backend Celery
+        Candidature.objects.filter(id=candidature_id).update(
+            analyse_statut='en_cours',
+            analyse_progression=percent,
+            updated_at=timezone.now()
+        )
+        self.update_state(state='PROGRESS', meta={'progression': percent, 'etape': step})
+
+    try:
+        analysis = analyse_candidature(candidature, progress=progress)
+    except SoftTimeLimitExceeded:
+        # limite douce : on marque l'échec avant l'arrêt forcé (CELERY_TASK_TIME_LIMIT)
+        error = f"Analyse interrompue après {settings.CELERY_TASK_SOFT_TIME_LIMIT}s"
+        mark_analyse_failed(candidature_id, error)
+        return {'success': False, 'error': error, 'error_code': 'timeout'}
+    except Exception as e:
+        mark_analyse_failed(candidature_id, e)
+        return {'success': False, 'error': str(e), 'error_code': getattr(e, 'error_code', 'analysis')}
+
+    candidature.analyse_statut = 'terminee'
+    candidature.analyse_progression = 100
+    candidature.analyse_erreur = ''
+    candidature.save(update_fields=[
+        'score_ia', 'competences_extraites', 'commentaires', 'cv_hash',
+        'analyse_statut', 'analyse_progression', 'analyse_erreur', 'updated_at'
+    ])
+
+    return {'success': True, 'score_ia': analysis['overall_score']}
+
+
+@shared_task
+def relancer_analyses_bloquees():
+    """
+    Tâche périodique (beat) : remet en file les analyses restées en attente (tâche
+    perdue) et passe en échec celles restées en cours (worker arrêté brutalement).
+    """
+    limit = timezone.now() - timedelta(seconds=settings.ANALYSE_STALE_AFTER)
+
+    stuck = Candidature.objects.filter(analyse_statut='en_cours', updated_at__lt=limit)
+    failed = stuck.update(
+        analyse_statut='echec',
+        analyse_erreur="Analyse interrompue (worker arrêté)",
+        updated_at=timezone.now()
+    )
+
+    requeued = 0
+    pending = Candidature.objects.filter(analyse_statut='en_attente', updated_at__lt=limit)
+    for candidature_id in pending.values_list('id', flat=True):
+        # l'horodatage repart : pas de nouvelle relance avant ANALYSE_STALE_AFTER
+        Candidature.objects.filter(id=candidature_id).update(updated_at=timezone.now())
+        requeued += enqueue_analyse(candidature_id)
+
+    return {'requeued': requeued, 'failed': failed}
@@ -1,3 +1,915 @@
-from django.test import TestCase
+import importlib.util
+import os
+import random
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import unittest
+import zlib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from CVAnalyzer.ai_services.extraction_pool import ExtractionPool
+from CVAnalyzer.ai_services.extractor_registry import (
+    MIME_TEXT, OLE_SIGNATURE, ExtractorRegistry, extract_doc_ole, extract_doc_strings, get_extractor_registry,
+)
+from CVAnalyzer.ai_services.skill_matcher import SkillMatcher
+from CVAnalyzer.ai_services.skills_taxonomy import SkillsTaxonomy
+from CVAnalyzer.ai_services.text_extractor import TextExtractor
+from CVAnalyzer.ai_services.text_normalizer import TextNormalizer
+from CVAnalyzer.ai_services.vector_index import CandidatureIndex, VectorIndex
+from CVAnalyzer.models import Candidature, CandidatureEmbedding, User
+from CVAnalyzer import tasks
+
+
+def has_modules(*names):
+    return all(importlib.util.find_spec(name) is not None for name in names)
+
+
+def make_pdf(pages):
+    """PDF minimal : une ligne de texte par page"""
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for text in pages:
+        stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>')
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {len(kids)} >>'
+    data, offsets = b'%PDF-1.4\n', []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(data)
+    data += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    data += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode()
+    data += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return data
+
+
+def write_temp_file(test, suffix, data):
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    test.addCleanup(os.remove, path)
+    return path
+
+
+def make_ole(streams):
+    """Fichier composé OLE (CFB v3) minimal ; flux complétés à 4096 octets (pas de mini-flux)"""
+    free, end_of_chain, fat_sector = 0xFFFFFFFF, 0xFFFFFFFE, 0xFFFFFFFD
+    streams = [(name, data.ljust(4096, b'\x00')) for name, data in streams.items()]
+    entry_count = len(streams) + 1
+    dir_sectors = -(-entry_count // 4)
+    fat = [fat_sector] + [i + 2 for i in range(dir_sectors - 1)] + [end_of_chain]
+    starts, body = [], b''
+    for _, data in streams:
+        sectors = -(-len(data) // 512)
+        starts.append(len(fat))
+        fat += [len(fat) + i + 1 for i in range(sectors - 1)] + [end_of_chain]
+        body += data.ljust(sectors * 512, b'\x00')
+    assert len(fat) <= 128
+
+    def entry(name, kind, start, size, child=free, right=free):
+        encoded = (name + '\x00').encode('utf-16-le')
+        return (encoded.ljust(64, b'\x00') + struct.pack('<HBBIII', len(encoded), kind, 1, free, right, child)
+                + b'\x00' * 36 + struct.pack('<IQ', start, size))
+
+    # racine -> premier flux, les suivants chaînés en frères droits
+    directory = entry('Root Entry', 5, end_of_chain, 0, child=1)
+    for index, ((name, data), start) in enumerate(zip(streams, starts), 1):
+        directory += entry(name, 2, start, len(data), right=index + 1 if index < len(streams) else free)
+    directory = directory.ljust(dir_sectors * 512, b'\x00')
+
+    header = (OLE_SIGNATURE + b'\x00' * 16 + struct.pack('<HHHHH', 0x3E, 3, 0xFFFE, 9, 6) + b'\x00' * 6
+              + struct.pack('<IIIIIIIII', 0, 1, 1, 0, 4096, end_of_chain, 0, end_of_chain, 0)
+              + struct.pack('<I', 0) + struct.pack('<I', free) * 108)
+    fat_data = b''.join(struct.pack('<I', value) for value in fat + [free] * (128 - len(fat)))
+    return header + fat_data + directory + body
+
+
+def make_word_doc(pieces, encrypted=False):
+    """.doc Word 97 : FIB minimal + table des pièces ; pièces [(texte, compressée en cp1252 ?)]"""
+    text_offset = 1024
+    fib = bytearray(text_offset)
+    struct.pack_into('<HH', fib, 0, 0xA5EC, 0x00C1)
+    # 1Table ; chiffré : fEncrypted
+    struct.pack_into('<H', fib, 0x0A, 0x0200 | (0x0100 if encrypted else 0))
+    struct.pack_into('<H', fib, 32, 14)  # csw, puis fibRgW (28 octets)
+    struct.pack_into('<H', fib, 62, 22)  # cslw, puis fibRgLw (88 octets)
+    struct.pack_into('<i', fib, 64 + 3 * 4, sum(len(text) for text, _ in pieces))  # ccpText
+    struct.pack_into('<H', fib, 152, 93)  # cbRgFcLcb, puis fibRgFcLcb97
+
+    body, cps, descriptors = b'', [0], b''
+    for text, compressed in pieces:
+        fc = text_offset + len(body)
+        body += text.encode('cp1252' if compressed else 'utf-16-le')
+        cps.append(cps[-1] + len(text))
+        descriptors += struct.pack('<HIH', 0, fc * 2 | 0x40000000 if compressed else fc, 0)
+    plc = struct.pack(f'<{len(cps)}I', *cps) + descriptors
+    clx = b'\x02' + struct.pack('<I', len(plc)) + plc
+    struct.pack_into('<II', fib, 154 + 33 * 8, 0, len(clx))  # fcClx, lcbClx
+    return make_ole({'WordDocument': bytes(fib) + body, '1Table': clx})
+
+
+def make_compressed_pdf(size_mb):
+    """PDF d'une page dont le flux de contenu se décompresse en `size_mb` Mo (bombe zlib)"""
+    compressor = zlib.compressobj(9)
+    chunk = b'BT /F1 12 Tf (x) Tj ET\n' * 45590
+    stream = b''.join(compressor.compress(chunk) for _ in range(size_mb)) + compressor.flush()
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+        b'/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+        b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(stream), stream),
+    ]
+    data, offsets = b'%PDF-1.4\n', []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(data)
+    data += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    data += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    data += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return data
+
+
+def _extract_in_pool_child(file_path, memory_limit_mb=None):
+    # exécuté dans un enfant billiard, comme une tâche du pool prefork de Celery
+    pool = ExtractionPool(processes=1, timeout=10, memory_limit_mb=memory_limit_mb)
+    return pool.extract(file_path), pool.stats
+
+
+class ExtractionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.path = write_temp_file(self, '.txt', 'Développeur Python\nDjango, PostgreSQL'.encode('utf-8'))
+
+    def test_extract_in_subprocess(self):
+        pool = ExtractionPool(processes=1, timeout=10)
+        self.addCleanup(pool.shutdown)
+        result = pool.extract(self.path)
+        self.assertTrue(result['success'])
+        self.assertIn('Django', result['text'])
+        self.assertEqual(pool.stats['subprocess'], 0)
+
+    def test_extract_in_prefork_worker(self):
+        import billiard
+
+        # les enfants prefork sont des démons : extraction dans un sous-processus lancé par subprocess
+        with billiard.Pool(1) as workers:
+            result, stats = workers.apply(_extract_in_pool_child, (self.path,))
+        self.assertTrue(result['success'], result.get('error'))
+        self.assertIn('Django', result['text'])
+        self.assertEqual(stats['subprocess'], 1)
+
+    def test_memory_limit_in_prefork_worker(self):
+        import billiard
+
+        path = write_temp_file(self, '.pdf', make_compressed_pdf(256))
+        with billiard.Pool(1) as workers:
+            result, stats = workers.apply(_extract_in_pool_child, (path, 128))
+            # le worker prefork (qui porte les modèles) n'est pas touché
+            self.assertTrue(workers.apply(_extract_in_pool_child, (self.path,))[0]['success'])
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error_code'], 'memory')
+        self.assertEqual(stats['memory'], 1)
+
+    def test_hard_timeout_in_subprocess(self):
+        # processus bloqué (comme un parseur coincé dans du code C) : abattu à l'échéance
+        pool = ExtractionPool(processes=1, timeout=0.5)
+        with mock.patch('CVAnalyzer.ai_services.extraction_pool.can_spawn_processes', return_value=False), \
+                mock.patch('CVAnalyzer.ai_services.extraction_pool.HARD_TIMEOUT_GRACE_S', 0.5), \
+                mock.patch('CVAnalyzer.ai_services.extraction_pool._child_command',
+                           return_value=[sys.executable, '-c', 'import time; time.sleep(30)']):
+            result = pool.extract(self.path)
+        self.assertEqual(result['error_code'], 'timeout')
+
+    def test_pool_error_becomes_failure(self):
+        pool = ExtractionPool(processes=1, timeout=10)
+
+        def broken_executor():
+            raise OSError('plus de descripteurs')
+
+        pool._get_executor = broken_executor
+        result = pool.extract(self.path)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error_code'], 'crash')
+
+
+def _iter_pages_in_pool_child(file_path):
+    return list(TextExtractor.iter_pdf_pages(file_path, workers=4))
+
+
+class PdfPagesTests(SimpleTestCase):
+    def setUp(self):
+        self.path = write_temp_file(self, '.pdf', make_pdf([f'Page {number}' for number in range(10)]))
+
+    def test_parallel_pages_in_order(self):
+        pages = list(TextExtractor.iter_pdf_pages(self.path, workers=4))
+        self.assertEqual([number for number, _ in pages], list(range(10)))
+        self.assertEqual(pages[3][1], 'Page 3')
+
+    def test_parallel_pages_in_prefork_worker(self):
+        import billiard
+
+        with billiard.Pool(1) as workers:
+            pages = workers.apply(_iter_pages_in_pool_child, (self.path,))
+        self.assertEqual([text for _, text in pages], [f'Page {number}' for number in range(10)])
+
+    def test_caps(self):
+        pages = list(TextExtractor.iter_pdf_pages(self.path, max_pages=3, max_chars=10))
+        self.assertEqual([text for _, text in pages], ['Page 0', 'Page'])
+
+
+@unittest.skipUnless(has_modules('torch', 'safetensors'), 'torch et safetensors requis')
+class ModelArtifactTests(SimpleTestCase):
+    def make_model(self):
+        import torch
+        import torch.nn as nn
+
+        class Tiny(nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.linear = nn.Linear(4, 3)
+                self.register_buffer('positions', torch.arange(4), persistent=False)
+
+        return Tiny()
+
+    def save(self, tensors):
+        from safetensors.torch import save_file
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'model.safetensors')
+        save_file({name: tensor.contiguous() for name, tensor in tensors.items()}, path)
+        return path
+
+    def test_build_from_artifact_on_meta(self):
+        import torch
+        from CVAnalyzer.ai_services.model_artifacts import build_from_artifact
+
+        source = self.make_model()
+        path = self.save({**dict(source.named_buffers()), **source.state_dict()})
+        model = build_from_artifact(self.make_model, path)
+        self.assertTrue(torch.equal(model.linear.weight, source.linear.weight))
+        self.assertTrue(torch.equal(model.positions, torch.arange(4)))
+        self.assertFalse(any(tensor.is_meta for tensor in [*model.parameters(), *model.buffers()]))
+
+    def test_build_from_old_artifact_without_buffers(self):
+        import torch
+        from CVAnalyzer.ai_services.model_artifacts import build_from_artifact
+
+        source = self.make_model()
+        model = build_from_artifact(self.make_model, self.save(source.state_dict()))
+        self.assertTrue(torch.equal(model.linear.bias, source.linear.bias))
+        self.assertTrue(torch.equal(model.positions, torch.arange(4)))
+
+    def test_other_threads_are_not_affected(self):
+        import torch.nn as nn
+        from CVAnalyzer.ai_services.model_artifacts import build_from_artifact
+
+        source = self.make_model()
+        path = self.save({**dict(source.named_buffers()), **source.state_dict()})
+        built_elsewhere = []
+
+        def build():
+            # un modèle construit dans un autre thread pendant le chargement garde de vrais poids
+            thread = threading.Thread(target=lambda: built_elsewhere.append(nn.Linear(2, 2)))
+            thread.start()
+            thread.join()
+            return self.make_model()
+
+        build_from_artifact(build, path)
+        self.assertFalse(built_elsewhere[0].weight.is_meta)
+
+
+@unittest.skipUnless(has_modules('torch', 'transformers', 'sklearn', 'pandas'), 'dépendances IA requises')
+class ClassifierReloadTests(SimpleTestCase):
+    def setUp(self):
+        from CVAnalyzer.ai_services.ai_trainer import AIModelTrainer
+        from CVAnalyzer.ai_services.model_artifacts import CONFIG_FILE, LABELS_FILE, WEIGHTS_FILE
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for name in (WEIGHTS_FILE, LABELS_FILE, CONFIG_FILE):
+            with open(os.path.join(self.directory, name), 'w') as f:
+                f.write('{}')
+        self.weights = os.path.join(self.directory, WEIGHTS_FILE)
+        self.trainer = AIModelTrainer(model_dir=self.directory)
+        self.loads = []
+
+        def load_artifact(directory):
+            self.loads.append(directory)
+            self.trainer.model = object()
+            self.trainer.label_encoder.classes_ = np.array(['Ancienne', 'Obsolète'], dtype=object)
+
+        self.trainer.load_artifact = load_artifact
+
+    def test_reload_when_artifact_replaced(self):
+        with self.settings(AI_MODEL_CHECK_INTERVAL=0):
+            self.assertTrue(self.trainer.ensure_model())
+            self.assertTrue(self.trainer.ensure_model())
+            self.assertEqual(len(self.loads), 1)
+
+            # réentraînement par un autre processus : nouveaux poids
+            mtime = os.stat(self.weights).st_mtime_ns + 10 ** 9
+            os.utime(self.weights, ns=(mtime, mtime))
+            self.assertTrue(self.trainer.ensure_model())
+            self.assertEqual(len(self.loads), 2)
+
+    def test_check_interval(self):
+        with self.settings(AI_MODEL_CHECK_INTERVAL=3600):
+            self.trainer.ensure_model()
+            mtime = os.stat(self.weights).st_mtime_ns + 10 ** 9
+            os.utime(self.weights, ns=(mtime, mtime))
+            self.trainer.ensure_model()
+            self.assertEqual(len(self.loads), 1)
+
+    def test_retrain_after_artifact_load_refits_labels(self):
+        from CVAnalyzer.ai_services import ai_trainer
+
+        self.trainer.ensure_model()
+        built = []
+
+        def build(model_name, num_classes):
+            built.append(num_classes)
+            raise RuntimeError('arrêt après encodage')
+
+        with mock.patch.object(ai_trainer, 'CVClassifier', side_effect=build):
+            with self.assertRaises(RuntimeError):
+                self.trainer.train_model(['a', 'b', 'c'], ['HR', 'IT', 'Finance'], ['d'], ['IT'], precision='fp32')
+        self.assertEqual(list(self.trainer.label_encoder.classes_), ['Finance', 'HR', 'IT'])
+        self.assertEqual(built, [3])
+
+        y_train, y_val = self.trainer._encode_labels(['IT', 'HR'], ['Finance'])
+        self.assertEqual((list(y_train), list(y_val)), ([2, 1], [0]))
+
+
+class CandidatureTestMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = User.objects.create_user(username='candidat', email='candidat@example.com',
+                                             password='motdepasse', role='candidat')
+
+    def create_candidature(self, **fields):
+        return Candidature.objects.create(
+            candidat=self.user, poste='Développeur',
+            cv=SimpleUploadedFile('cv.txt', b'Python Django'), **fields
+        )
+
+
+class AnalyseTaskTests(CandidatureTestMixin, TestCase):
+    def test_enqueue_failure_marks_echec(self):
+        candidature = self.create_candidature()
+        with mock.patch.object(tasks.analyser_candidature, 'delay', side_effect=ConnectionError('redis down')):
+            self.assertFalse(tasks.enqueue_analyse(candidature.id))
+        candidature.refresh_from_db()
+        self.assertEqual(candidature.analyse_statut, 'echec')
+        self.assertIn('redis down', candidature.analyse_erreur)
+
+    def test_soft_time_limit_marks_echec(self):
+        from celery.exceptions import SoftTimeLimitExceeded
+
+        candidature = self.create_candidature()
+        # module remplacé : la pile IA (torch) n'est pas chargée par le test
+        pipeline = mock.Mock(analyse_candidature=mock.Mock(side_effect=SoftTimeLimitExceeded()))
+        with mock.patch.dict(sys.modules, {'CVAnalyzer.ai_services.candidature_analysis': pipeline}):
+            result = tasks.analyser_candidature.apply(args=(candidature.id,)).get()
+        self.assertEqual(result['error_code'], 'timeout')
+        candidature.refresh_from_db()
+        self.assertEqual(candidature.analyse_statut, 'echec')
+
+    @override_settings(ANALYSE_STALE_AFTER=60)
+    def test_stale_analyses_are_requeued_or_failed(self):
+        pending = self.create_candidature(analyse_statut='en_attente')
+        running = self.create_candidature(analyse_statut='en_cours')
+        recent = self.create_candidature(analyse_statut='en_cours')
+        old = timezone.now() - timedelta(minutes=10)
+        Candidature.objects.filter(id__in=[pending.id, running.id]).update(updated_at=old)
+
+        with mock.patch.object(tasks.analyser_candidature, 'delay') as delay:
+            result = tasks.relancer_analyses_bloquees()
+        delay.assert_called_once_with(pending.id)
+        self.assertEqual(result, {'requeued': 1, 'failed': 1})
+        self.assertEqual(Candidature.objects.get(id=running.id).analyse_statut, 'echec')
+        self.assertEqual(Candidature.objects.get(id=recent.id).analyse_statut, 'en_cours')
+
+
+class CreateCandidatureApiTests(CandidatureTestMixin, TestCase):
+    def test_api_creation_enqueues_analysis(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch.object(tasks.analyser_candidature, 'delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/candidatures/create/', {
+                'poste': 'Développeur',
+                'cv': SimpleUploadedFile('cv.pdf', make_pdf(['Python'])),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        candidature = Candidature.objects.get()
+        self.assertEqual(candidature.analyse_statut, 'en_attente')
+        delay.assert_called_once_with(candidature.id)
+
+
+@unittest.skipUnless(has_modules('torch'), 'torch requis (cache d\'analyse)')
+class ImportCvsTests(CandidatureTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        for name, text in [('alice.pdf', 'Alice Python'), ('bob.pdf', 'Bob Java'), ('copie.pdf', 'Alice Python')]:
+            with open(os.path.join(self.source, name), 'wb') as f:
+                f.write(make_pdf([text]))
+
+    def run_import(self):
+        call_command('import_cvs', self.source, candidat=self.user.email, defer_analysis=True, workers=1,
+                     stdout=open(os.devnull, 'w'), stderr=open(os.devnull, 'w'))
+
+    def stored_files(self):
+        return [name for _, _, names in os.walk(settings.MEDIA_ROOT) for name in names]
+
+    def test_import_deduplicates_and_resumes(self):
+        with mock.patch.object(tasks.analyser_candidature, 'delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.run_import()
+        self.assertEqual(Candidature.objects.count(), 2)
+        self.assertEqual(delay.call_count, 2)
+
+        # relance : les CV déjà importés (même empreinte) sont ignorés
+        with mock.patch.object(tasks.analyser_candidature, 'delay'):
+            self.run_import()
+        self.assertEqual(Candidature.objects.count(), 2)
+        self.assertEqual(len(self.stored_files()), 2)
+
+    def test_failed_batch_leaves_no_files(self):
+        with mock.patch.object(Candidature.objects, 'bulk_create', side_effect=RuntimeError('base indisponible')):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+        self.assertEqual(self.stored_files(), [])
+
+
+class VectorIndexTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(50, 8)).astype(np.float32)
+
+    def test_add_search_remove(self):
+        index = VectorIndex()
+        index.add_many(range(1, 51), self.vectors)
+        self.assertEqual(len(index), 50)
+        self.assertEqual(index.search(self.vectors[9], top_k=1)[0][0], 10)
+
+        self.assertTrue(index.remove(10))
+        self.assertFalse(index.remove(10))
+        self.assertNotIn(10, index)
+        self.assertNotIn(10, [item_id for item_id, _ in index.search(self.vectors[9], top_k=50)])
+        # la dernière ligne a pris la place de la ligne supprimée
+        self.assertEqual(index.search(self.vectors[49], top_k=1)[0][0], 50)
+        self.assertEqual(index.checksum(), sum(range(1, 51)) - 10)
+
+    def test_save_load(self):
+        index = VectorIndex(min_train_size=16)
+        index.add_many(range(1, 51), self.vectors)
+        index.synced_until = timezone.now()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'index.npz')
+        index.save(path)
+
+        loaded = VectorIndex.load(path)
+        self.assertEqual(sorted(loaded.ids()), sorted(index.ids()))
+        self.assertIsNotNone(loaded.centroids)
+        self.assertEqual(loaded.synced_until.timestamp(), index.synced_until.timestamp())
+        self.assertEqual(loaded.search(self.vectors[3], top_k=1)[0][0], 4)
+
+
+class CandidatureIndexSyncTests(CandidatureTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.index = CandidatureIndex(path=os.path.join(directory, 'index.npz'), sync_interval=0)
+        # module remplacé : embedding_store charge la pile IA (torch) via chunking
+        store = mock.Mock(
+            EmbeddingStore=mock.Mock(_fresh_queryset=CandidatureEmbedding.objects.all),
+            decode_vectors=lambda raw, dimension, dtype: np.frombuffer(bytes(raw), dtype=dtype).reshape(-1, dimension),
+        )
+        modules = mock.patch.dict(sys.modules, {'CVAnalyzer.ai_services.embedding_store': store})
+        modules.start()
+        self.addCleanup(modules.stop)
+
+    def create_embedded(self, seed):
+        candidature = self.create_candidature()
+        vector = np.random.default_rng(seed).normal(size=4).astype(np.float32)
+        CandidatureEmbedding.objects.create(candidature=candidature, model_name='test', model_version='1',
+                                            dimension=4, dtype='float32', vector=vector.tobytes())
+        return candidature
+
+    def test_nprobe_from_settings(self):
+        self.create_embedded(1)
+        with override_settings(VECTOR_INDEX_NPROBE=3):
+            call_command('build_vector_index', path=self.index.path, stdout=open(os.devnull, 'w'))
+            self.assertEqual(VectorIndex.load(self.index.path).nprobe, 3)
+        # index relu depuis le disque : le réglage courant s'applique
+        with override_settings(VECTOR_INDEX_NPROBE=12):
+            self.assertEqual(self.index.sync().nprobe, 12)
+
+    def test_queryset_delete_with_insert_is_synced(self):
+        first, second = self.create_embedded(1), self.create_embedded(2)
+        self.assertEqual(sorted(self.index.sync().ids()), [first.id, second.id])
+
+        # suppression hors Candidature.delete compensée par un ajout validé après le filigrane
+        # (transaction longue) : même nombre d'ids en base et dans l'index
+        Candidature.objects.filter(id=first.id).delete()
+        third = self.create_embedded(3)
+        CandidatureEmbedding.objects.filter(candidature=third).update(
+            updated_at=self.index.index.synced_until - timedelta(seconds=1)
+        )
+        self.assertEqual(sorted(self.index.sync().ids()), [second.id, third.id])
+
+
+class WordTokenizer:
+    """Tokeniseur factice : un token par mot"""
+    is_fast = False
+
+    def __call__(self, text, **kwargs):
+        return {'input_ids': list(range(len(text.split())))}
+
+
+@unittest.skipUnless(has_modules('torch'), 'torch requis')
+class TokenChunkerTests(SimpleTestCase):
+    def test_windows_within_budget(self):
+        from CVAnalyzer.ai_services.chunking import TokenChunker
+
+        chunker = TokenChunker(WordTokenizer(), window_size=4, overlap=2, token_budget=8)
+        windows, info = chunker.split_ids('a b c d e f g h i j')
+        self.assertEqual(windows, [[0, 1, 2, 3], [2, 3, 4, 5], [4, 5, 6, 7]])
+        self.assertEqual(info['used_tokens'], 8)
+        self.assertTrue(info['truncated'])
+
+    def test_character_cut_marks_truncated(self):
+        from CVAnalyzer.ai_services.chunking import MAX_CHARS_PER_TOKEN, TokenChunker
+
+        chunker = TokenChunker(WordTokenizer(), window_size=4, overlap=0, token_budget=2)
+        # moins de tokens que le budget après la coupe, mais du texte a été retiré
+        _, info = chunker.split_ids('x' * (2 * MAX_CHARS_PER_TOKEN + 5))
+        self.assertEqual(info['tokens'], 1)
+        self.assertTrue(info['truncated'])
+
+        _, info = chunker.split_ids('a b')
+        self.assertFalse(info['truncated'])
+
+
+class InferenceEncodeTests(SimpleTestCase):
+    @override_settings(AI_BATCH_TIMEOUT=0.2)
+    def test_timeout_cancels_queued_texts(self):
+        from CVAnalyzer.ai_services.inference_server import InferenceService, RequestError
+        from CVAnalyzer.ai_services.micro_batcher import MicroBatcher
+
+        release, batches = threading.Event(), []
+
+        def process_batch(texts):
+            batches.append(list(texts))
+            release.wait(5)
+            return [[0.0] for _ in texts]
+
+        # service sans modèles : seul le micro-batcher d'encodage est utilisé
+        service = InferenceService.__new__(InferenceService)
+        service.encode_batcher = MicroBatcher(process_batch, name='test', max_batch_size=1, max_wait_ms=0)
+        with self.assertRaises(RequestError) as context:
+            service.encode({'texts': ['a', 'b', 'c']})
+        self.assertEqual(context.exception.status, 504)
+
+        release.set()
+        # les textes encore en file ne sont plus calculés
+        self.assertEqual(service.encode({'texts': ['d']}), {'embeddings': [[0.0]]})
+        self.assertEqual(batches, [['a'], ['d']])
+
+
+def legacy_extract_skills(skills_keywords, text):
+    """Ancienne détection : un re.search par mot-clé"""
+    text_lower = text.lower()
+    found_skills = {}
+    for category, skills_list in skills_keywords.items():
+        found = [skill for skill in skills_list
+                 if re.search(r'\b' + re.escape(skill.lower()) + r'\b', text_lower)]
+        if found:
+            found_skills[category] = found
+    return found_skills
+
+
+class SkillMatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.categories = SkillsTaxonomy(check_interval=0).get_index().categories
+        self.matcher = SkillMatcher(self.categories)
+
+    def test_matches_legacy_regexes(self):
+        rng = random.Random(0)
+        skills = [skill for skills_list in self.categories.values() for skill in skills_list]
+        # mots-clés collés, préfixes, majuscules et ponctuation autour des frontières de mots
+        noise = ['', ' ', '\n', ', ', '.', '/', '-', '+', '#', 'x', 'é', '_', '(', ')']
+        for _ in range(500):
+            parts = []
+            for _ in range(rng.randint(1, 12)):
+                skill = rng.choice(skills)
+                if rng.random() < 0.3:
+                    skill = skill[:rng.randint(1, len(skill))]
+                parts.append(rng.choice(noise) + (skill.upper() if rng.random() < 0.2 else skill))
+            text = ''.join(parts) + rng.choice(noise)
+            self.assertEqual(self.matcher.match(text), legacy_extract_skills(self.categories, text), text)
+
+    def test_overlapping_keywords(self):
+        categories = {'tools': ['C', 'C++', 'C#', 'project', 'project management', 'node.js']}
+        text = 'Project management, C++ et Node.js ; pas de Cobol'
+        # comme l'ancien \bc\+\+\b, "C++" suivi d'un espace n'est pas reconnu
+        self.assertEqual(SkillMatcher(categories).match(text), legacy_extract_skills(categories, text))
+        self.assertEqual(SkillMatcher(categories).match(text), {'tools': ['C', 'project', 'project management', 'node.js']})
+
+    def test_aliases_and_pages(self):
+        matcher = SkillMatcher({'devops': ['kubernetes', 'docker']}, aliases={'k8s': 'kubernetes'})
+        self.assertEqual(matcher.match('Déploiement K8s'), {'devops': ['kubernetes']})
+        self.assertEqual(matcher.match_pages(['Docker', 'k8s']), {'devops': ['kubernetes', 'docker']})
+        self.assertEqual(matcher.match('Docker', categories=['langues']), {})
+
+    def test_taxonomy_aliases(self):
+        matcher = SkillsTaxonomy(check_interval=0).get_index().matcher
+        # "node" seul (node d'un graphe, d'un cluster) n'est pas Node.js ; OpenSearch n'est pas Elasticsearch
+        self.assertEqual(matcher.match('Cluster de 3 nodes, un node maître'), {})
+        self.assertEqual(matcher.match('API en Node.js'), {'frameworks': ['nodejs']})
+        self.assertEqual(matcher.match('OpenSearch et Elastic Search'), {'databases': ['elasticsearch', 'opensearch']})
+
+
+def legacy_clean_extracted_text(text):
+    """Ancien nettoyage : lignes non vides jointes, puis espaces réduits par regex"""
+    if not text:
+        return ""
+    cleaned_lines = [line.strip() for line in text.split('\n') if line.strip()]
+    return re.sub(r'\s+', ' ', ' '.join(cleaned_lines)).strip()
+
+
+class TextNormalizerTests(SimpleTestCase):
+    ALPHABET = ['a', 'b', 'é', '1', '-', ' ', '  ', '\n', '\t', '\r\n', '\xa0', ' ', '\x0c']
+
+    def random_fragments(self, rng):
+        return [''.join(rng.choice(self.ALPHABET) for _ in range(rng.randint(0, 6)))
+                for _ in range(rng.randint(0, 8))]
+
+    def test_matches_legacy_cleaning(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            text = ''.join(self.random_fragments(rng))
+            self.assertEqual(TextExtractor.clean_extracted_text(text), legacy_clean_extracted_text(text), repr(text))
+
+    def test_streaming_equals_one_shot(self):
+        rng = random.Random(1)
+        for _ in range(2000):
+            fragments = self.random_fragments(rng)
+            normalizer = TextNormalizer()
+            for fragment in fragments:
+                normalizer.feed(fragment)
+            text = ''.join(fragments)
+            self.assertEqual(normalizer.result(), {'text': text.strip(), 'cleaned_text': TextNormalizer.clean(text)},
+                             repr(fragments))
+
+    def test_word_split_across_fragments(self):
+        normalizer = TextNormalizer()
+        for fragment in ['Comp', 'étences\n', '  Py', 'thon']:
+            normalizer.feed(fragment)
+        self.assertEqual(normalizer.cleaned_text(), 'Compétences Python')
+
+
+CV_TEXT = ('Développeuse Python senior : huit ans de Django, PostgreSQL et Celery. '
+           'Conception d\'API REST, tests automatisés, intégration continue, revue de code, '
+           'encadrement d\'une équipe de quatre personnes, migration vers Kubernetes et suivi '
+           'de production avec Prometheus. Anglais courant, espagnol professionnel.')
+
+
+class DocStringsTests(SimpleTestCase):
+    def write_doc(self, word_document):
+        return write_temp_file(self, '.doc', make_ole({
+            'WordDocument': word_document,
+            '1Table': b'',
+            'CompObj': b'\x01\xfe\x00\x00Microsoft Word 97-2003 Document\x00MSWordDoc\x00Word.Document.8\x00',
+            'SummaryInformation': 'Times New Roman'.encode('utf-16-le'),
+        }))
+
+    def test_ole_metadata_is_not_a_cv(self):
+        # FIB illisible (chiffré, corrompu) et aucun texte : échec, pas les noms de flux
+        path = self.write_doc(b'')
+        self.assertFalse(extract_doc_strings(path)['success'])
+        result = get_extractor_registry().extract(path)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['fallbacks'], 2)
+
+    def test_text_of_unreadable_doc(self):
+        path = self.write_doc(b'\x00' * 512 + CV_TEXT.encode('utf-16-le'))
+        result = get_extractor_registry().extract(path)
+        self.assertTrue(result['success'], result.get('error'))
+        self.assertEqual(result['extractor'], 'doc-strings')
+        # texte du CV (suivi des noms de polices), sans les noms de flux du conteneur
+        self.assertTrue(result['text'].startswith(CV_TEXT))
+        self.assertNotIn('WordDocument', result['text'])
+        self.assertNotIn('MSWordDoc', result['text'])
+
+        # lecture par blocs : suites recollées d'un bloc à l'autre
+        with mock.patch('CVAnalyzer.ai_services.extractor_registry.STRINGS_CHUNK_SIZE', 7):
+            self.assertEqual(extract_doc_strings(path)['text'], result['text'])
+        self.assertEqual(extract_doc_strings(path, max_chars=300)['text'], CV_TEXT[:300])
+
+
+class ExtractorFormatTests(SimpleTestCase):
+    def test_markup_renamed_is_rejected(self):
+        for suffix, data in [('.doc', b'{\\rtf1\\ansi Python Django}'),
+                             ('.pdf', b'\xef\xbb\xbf\n<!DOCTYPE html><html><body>Python</body></html>'),
+                             ('.doc', b'<?xml version="1.0"?>\n<html xmlns="http://www.w3.org/1999/xhtml"></html>')]:
+            result = TextExtractor.extract_text_from_file(write_temp_file(self, suffix, data))
+            self.assertFalse(result['success'], data)
+            self.assertIn('non supporté', result['error'])
+
+    def test_max_chars_for_every_format(self):
+        import docx
+
+        document = docx.Document()
+        for index in range(200):
+            document.add_paragraph(f'Paragraphe {index} : Python, Django, PostgreSQL')
+        fd, docx_path = tempfile.mkstemp(suffix='.docx')
+        os.close(fd)
+        self.addCleanup(os.remove, docx_path)
+        document.save(docx_path)
+        txt_path = write_temp_file(self, '.txt', ('Python Django ' * 1000).encode('utf-8'))
+
+        for path in (docx_path, txt_path):
+            result = TextExtractor.extract_text_from_file(path, max_chars=100)
+            self.assertTrue(result['success'], result.get('error'))
+            self.assertLessEqual(len(result['text']), 100)
+            self.assertLessEqual(len(result['cleaned_text']), 100)
+        self.assertLessEqual(len(TextExtractor.extract_from_docx(docx_path, max_chars=100)['text']), 100)
+        with override_settings(PDF_MAX_CHARS=50):
+            self.assertLessEqual(len(TextExtractor.extract_text_from_file(txt_path)['text']), 50)
+
+
+class DocPieceTableTests(SimpleTestCase):
+    def test_8bit_and_utf16_pieces(self):
+        path = write_temp_file(self, '.doc', make_word_doc([
+            ('Expérience\r', True),
+            ('Développeur Python – Ünïcode\x0bDjango\x07', False),
+            ('\x13 HYPERLINK "https://exemple.fr" \x14exemple.fr\x15\r', True),
+        ]))
+        result = extract_doc_ole(path)
+        self.assertEqual(result['pieces'], 3)
+        self.assertEqual(result['text'], 'Expérience\nDéveloppeur Python – Ünïcode\nDjango\texemple.fr')
+        self.assertEqual(result['cleaned_text'], 'Expérience Développeur Python – Ünïcode Django exemple.fr')
+
+        result = get_extractor_registry().extract(path)
+        self.assertEqual((result['extractor'], result['fallbacks']), ('ole-piece-table', 0))
+        self.assertEqual(extract_doc_ole(path, max_chars=5)['text'], 'Expér')
+
+    def test_encrypted_doc_falls_back(self):
+        path = write_temp_file(self, '.doc', make_word_doc([(CV_TEXT, False)], encrypted=True))
+        with self.assertRaisesRegex(ValueError, 'chiffré'):
+            extract_doc_ole(path)
+        result = get_extractor_registry().extract(path)
+        self.assertEqual((result['extractor'], result['fallbacks']), ('doc-strings', 1))
+        self.assertTrue(result['text'].startswith(CV_TEXT))
+
+
+class ExtractorChainTests(SimpleTestCase):
+    def test_fallback_chain_and_metrics(self):
+        path = write_temp_file(self, '.txt', b'Python Django')
+        registry = ExtractorRegistry()
+
+        def broken(file_path, **options):
+            raise ValueError('parseur en panne')
+
+        registry.register(MIME_TEXT, 'vide', lambda file_path, **options: {'success': True, 'text': ''})
+        registry.register(MIME_TEXT, 'lecture', lambda file_path, **options: {'success': True, 'text': 'Python'})
+        registry.register(MIME_TEXT, 'en-panne', broken, fallback=False)
+        self.assertEqual(registry.extractors_for(MIME_TEXT), ['en-panne', 'vide', 'lecture'])
+
+        result = registry.extract(path)
+        self.assertEqual((result['success'], result['extractor'], result['fallbacks']), (True, 'lecture', 2))
+
+        # chaîne épuisée : échec structuré avec les erreurs de chaque extracteur
+        registry._chains[MIME_TEXT].pop()
+        result = registry.extract(path)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'en-panne: parseur en panne ; vide: aucun texte extrait')
+        self.assertEqual(registry.stats()['documents'], {MIME_TEXT: 2})
+        self.assertEqual(registry.stats()['fallbacks'], {MIME_TEXT: 4})
+        self.assertEqual(registry.stats()['failures'], {MIME_TEXT: 1})
+
+
+@unittest.skipUnless(has_modules('torch', 'transformers', 'sentence_transformers'), 'dépendances IA requises')
+class AnalyzerVersionTests(SimpleTestCase):
+    def test_version_follows_ner_model_and_inference_mode(self):
+        from CVAnalyzer.ai_services.analysis_cache import current_analyzer_version
+
+        with mock.patch('torch.cuda.is_available', return_value=False):
+            with override_settings(AI_INFERENCE_MODE='fp32'):
+                fp32 = current_analyzer_version()
+            with override_settings(AI_INFERENCE_MODE='int8'):
+                int8 = current_analyzer_version()
+            with override_settings(NER_MODEL_NAME='dslim/bert-base-NER'):
+                other_ner = current_analyzer_version()
+        self.assertNotEqual(fp32, int8)
+        self.assertIn('dslim/bert-base-NER', other_ner)
+        self.assertEqual(len({fp32, int8, other_ner}), 3)
+
+
+@unittest.skipUnless(has_modules('torch'), 'torch requis')
+class AnalysisCacheTests(TestCase):
+    def setUp(self):
+        from CVAnalyzer.ai_services import analysis_cache
+
+        self.version = 'v1'
+        patcher = mock.patch.object(analysis_cache, 'current_analyzer_version', lambda: self.version)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = analysis_cache.AnalysisCache(max_entries=3, max_bytes=10 ** 6, ttl_days=30)
+        self.cache.evict_probability = 0
+
+    def entries(self):
+        from CVAnalyzer.models import AnalysisCache as AnalysisCacheEntry
+
+        return AnalysisCacheEntry.objects
+
+    def touch(self, content_hash, **fields):
+        self.entries().filter(content_hash=content_hash).update(**fields)
+
+    def test_hit_on_identical_bytes(self):
+        from CVAnalyzer.ai_services.analysis_cache import hash_file
+
+        first = write_temp_file(self, '.pdf', make_pdf(['Jean Dupont']))
+        copy = write_temp_file(self, '.pdf', make_pdf(['Jean Dupont']))
+        other = write_temp_file(self, '.pdf', make_pdf(['Marie Curie']))
+        self.cache.set(hash_file(first), 'Jean Dupont', {'skills': {}})
+
+        self.assertEqual(self.cache.get(hash_file(copy)), {'text': 'Jean Dupont', 'result': {'skills': {}}})
+        self.assertIsNone(self.cache.get(hash_file(other)))
+        self.assertEqual(self.entries().get().hits, 1)
+
+    def test_miss_after_version_change(self):
+        self.cache.set('a' * 64, 'texte', {'score': 1})
+        self.version = 'v2'
+
+        self.assertIsNone(self.cache.get('a' * 64))
+        # le texte extrait reste réutilisable, pas le résultat de l'ancienne analyse
+        self.assertEqual(self.cache.get_many(['a' * 64]), {'a' * 64: {'text': 'texte', 'result': None}})
+
+        self.cache.set('a' * 64, 'texte', {'score': 2})
+        self.assertEqual(self.cache.get('a' * 64)['result'], {'score': 2})
+        self.assertEqual(self.entries().count(), 2)
+
+    def test_lru_eviction(self):
+        now = timezone.now()
+        for age, content_hash in enumerate('abcd'):
+            self.cache.set(content_hash, content_hash, {})
+            self.touch(content_hash, last_access=now - timedelta(hours=10 - age))
+        # accès récent : 'a' devient la plus récemment utilisée
+        self.cache.get('a')
+
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertEqual(sorted(self.entries().values_list('content_hash', flat=True)), ['a', 'c', 'd'])
+
+    def test_size_eviction(self):
+        self.cache.max_bytes = 100
+        now = timezone.now()
+        for age, content_hash in enumerate('abc'):
+            self.cache.set(content_hash, 'x' * 40, {})
+            self.touch(content_hash, last_access=now - timedelta(hours=10 - age))
+
+        self.cache.evict()
+        self.assertEqual(sorted(self.entries().values_list('content_hash', flat=True)), ['b', 'c'])
+
+    def test_ttl_expiry(self):
+        self.cache.set('a', 'ancien', {})
+        self.cache.set('b', 'récent', {})
+        self.touch('a', created_at=timezone.now() - timedelta(days=31))
+
+        self.assertIsNone(self.cache.get('a'))
+        self.assertFalse(self.entries().filter(content_hash='a').exists())
+        self.assertEqual(self.cache.get_many(['b'])['b']['text'], 'récent')
+
+        self.touch('b', created_at=timezone.now() - timedelta(days=31))
+        self.assertEqual(self.cache.get_many(['b'])['b']['result'], None)
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertEqual(self.entries().count(), 0)
@@ -0,0 +1,26 @@
+# GESTIONNAIRES D'UPLOAD - écriture en flux des fichiers reçus
+import hashlib
+
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class HashingTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Écrit chaque fichier reçu par blocs dans un fichier temporaire (jamais
+    entièrement en mémoire) et calcule son SHA-256 au passage. Le stockage
+    déplace ensuite ce fichier vers MEDIA_ROOT au lieu de le recopier, et
+    l'empreinte (`content_hash`) évite de relire le fichier pour le cache d'analyse.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        uploaded_file.content_hash = self.digest.hexdigest()
+        return uploaded_file
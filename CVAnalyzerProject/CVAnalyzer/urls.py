@@ -22,6 +22,7 @@ def api_status(request):
             'GET /api/candidatures/{id}/',
             'PUT /api/candidatures/{id}/',
             'DELETE /api/candidatures/{id}/',
+            'POST /api/candidatures/search/',
             'GET /api/security/status/',
             'GET /api/security/csrf-token/',
             'POST /api/security/test-xss/',
@@ -57,6 +58,7 @@ urlpatterns = [
     path('api/candidatures/<int:candidature_id>/', api_views.get_candidature, name='get-candidature'),
     path('api/candidatures/<int:candidature_id>/update/', api_views.update_candidature, name='update-candidature'),
     path('api/candidatures/<int:candidature_id>/delete/', api_views.delete_candidature, name='delete-candidature'),
+    path('api/candidatures/search/', api_views.search_candidatures, name='search-candidatures'),
     
     # Sécurité API
     path('api/security/status/', security_views.security_status, name='security-status'),
@@ -91,6 +93,7 @@ urlpatterns = [
     
     # Fonctionnalités
     path('upload/', template_views.upload_documents, name='upload-documents'),
+    path('candidature/<int:candidature_id>/analyse/statut/', template_views.analyse_status, name='analyse-status'),
     path('auth-status/', template_views.check_auth_status, name='auth-status'),
     
     # ================================================================================================
@@ -2,17 +2,43 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import json
-from ..ai_services.ai_trainer import AIModelTrainer
-from ..ai_services.dataset_manager import DatasetManager
-from ..ai_services.cv_analyzer import CVAnalyzer
+import threading
 
-trainer = AIModelTrainer()
-dataset_manager = DatasetManager()
+from ..ai_services.inference_client import InferenceServiceError, get_inference_client
+from ..ai_services.micro_batcher import InferenceOverloaded
+
+# trainer et gestionnaire de dataset créés à la première requête IA (tokenizer, torch, pandas...)
+_dataset_manager = None
+_services_lock = threading.Lock()
+
+def get_trainer():
+    from ..ai_services.ai_trainer import get_trainer as get_shared_trainer
+    return get_shared_trainer()
+
+def get_predictor():
+    # service d'inférence dédié si AI_INFERENCE_URL est configuré, sinon modèles dans ce worker
+    return get_inference_client() or get_trainer()
+
+def get_dataset_manager():
+    global _dataset_manager
+    if _dataset_manager is None:
+        with _services_lock:
+            if _dataset_manager is None:
+                from ..ai_services.dataset_manager import DatasetManager
+                _dataset_manager = DatasetManager()
+    return _dataset_manager
+
+def overloaded_response(error):
+    # file d'inférence pleine : le client réessaie plus tard au lieu d'attendre derrière tous les autres
+    response = JsonResponse({"success": False, "error": str(error)}, status=503)
+    response['Retry-After'] = '1'
+    return response
 
 @csrf_exempt
 @require_http_methods(["POST"])
 def train_ai_model(request):
     try:
+        trainer, dataset_manager = get_trainer(), get_dataset_manager()
         data = json.loads(request.body)
         
         load_result = dataset_manager.load_dataset()
@@ -32,7 +58,10 @@ def train_ai_model(request):
             split_result["y_train"],
             split_result["X_test"], 
             split_result["y_test"],
-            epochs=data.get("epochs", 3)
+            epochs=data.get("epochs", 3),
+            batch_size=data.get("batch_size", 16),
+            accumulation_steps=data.get("accumulation_steps"),
+            precision=data.get("precision")
         )
         
         return JsonResponse(train_result)
@@ -44,15 +73,20 @@ def train_ai_model(request):
 @require_http_methods(["POST"])
 def predict_cv_category(request):
     try:
+        predictor = get_predictor()
         data = json.loads(request.body)
         cv_text = data.get("cv_text")
         
         if not cv_text:
             return JsonResponse({"error": "cv_text requis"}, status=400)
         
-        prediction = trainer.predict(cv_text)
+        prediction = predictor.predict(cv_text)
         return JsonResponse({"success": True, "prediction": prediction})
         
+    except InferenceOverloaded as e:
+        return overloaded_response(e)
+    except InferenceServiceError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=502)
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=500)
 
@@ -60,6 +94,7 @@ def predict_cv_category(request):
 @require_http_methods(["POST"])
 def score_cv_job_match(request):
     try:
+        predictor = get_predictor()
         data = json.loads(request.body)
         cv_text = data.get("cv_text")
         job_description = data.get("job_description")
@@ -68,9 +103,13 @@ def score_cv_job_match(request):
         if not cv_text or not job_description:
             return JsonResponse({"error": "cv_text et job_description requis"}, status=400)
         
-        score_result = trainer.score_cv_for_job(cv_text, job_description, target_category)
+        score_result = predictor.score_cv_for_job(cv_text, job_description, target_category)
         return JsonResponse({"success": True, "scoring": score_result})
         
+    except InferenceOverloaded as e:
+        return overloaded_response(e)
+    except InferenceServiceError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=502)
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=500)
 
@@ -78,7 +117,8 @@ def score_cv_job_match(request):
 @require_http_methods(["GET"])
 def get_model_metrics(request):
     try:
-        if not hasattr(trainer, 'model') or trainer.model is None:
+        trainer, dataset_manager = get_trainer(), get_dataset_manager()
+        if not trainer.ensure_model():
             return JsonResponse({"error": "Modèle non entraîné"}, status=400)
         
         split_result = dataset_manager.get_train_test_split()
@@ -93,7 +133,7 @@ def get_model_metrics(request):
         )
         
         metrics = trainer.evaluate(test_dataset)
-        return JsonResponse({"success": True, "metrics": metrics})
+        return JsonResponse({"success": True, "metrics": metrics, "batching": trainer.batching_stats()})
         
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=500)
@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import login
+from django.db import transaction
 from ..permissions import IsAdmin, IsRecruteurOrAdmin
 from ..serializers import (
     UserRegistrationSerializer, 
@@ -16,6 +17,7 @@ from ..serializers import (
     CandidatureUpdateSerializer
 )
 from ..models import User, Candidature
+from ..tasks import enqueue_analyse
 
 
 # endpoint de vérification de l'état de l'API
@@ -155,6 +157,8 @@ def create_candidature(request):
     serializer = CandidatureCreateSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         candidature = serializer.save()
+        # analyse IA en arrière-plan, comme pour le dépôt depuis le site
+        transaction.on_commit(lambda: enqueue_analyse(candidature.id))
         
         # retourner la candidature créée
         response_serializer = CandidatureListSerializer(candidature, context={'request': request})
@@ -280,4 +284,67 @@ def delete_candidature(request, candidature_id):
     candidature.delete()
     return Response({
         'message': 'Candidature supprimée avec succès'
-    }, status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+    }, status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['POST'])
+@permission_classes([IsRecruteurOrAdmin])
+def search_candidatures(request):
+    """Meilleures candidatures pour une offre (similarité sémantique sur l'index vectoriel)"""
+    job_description = request.data.get('job_description', '').strip()
+    if not job_description:
+        return Response({
+            'error': 'job_description requis'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        top_k = min(max(int(request.data.get('top_k', 20)), 1), 200)
+    except (TypeError, ValueError):
+        return Response({
+            'error': 'top_k doit être un entier'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    import numpy as np
+    
+    from ..ai_services.inference_client import InferenceServiceError, get_inference_client
+    from ..ai_services.micro_batcher import InferenceOverloaded
+    from ..ai_services.vector_index import candidature_index
+    
+    client = get_inference_client()
+    if client is not None:
+        # encodage par le service d'inférence : ce worker ne charge pas le Sentence Transformer
+        try:
+            query_vector = np.asarray(client.encode_documents([job_description])[0], dtype=np.float32)
+        except (InferenceOverloaded, InferenceServiceError) as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    else:
+        from ..ai_services.cv_analyzer import CVAnalyzer
+        
+        analyzer = CVAnalyzer()
+        if not analyzer.sentence_model:
+            return Response({
+                'error': 'Modèle d\'encodage indisponible'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        query_vector = analyzer.encode_documents([job_description])[0].float().cpu().numpy()
+    results = candidature_index.search(query_vector, top_k=top_k)
+    
+    candidatures = Candidature.objects.in_bulk([candidature_id for candidature_id, _ in results])
+    ranking = []
+    for candidature_id, score in results:
+        candidature = candidatures.get(candidature_id)
+        if candidature is None:
+            continue
+        ranking.append({
+            'candidature_id': candidature_id,
+            'score': round(score * 100, 2),
+            'poste': candidature.poste,
+            'score_ia': candidature.score_ia,
+        })
+    
+    return Response({
+        'count': len(ranking),
+        'results': ranking
+    })
+
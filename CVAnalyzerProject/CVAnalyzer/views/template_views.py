@@ -5,18 +5,15 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 import os
 import json
 import mimetypes
 
-# Import des services IA
-from ..ai_services.text_extractor import TextExtractor
-from ..ai_services.cv_analyzer import CVAnalyzer
 from ..models import Candidature
+# Analyse IA en tâche de fond (Celery)
+from ..tasks import enqueue_analyse
 
 # Utiliser le modèle User personnalisé
 User = get_user_model()
@@ -98,7 +95,7 @@ def logout_view(request):
 @login_required
 def upload_documents(request):
     """
-    Vue pour gérer l'upload de CV et lettre de motivation avec analyse IA
+    Vue pour gérer l'upload de CV et lettre de motivation (analyse IA en tâche de fond)
     """
     if request.method == 'POST':
         try:
@@ -131,86 +128,29 @@ def upload_documents(request):
                         'message': 'Format de fichier lettre de motivation non supporté. Utilisez PDF, DOC ou DOCX.'
                     })
             
-            # sauvegarde temporaire du fichier CV
-            cv_path = default_storage.save(f'temp_cv/{cv_file.name}', ContentFile(cv_file.read()))
-            cv_full_path = os.path.join(default_storage.location, cv_path)
-            
-            lettre_full_path = None
-            if lettre_file:
-                lettre_path = default_storage.save(f'temp_lettre/{lettre_file.name}', ContentFile(lettre_file.read()))
-                lettre_full_path = os.path.join(default_storage.location, lettre_path)
-            
-            extractor = TextExtractor()
-            
-            if cv_extension == 'pdf':
-                extraction_result = extractor.extract_from_pdf(cv_full_path)
-            else:  # doc/docx
-                extraction_result = extractor.extract_from_docx(cv_full_path)
-            
-            if not extraction_result['success']:
-                # nettoyage des fichiers temporaires
-                if os.path.exists(cv_full_path):
-                    os.remove(cv_full_path)
-                if lettre_full_path and os.path.exists(lettre_full_path):
-                    os.remove(lettre_full_path)
-                return JsonResponse({
-                    'success': False,
-                    'message': f'Erreur lors de l\'extraction du texte du CV: {extraction_result["error"]}'
-                })
-            
-            extracted_text = extraction_result['text']
-            
-            # analyse IA du CV avec optimisations GPU
-            analyzer = CVAnalyzer()
-            
-            # affichage des informations GPU
-            gpu_info = analyzer.get_gpu_info()
-            print(f"🔧 Configuration GPU: {gpu_info}")
-            
-            try:
-                # analyse des compétences
-                skills_analysis = analyzer.extract_skills(extracted_text)
-
-                # analyse de l'expérience
-                experience_analysis = analyzer.extract_experience(extracted_text)
-                
-                # calcul du score global
-                overall_score = analyzer.calculate_overall_score({
-                    'skills': skills_analysis,
-                    'experience': experience_analysis,
-                    'text_length': len(extracted_text)
-                })
-                
-                print(f"✅ Analyse terminée - Score: {overall_score}% (GPU: {gpu_info.get('gpu_available', False)})")
-                
-            finally:
-                analyzer.cleanup_gpu_memory()
-            
+            # la candidature est enregistrée tout de suite, l'analyse IA part en arrière-plan
             candidature = Candidature.objects.create(
                 candidat=request.user,
                 poste='Candidature spontanée',  # TODO: mettre des postes custom si on a le temps
                 entreprise='CIVIA Corp.', # TODO: mettre entreprise custom si on a le temps
-                cv=cv_file,
+                cv=cv_file,  # fichier temporaire déplacé tel quel vers le stockage
+                cv_hash=getattr(cv_file, 'content_hash', ''),  # calculé pendant la réception
                 lettre_motivation=lettre_file if lettre_file else None,
                 status='en_attente',
-                score_ia=overall_score,
-                competences_extraites=skills_analysis,
-                commentaires=f'CV analysé automatiquement. Score: {overall_score}% - GPU: {gpu_info.get("gpu_available", False)}'
+                analyse_statut='en_attente',
+                commentaires='CV en attente d\'analyse automatique.'
             )
             
-            # nettoyage des fichiers temporaires
-            if os.path.exists(cv_full_path):
-                os.remove(cv_full_path)
-            if lettre_full_path and os.path.exists(lettre_full_path):
-                os.remove(lettre_full_path)
+            # envoi de la tâche une fois la transaction validée (le worker doit voir la ligne)
+            transaction.on_commit(lambda: enqueue_analyse(candidature.id))
             
             return JsonResponse({
                 'success': True,
-                'message': 'Candidature analysée avec succès !',
+                'message': 'Candidature enregistrée, analyse IA en cours...',
                 'data': {
                     'candidature_id': candidature.id,
-                    'score_ia': overall_score,
-                    'competences_trouvees': len(skills_analysis.get('skills', [])),
+                    'analyse_statut': candidature.analyse_statut,
+                    'status_url': f'/candidature/{candidature.id}/analyse/statut/',
                     'documents_soumis': {
                         'cv': cv_file.name,
                         'lettre': lettre_file.name if lettre_file else None
@@ -220,12 +160,6 @@ def upload_documents(request):
             })
             
         except Exception as e:
-            # Nettoyage en cas d'erreur
-            if 'cv_full_path' in locals() and os.path.exists(cv_full_path):
-                os.remove(cv_full_path)
-            if 'lettre_full_path' in locals() and lettre_full_path and os.path.exists(lettre_full_path):
-                os.remove(lettre_full_path)
-            
             return JsonResponse({
                 'success': False,
                 'message': f'Erreur lors du traitement: {str(e)}'
@@ -233,6 +167,31 @@ def upload_documents(request):
     
     return JsonResponse({'success': False, 'message': 'Méthode non autorisée'})
 
+
+# progression de l'analyse IA d'une candidature
+@login_required
+def analyse_status(request, candidature_id):
+    try:
+        candidature = Candidature.objects.get(id=candidature_id)
+    except Candidature.DoesNotExist:
+        return JsonResponse({'success': False, 'message': 'Candidature non trouvée.'}, status=404)
+    
+    if request.user.role == 'candidat' and candidature.candidat != request.user:
+        return JsonResponse({'success': False, 'message': 'Accès non autorisé.'}, status=403)
+    
+    competences = candidature.competences_extraites or {}
+    return JsonResponse({
+        'success': True,
+        'data': {
+            'candidature_id': candidature.id,
+            'analyse_statut': candidature.analyse_statut,
+            'analyse_progression': candidature.analyse_progression,
+            'analyse_erreur': candidature.analyse_erreur,
+            'score_ia': candidature.score_ia,
+            'competences_trouvees': sum(len(skills) for skills in competences.values()) if isinstance(competences, dict) else len(competences),
+        }
+    })
+
 # check si le user est co
 def check_auth_status(request):
     if request.user.is_authenticated:
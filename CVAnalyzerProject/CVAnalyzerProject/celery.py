@@ -0,0 +1,19 @@
+"""
+Application Celery du projet (analyse IA des CV en arrière-plan).
+
+Lancée par les services `worker` et `beat` de docker-compose.prod.yml :
+    celery -A CVAnalyzerProject worker --loglevel=info
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CVAnalyzerProject.settings')
+
+app = Celery('CVAnalyzerProject')
+
+# toutes les options CELERY_* de settings.py
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# découvre CVAnalyzer/tasks.py
+app.autodiscover_tasks()
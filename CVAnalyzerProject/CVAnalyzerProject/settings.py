@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -128,6 +129,10 @@ MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 # File upload settings
+# les fichiers sont écrits par blocs dans un fichier temporaire puis déplacés vers MEDIA_ROOT
+FILE_UPLOAD_HANDLERS = ['CVAnalyzer.upload_handlers.HashingTemporaryFileUploadHandler']
+# sur le même système de fichiers que MEDIA_ROOT, le déplacement est un simple renommage
+FILE_UPLOAD_TEMP_DIR = os.environ.get('FILE_UPLOAD_TEMP_DIR') or None
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 
@@ -194,3 +199,108 @@ SESSION_COOKIE_AGE = 3600  # 1 heure
 SECURE_REFERRER_POLICY = 'strict-origin-when-cross-origin'
 
 
+# Services IA
+
+# Taxonomie des compétences (JSON versionné, rechargé à chaud par les workers)
+SKILLS_TAXONOMY_PATH = os.environ.get(
+    'SKILLS_TAXONOMY_PATH',
+    str(BASE_DIR / 'CVAnalyzer' / 'ai_services' / 'data' / 'skills_taxonomy.json')
+)
+SKILLS_TAXONOMY_CHECK_INTERVAL = 5  # secondes entre deux vérifications du fichier
+
+# Embeddings des CV stockés à l'ingestion : changer la version invalide les vecteurs existants
+EMBEDDING_MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+EMBEDDING_MODEL_VERSION = os.environ.get('EMBEDDING_MODEL_VERSION', '1')
+EMBEDDING_STORE_DTYPE = 'float16'
+# modèle NER de l'analyse : il entre, avec AI_INFERENCE_MODE, dans la version du cache d'analyse
+NER_MODEL_NAME = os.environ.get('NER_MODEL_NAME', 'dbmdz/bert-large-cased-finetuned-conll03-english')
+
+# Documents longs : fenêtres de tokens avec recouvrement au lieu de la troncature du modèle
+AI_CHUNK_OVERLAP = 64  # tokens communs à deux fenêtres consécutives
+AI_CHUNK_TOKEN_BUDGET = 4096  # tokens analysés au plus par document (coût borné par requête)
+
+# Entraînement : jeu de données pré-tokenisé mis en cache sur disque
+AI_DATASET_CACHE_DIR = os.environ.get('AI_DATASET_CACHE_DIR', str(BASE_DIR / 'dataset_cache'))
+AI_TRAIN_PRECISION = os.environ.get('AI_TRAIN_PRECISION', 'auto')  # auto | bf16 | fp16 | fp32
+AI_TRAIN_ACCUMULATION_STEPS = 1  # batch effectif = batch_size x accumulation
+AI_TRAIN_NUM_WORKERS = 2  # processus de chargement des données
+AI_TRAIN_COMPILE = os.environ.get('AI_TRAIN_COMPILE', '0') == '1'  # torch.compile (PyTorch 2+)
+AI_TRAIN_RESUME = True  # reprise automatique depuis le dernier point de reprise compatible
+AI_CHECKPOINT_DIR = os.environ.get('AI_CHECKPOINT_DIR', str(BASE_DIR / 'checkpoints'))
+AI_CHECKPOINT_EVERY_STEPS = 200  # pas d'optimisation entre deux points de reprise
+# artefact du classifieur (poids safetensors + classes + tokenizer), chargé à la première prédiction
+AI_MODEL_DIR = os.environ.get('AI_MODEL_DIR', str(BASE_DIR / 'trained_models' / 'cv_classifier'))
+AI_MODEL_CHECK_INTERVAL = 5  # secondes entre deux vérifications d'un artefact remplacé (réentraînement)
+# inférence CPU : 'int8' quantifie dynamiquement le classifieur et le modèle NER au chargement
+AI_INFERENCE_MODE = os.environ.get('AI_INFERENCE_MODE', 'fp32')  # fp32 | int8
+AI_QUANTIZATION_CHECK = True  # mesure l'écart int8 / fp32 sur la validation en fin d'entraînement
+AI_QUANTIZATION_MAX_F1_DROP = 0.02  # au-delà, le classifieur reste en fp32 malgré AI_INFERENCE_MODE
+# micro-batching des prédictions du classifieur (requêtes concurrentes regroupées en un passage)
+AI_BATCHING = True
+AI_BATCH_MAX_SIZE = 16  # CV par passage
+AI_BATCH_MAX_WAIT_MS = 5  # attente maximale pour compléter un batch
+AI_BATCH_QUEUE_SIZE = 256  # au-delà : refus immédiat (503)
+AI_BATCH_TIMEOUT = 30  # secondes d'attente maximale d'un résultat
+# préchargement dans le maître gunicorn (AI_PRELOAD_MODELS=1, voir gunicorn.conf.py) : classifieur compris
+AI_PRELOAD_CLASSIFIER = True
+# service d'inférence dédié (manage.py run_inference_server) : vide = modèles chargés dans chaque worker
+AI_INFERENCE_URL = os.environ.get('AI_INFERENCE_URL', '')
+AI_INFERENCE_CONNECT_TIMEOUT = 1.0  # secondes
+AI_INFERENCE_READ_TIMEOUT = 30.0  # secondes
+AI_INFERENCE_POOL_SIZE = 20  # connexions keep-alive par worker
+
+# Index vectoriel des candidatures (recherche "meilleurs candidats pour une offre")
+VECTOR_INDEX_PATH = os.environ.get('VECTOR_INDEX_PATH', str(BASE_DIR / 'vector_index' / 'candidatures.npz'))
+VECTOR_INDEX_NPROBE = 8
+VECTOR_INDEX_SYNC_INTERVAL = 2  # secondes entre deux synchronisations avec la base
+
+# Cache des analyses par empreinte du fichier CV (table AnalysisCache)
+ANALYSIS_CACHE_MAX_ENTRIES = 10000
+ANALYSIS_CACHE_MAX_BYTES = 512 * 1024 * 1024
+ANALYSIS_CACHE_TTL_DAYS = 30
+ANALYSIS_CACHE_EVICT_PROBABILITY = 0.05
+
+# Ré-analyse en masse après un changement de modèle ou de taxonomie (manage.py rescore_candidatures)
+RESCORE_BATCH_SIZE = 100  # candidatures lues, analysées puis écrites (bulk_update) ensemble
+RESCORE_MAX_RATE = 20  # candidatures par seconde au plus (0 = sans limite)
+RESCORE_CHECKPOINT_PATH = os.environ.get('RESCORE_CHECKPOINT_PATH', str(BASE_DIR / 'rescore_checkpoint.json'))
+
+# Extraction PDF page par page (plafonds pour les portfolios volumineux)
+PDF_MAX_PAGES = 50
+PDF_MAX_CHARS = 200000
+PDF_EXTRACTION_WORKERS = 0  # > 1 : extraction des pages en parallèle dans un pool de processus
+
+# Extraction isolée des documents déposés (sous-processus limités en temps et en mémoire)
+EXTRACTION_ISOLATION = True
+EXTRACTION_POOL_PROCESSES = 2
+EXTRACTION_TIMEOUT = 30  # secondes par document
+EXTRACTION_MEMORY_LIMIT_MB = 1024
+EXTRACTION_MAX_TASKS_PER_CHILD = 50  # recyclage des workers
+# dans les workers Celery (démons) : un sous-processus neuf par document, même limite mémoire et même délai
+
+# Celery : analyse IA asynchrone des candidatures (broker Redis de docker-compose.prod.yml)
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_TRACK_STARTED = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1  # tâches longues : pas de préchargement
+CELERY_TASK_TIME_LIMIT = 600
+# filet de sécurité des workers qui portent les modèles (fuites hors extraction) : un recyclage
+# recharge les modèles, d'où des seuils hauts plutôt qu'un recyclage à chaque tâche
+CELERY_WORKER_MAX_MEMORY_PER_CHILD = int(os.environ.get('CELERY_WORKER_MAX_MEMORY_PER_CHILD', 4 * 1024 * 1024))  # Ko
+CELERY_WORKER_MAX_TASKS_PER_CHILD = int(os.environ.get('CELERY_WORKER_MAX_TASKS_PER_CHILD', 500))
+# limite douce avant l'arrêt forcé : la tâche a le temps de marquer la candidature en échec
+CELERY_TASK_SOFT_TIME_LIMIT = 540
+# analyses en attente / en cours sans nouvelles depuis ce délai : relancées ou passées en échec (beat)
+ANALYSE_STALE_AFTER = 900  # secondes, au-delà de CELERY_TASK_TIME_LIMIT
+CELERY_BEAT_SCHEDULE = {
+    'relancer-analyses-bloquees': {
+        'task': 'CVAnalyzer.tasks.relancer_analyses_bloquees',
+        'schedule': 300,
+    },
+}
+# en développement sans Redis : CELERY_TASK_ALWAYS_EAGER=1 exécute les tâches dans le processus web
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', '0') == '1'
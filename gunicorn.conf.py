@@ -0,0 +1,35 @@
+"""
+Configuration gunicorn de production (lue automatiquement depuis /app).
+
+AI_PRELOAD_MODELS=1 : l'application et les modèles IA sont chargés une fois
+dans le maître avant le fork des workers, qui partagent les poids en
+copy-on-write. Mesure : python manage.py memory_report
+"""
+import os
+
+preload_models = os.environ.get('AI_PRELOAD_MODELS', '0') == '1'
+
+if preload_models:
+    # le maître importe l'application : gevent doit être patché avant (ssl, threading...)
+    from gevent import monkey
+    monkey.patch_all()
+    # tokenizers Rust : pas de pool de threads hérité du maître
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+preload_app = preload_models
+
+
+def when_ready(server):
+    # appelé dans le maître, après le chargement de l'application et avant le premier fork
+    if preload_models:
+        from CVAnalyzer.ai_services.preload import preload_models as preload
+        preload()
+
+
+def post_fork(server, worker):
+    if preload_models:
+        import torch
+        # threads intra-op par worker : les 4 workers se partagent les cœurs au lieu de les sur-souscrire
+        threads = int(os.environ.get('AI_WORKER_TORCH_THREADS', '0'))
+        if threads > 0:
+            torch.set_num_threads(threads)